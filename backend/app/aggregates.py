@@ -0,0 +1,394 @@
+"""Query planning over the TimescaleDB continuous aggregates.
+
+`database/init.sql` maintains hourly, daily and monthly continuous
+aggregates of `measurements` (materialized only, refreshed by policy).
+A time window is split into segments: the coarsest aggregate covers
+every whole bucket it has already materialized, finer aggregates cover
+the edges, and raw rows cover what is left (sub-hour edges and the
+not-yet-materialized tail). Each field's partial averages are combined
+weighted by that field's non-NULL count (as AVG does), either over the
+whole window (statistics) or per fixed-width time bucket (chart series).
+
+Databases created before the rollup columns were added need
+`database/migrations/001_aggregate_rollup_columns.sql`; until then the
+outdated aggregates are detected once and skipped (raw data is used).
+"""
+import logging
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import column, func, literal, select, table, text, union_all
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Measurement
+
+logger = logging.getLogger(__name__)
+
+# Coarsest first
+LEVELS = ("monthly", "daily", "hourly")
+
+AGGREGATE_COLUMNS = (
+    "bucket",
+    "sensor_id",
+    "avg_temperature", "min_temperature", "max_temperature",
+    "avg_humidity", "min_humidity", "max_humidity",
+    "avg_pressure", "min_pressure", "max_pressure",
+    "avg_battery_voltage", "battery_count",
+    "temperature_count", "humidity_count", "pressure_count",
+    "measurement_count",
+)
+
+AGGREGATE_VIEWS = {
+    level: table(f"measurements_{level}", *[column(name) for name in AGGREGATE_COLUMNS])
+    for level in LEVELS
+}
+
+WATERMARK_TTL = 60.0
+
+Segment = Tuple[str, datetime, Optional[datetime]]
+
+
+def floor_bucket(moment: datetime, level: str) -> datetime:
+    moment = moment.astimezone(timezone.utc)
+    if level == "hourly":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    if level == "daily":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if level == "monthly":
+        return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown aggregate level: {level}")
+
+
+def next_bucket(bucket: datetime, level: str) -> datetime:
+    if level == "hourly":
+        return bucket + timedelta(hours=1)
+    if level == "daily":
+        return bucket + timedelta(days=1)
+    if level == "monthly":
+        if bucket.month == 12:
+            return bucket.replace(year=bucket.year + 1, month=1)
+        return bucket.replace(month=bucket.month + 1)
+    raise ValueError(f"Unknown aggregate level: {level}")
+
+
+def ceil_bucket(moment: datetime, level: str) -> datetime:
+    floored = floor_bucket(moment, level)
+    return floored if floored == moment else next_bucket(floored, level)
+
+
+def plan_segments(
+    start: datetime,
+    end: Optional[datetime],
+    watermarks: Dict[str, Optional[datetime]],
+    levels: Tuple[str, ...] = LEVELS
+) -> List[Segment]:
+    """Split [start, end) into (source, start, end) segments, source being a level or "raw".
+
+    `watermarks` gives, per level, the end of the last materialized bucket.
+    An `end` of None means "up to now and beyond" and always ends in raw data.
+    """
+    if end is not None and start >= end:
+        return []
+    if not levels:
+        return [("raw", start, end)]
+
+    level, finer = levels[0], levels[1:]
+    watermark = watermarks.get(level)
+    if watermark is None:
+        return plan_segments(start, end, watermarks, finer)
+
+    covered_start = ceil_bucket(start, level)
+    covered_end = floor_bucket(watermark, level)
+    if end is not None:
+        covered_end = min(covered_end, floor_bucket(end, level))
+
+    if covered_start >= covered_end:
+        return plan_segments(start, end, watermarks, finer)
+
+    return (
+        plan_segments(start, covered_start, watermarks, finer)
+        + [(level, covered_start, covered_end)]
+        + plan_segments(covered_end, end, watermarks, finer)
+    )
+
+
+# Materialized views are not listed in information_schema, hence pg_attribute
+AGGREGATE_COLUMNS_QUERY = text("""
+    SELECT c.relname AS view_name, a.attname AS column_name
+    FROM pg_attribute a JOIN pg_class c ON c.oid = a.attrelid
+    WHERE c.relname IN ('measurements_hourly', 'measurements_daily', 'measurements_monthly')
+        AND a.attnum > 0 AND NOT a.attisdropped
+""")
+
+
+class AggregateWatermarks:
+    """Caches where each continuous aggregate's materialized data ends.
+
+    Which aggregates have the expected columns is checked once per process;
+    missing or outdated ones get no watermark, so queries plan around them.
+    """
+
+    def __init__(self, ttl: float = WATERMARK_TTL):
+        self.ttl = ttl
+        self.levels: Optional[Tuple[str, ...]] = None
+        self._watermarks: Dict[str, Optional[datetime]] = {}
+        self._fetched_at = 0.0
+
+    async def _usable_levels(self, session: AsyncSession) -> Tuple[str, ...]:
+        if self.levels is None:
+            columns: Dict[str, set] = {}
+            for view_name, column_name in await session.execute(AGGREGATE_COLUMNS_QUERY):
+                columns.setdefault(view_name, set()).add(column_name)
+            self.levels = tuple(
+                level for level in LEVELS
+                if set(AGGREGATE_COLUMNS) <= columns.get(f"measurements_{level}", set())
+            )
+            outdated = [level for level in LEVELS if level not in self.levels]
+            if outdated:
+                logger.warning(
+                    f"Continuous aggregates {', '.join(outdated)} missing or outdated, using raw data instead; "
+                    "apply database/migrations/001_aggregate_rollup_columns.sql"
+                )
+        return self.levels
+
+    async def get(self, session: AsyncSession) -> Dict[str, Optional[datetime]]:
+        if time.monotonic() - self._fetched_at < self.ttl:
+            return self._watermarks
+
+        levels = await self._usable_levels(session)
+        watermarks: Dict[str, Optional[datetime]] = {level: None for level in LEVELS}
+        if levels:
+            query = select(*[
+                select(func.max(AGGREGATE_VIEWS[level].c.bucket)).scalar_subquery().label(level)
+                for level in levels
+            ])
+            row = (await session.execute(query)).one()
+
+            # max(bucket) is the start of the newest materialized bucket
+            for level in levels:
+                bucket = getattr(row, level)
+                watermarks[level] = next_bucket(bucket, level) if bucket else None
+        self._watermarks = watermarks
+        self._fetched_at = time.monotonic()
+        return self._watermarks
+
+    def invalidate(self):
+        """Forget the watermarks and re-check the aggregate columns (after a migration)."""
+        self._fetched_at = 0.0
+        self.levels = None
+
+
+aggregate_watermarks = AggregateWatermarks()
+
+
+def _aggregate_segment(
+    level: str,
+    sensor_id: int,
+    start: datetime,
+    end: datetime,
+    width=None
+):
+    view = AGGREGATE_VIEWS[level]
+    query = select(
+        literal(level).label("source"),
+        func.coalesce(func.sum(view.c.measurement_count), 0).label("count"),
+        func.sum(view.c.avg_temperature * view.c.temperature_count).label("sum_temperature"),
+        func.coalesce(func.sum(view.c.temperature_count), 0).label("temperature_count"),
+        func.min(view.c.min_temperature).label("min_temperature"),
+        func.max(view.c.max_temperature).label("max_temperature"),
+        func.sum(view.c.avg_humidity * view.c.humidity_count).label("sum_humidity"),
+        func.coalesce(func.sum(view.c.humidity_count), 0).label("humidity_count"),
+        func.min(view.c.min_humidity).label("min_humidity"),
+        func.max(view.c.max_humidity).label("max_humidity"),
+        func.sum(view.c.avg_pressure * view.c.pressure_count).label("sum_pressure"),
+        func.coalesce(func.sum(view.c.pressure_count), 0).label("pressure_count"),
+        func.min(view.c.min_pressure).label("min_pressure"),
+        func.max(view.c.max_pressure).label("max_pressure"),
+        func.sum(view.c.avg_battery_voltage * view.c.battery_count).label("sum_battery"),
+        func.coalesce(func.sum(view.c.battery_count), 0).label("battery_count")
+    ).where(
+        view.c.sensor_id == sensor_id,
+        view.c.bucket >= start,
+        view.c.bucket < end
+    )
+    if width is not None:
+        bucket = func.time_bucket(width, view.c.bucket).label("bucket")
+        query = query.add_columns(bucket).group_by(bucket)
+    return query
+
+
+def _raw_segment(
+    sensor_id: int,
+    start: datetime,
+    end: Optional[datetime],
+    width=None
+):
+    query = select(
+        literal("raw").label("source"),
+        func.count(Measurement.time).label("count"),
+        func.sum(Measurement.temperature).label("sum_temperature"),
+        func.count(Measurement.temperature).label("temperature_count"),
+        func.min(Measurement.temperature).label("min_temperature"),
+        func.max(Measurement.temperature).label("max_temperature"),
+        func.sum(Measurement.humidity).label("sum_humidity"),
+        func.count(Measurement.humidity).label("humidity_count"),
+        func.min(Measurement.humidity).label("min_humidity"),
+        func.max(Measurement.humidity).label("max_humidity"),
+        func.sum(Measurement.pressure).label("sum_pressure"),
+        func.count(Measurement.pressure).label("pressure_count"),
+        func.min(Measurement.pressure).label("min_pressure"),
+        func.max(Measurement.pressure).label("max_pressure"),
+        func.sum(Measurement.battery_voltage).label("sum_battery"),
+        func.count(Measurement.battery_voltage).label("battery_count")
+    ).where(
+        Measurement.sensor_id == sensor_id,
+        Measurement.time >= start
+    )
+    if end is not None:
+        query = query.where(Measurement.time < end)
+    if width is not None:
+        bucket = func.time_bucket(width, Measurement.time).label("bucket")
+        query = query.add_columns(bucket).group_by(bucket)
+    return query
+
+
+def _segments_query(sensor_id: int, segments: List[Segment], width=None):
+    return union_all(*[
+        _raw_segment(sensor_id, seg_start, seg_end, width) if source == "raw"
+        else _aggregate_segment(source, sensor_id, seg_start, seg_end, width)
+        for source, seg_start, seg_end in segments
+    ])
+
+
+def combine_partials(partials) -> Dict:
+    """Combine per-segment sums/min/max into overall statistics."""
+    count = sum(int(p.count or 0) for p in partials)
+
+    def weighted_average(field: str, weight_field: str) -> Optional[float]:
+        # NULL readings are not part of a field's average, as with AVG
+        values = [float(getattr(p, field)) for p in partials if getattr(p, field) is not None]
+        weight = sum(int(getattr(p, weight_field) or 0) for p in partials)
+        return sum(values) / weight if values and weight else None
+
+    def extreme(field: str, pick) -> Optional[float]:
+        values = [getattr(p, field) for p in partials if getattr(p, field) is not None]
+        return pick(values) if values else None
+
+    return {
+        "count": count,
+        "avg_temp": weighted_average("sum_temperature", "temperature_count"),
+        "min_temp": extreme("min_temperature", min),
+        "max_temp": extreme("max_temperature", max),
+        "avg_humidity": weighted_average("sum_humidity", "humidity_count"),
+        "min_humidity": extreme("min_humidity", min),
+        "max_humidity": extreme("max_humidity", max),
+        "avg_pressure": weighted_average("sum_pressure", "pressure_count"),
+        "min_pressure": extreme("min_pressure", min),
+        "max_pressure": extreme("max_pressure", max),
+        "avg_battery": weighted_average("sum_battery", "battery_count"),
+    }
+
+
+async def compute_sensor_stats(
+    session: AsyncSession,
+    sensor_id: int,
+    start: datetime,
+    end: Optional[datetime] = None
+) -> Dict:
+    """Statistics for one sensor over [start, end), read from aggregates where possible."""
+    try:
+        # Savepoint so a failure leaves the caller's transaction usable
+        async with session.begin_nested():
+            watermarks = await aggregate_watermarks.get(session)
+            segments = plan_segments(start, end, watermarks)
+            partials = (await session.execute(_segments_query(sensor_id, segments))).all()
+    except DBAPIError as e:
+        # Aggregates missing or without the expected columns: scan raw data
+        logger.warning(f"Falling back to raw statistics for sensor {sensor_id}: {e}")
+        partials = (await session.execute(_raw_segment(sensor_id, start, end))).all()
+
+    return combine_partials(partials)
+
+
+# Monthly buckets do not nest into fixed-width buckets, so series stop at daily
+SERIES_LEVELS = ("daily", "hourly")
+LEVEL_WIDTHS = {"daily": timedelta(days=1), "hourly": timedelta(hours=1)}
+RESOLUTIONS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+MIN_BUCKET_WIDTH = timedelta(minutes=1)
+
+
+def choose_bucket_width(start: datetime, end: datetime, max_points: int) -> timedelta:
+    """Smallest whole-minute/hour/day bucket that keeps [start, end) within max_points buckets."""
+    # Buckets are aligned, so the window can straddle one extra bucket
+    width = (end - start) / max(1, max_points - 1)
+    for unit in (timedelta(days=1), timedelta(hours=1), MIN_BUCKET_WIDTH):
+        if width >= unit:
+            return unit * math.ceil(width / unit)
+    return MIN_BUCKET_WIDTH
+
+
+def series_point(row) -> Dict:
+    stats = combine_partials([row])
+    return {
+        "time": row.bucket,
+        "count": stats["count"],
+        "temperature": stats["avg_temp"],
+        "temperature_min": stats["min_temp"],
+        "temperature_max": stats["max_temp"],
+        "humidity": stats["avg_humidity"],
+        "humidity_min": stats["min_humidity"],
+        "humidity_max": stats["max_humidity"],
+        "pressure": stats["avg_pressure"],
+        "pressure_min": stats["min_pressure"],
+        "pressure_max": stats["max_pressure"],
+        "battery_voltage": stats["avg_battery"],
+    }
+
+
+async def _fetch_series(session: AsyncSession, sensor_id: int, segments: List[Segment], width):
+    parts = _segments_query(sensor_id, segments, width).subquery()
+    query = select(
+        parts.c.bucket,
+        func.sum(parts.c.count).label("count"),
+        func.sum(parts.c.sum_temperature).label("sum_temperature"),
+        func.min(parts.c.min_temperature).label("min_temperature"),
+        func.max(parts.c.max_temperature).label("max_temperature"),
+        func.sum(parts.c.sum_humidity).label("sum_humidity"),
+        func.min(parts.c.min_humidity).label("min_humidity"),
+        func.max(parts.c.max_humidity).label("max_humidity"),
+        func.sum(parts.c.sum_pressure).label("sum_pressure"),
+        func.min(parts.c.min_pressure).label("min_pressure"),
+        func.max(parts.c.max_pressure).label("max_pressure"),
+        func.sum(parts.c.sum_battery).label("sum_battery"),
+        func.sum(parts.c.battery_count).label("battery_count")
+    ).group_by(parts.c.bucket).order_by(parts.c.bucket)
+    return (await session.execute(query)).all()
+
+
+async def compute_sensor_series(
+    session: AsyncSession,
+    sensor_id: int,
+    start: datetime,
+    end: Optional[datetime],
+    width,
+    levels: Optional[Tuple[str, ...]] = None
+) -> List[Dict]:
+    """Time-bucketed averages and min/max for one sensor, oldest bucket first.
+
+    `width` is a timedelta, or an interval expression (e.g. calendar months)
+    together with the `levels` whose buckets nest into it.
+    """
+    if levels is None:
+        levels = tuple(level for level in SERIES_LEVELS if width % LEVEL_WIDTHS[level] == timedelta(0))
+    try:
+        async with session.begin_nested():
+            watermarks = await aggregate_watermarks.get(session)
+            rows = await _fetch_series(session, sensor_id, plan_segments(start, end, watermarks, levels), width)
+    except DBAPIError as e:
+        logger.warning(f"Falling back to raw series for sensor {sensor_id}: {e}")
+        rows = await _fetch_series(session, sensor_id, plan_segments(start, end, {}), width)
+
+    return [series_point(row) for row in rows]
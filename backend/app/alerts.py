@@ -0,0 +1,216 @@
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, insert, select, update
+
+from app.config import settings
+from app.counters import dashboard_counters
+from app.database import IngestSessionLocal
+from app.models import Alert, AlertThreshold
+
+logger = logging.getLogger(__name__)
+
+ALERT_PARAMETERS = ("temperature", "humidity", "pressure")
+
+# A breach only clears once the value is back inside the range by this margin,
+# so readings hovering around a threshold do not open and close alerts in a loop
+HYSTERESIS = {
+    "temperature": 0.5,
+    "humidity": 2.0,
+    "pressure": 1.0,
+}
+
+PARAMETER_LABELS = {
+    "temperature": "Température",
+    "humidity": "Humidité",
+    "pressure": "Pression",
+}
+
+# (threshold_id, sensor_id)
+AlertKey = Tuple[int, int]
+
+
+def alert_message(parameter: str, value: float, bound: str, threshold_value: float) -> str:
+    label = PARAMETER_LABELS.get(parameter, parameter)
+    if bound == "max":
+        return f"{label} trop élevée : {value:g} (seuil max {threshold_value:g})"
+    return f"{label} trop basse : {value:g} (seuil min {threshold_value:g})"
+
+
+class AlertEngine:
+    """Evaluates alert thresholds against every stored measurement batch.
+
+    Active thresholds are indexed in memory by (sensor_id, parameter); a
+    threshold without sensor applies to all sensors. Each batch is checked
+    in one pass without any query, and at most two statements are issued
+    per batch: one update resolving alerts, one bulk insert of new ones.
+    An alert stays open while its threshold is breached (one alert per
+    breach, not per reading) and is resolved by the first reading back
+    inside its bound by the hysteresis margin, or past the opposite bound,
+    which then opens an alert of its own.
+    """
+
+    def __init__(self, refresh_interval: Optional[float] = None):
+        self.refresh_interval = refresh_interval or settings.ALERT_THRESHOLD_REFRESH
+        self._index: Dict[Tuple[Optional[int], str], List[Dict]] = defaultdict(list)
+        # Open alert -> the bound it breached ("min" or "max")
+        self._open: Dict[AlertKey, str] = {}
+        self._last_time: Dict[int, datetime] = {}
+        self._loaded_at: Optional[float] = None
+
+        self.evaluated = 0
+        self.created = 0
+        self.resolved = 0
+
+    def load(self, thresholds: Iterable, open_alerts: Iterable[Tuple[int, int, float]]):
+        """`open_alerts` holds (threshold_id, sensor_id, threshold_value) of unresolved alerts."""
+        thresholds = list(thresholds)
+        min_values = {threshold.id: threshold.min_value for threshold in thresholds}
+        index = defaultdict(list)
+        for threshold in thresholds:
+            if threshold.parameter not in ALERT_PARAMETERS:
+                continue
+            index[(threshold.sensor_id, threshold.parameter)].append({
+                "id": threshold.id,
+                "min": threshold.min_value,
+                "max": threshold.max_value,
+                "severity": threshold.severity or "warning"
+            })
+        self._index = index
+        self._open = {
+            (threshold_id, sensor_id): "min" if threshold_value == min_values.get(threshold_id) else "max"
+            for threshold_id, sensor_id, threshold_value in open_alerts
+        }
+        self._loaded_at = time.monotonic()
+
+    async def warm(self):
+        async with IngestSessionLocal() as session:
+            thresholds = await session.execute(select(AlertThreshold).where(AlertThreshold.is_active == True))
+            open_alerts = await session.execute(
+                select(Alert.threshold_id, Alert.sensor_id, Alert.threshold_value).where(Alert.is_resolved == False)
+            )
+            self.load(thresholds.scalars().all(), [tuple(row) for row in open_alerts])
+        logger.info(f"Alert engine loaded {sum(len(t) for t in self._index.values())} thresholds, {len(self._open)} open alerts")
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def _thresholds_for(self, sensor_id: int, parameter: str) -> List[Dict]:
+        return self._index.get((sensor_id, parameter), []) + self._index.get((None, parameter), [])
+
+    def evaluate(self, rows: Iterable[Dict]) -> Tuple[List[Dict], Dict[AlertKey, datetime]]:
+        """Check a batch; return (alerts to insert, open alerts to resolve with their time)."""
+        created: Dict[AlertKey, List[Dict]] = defaultdict(list)
+        resolved: Dict[AlertKey, datetime] = {}
+        if not self._index:
+            return [], resolved
+
+        for row in sorted(rows, key=lambda row: row["time"]):
+            sensor_id = row["sensor_id"]
+            # Late rows are stored but do not reopen or resolve anything
+            last_time = self._last_time.get(sensor_id)
+            if last_time is not None and row["time"] < last_time:
+                continue
+            self._last_time[sensor_id] = row["time"]
+            self.evaluated += 1
+
+            for parameter in ALERT_PARAMETERS:
+                value = row.get(parameter)
+                if value is None:
+                    continue
+                for threshold in self._thresholds_for(sensor_id, parameter):
+                    key = (threshold["id"], sensor_id)
+                    low, high = threshold["min"], threshold["max"]
+
+                    # Each bound clears on its own hysteresis band; a jump
+                    # straight across the range clears it too, and the other
+                    # bound's breach is then opened below
+                    open_bound = self._open.get(key)
+                    if open_bound is not None:
+                        margin = HYSTERESIS[parameter]
+                        if open_bound == "max":
+                            cleared = high is None or value <= high - margin
+                        else:
+                            cleared = low is None or value >= low + margin
+                        if not cleared:
+                            continue
+                        del self._open[key]
+                        if created[key]:
+                            # Opened earlier in this same batch: insert it already resolved
+                            created[key][-1].update(is_resolved=True, resolved_at=row["time"])
+                        else:
+                            resolved[key] = row["time"]
+
+                    if high is not None and value > high:
+                        bound, threshold_value = "max", high
+                    elif low is not None and value < low:
+                        bound, threshold_value = "min", low
+                    else:
+                        continue
+                    self._open[key] = bound
+                    created[key].append({
+                        "sensor_id": sensor_id,
+                        "threshold_id": threshold["id"],
+                        "parameter": parameter,
+                        "value": value,
+                        "threshold_value": threshold_value,
+                        "severity": threshold["severity"],
+                        "message": alert_message(parameter, value, bound, threshold_value),
+                        "is_resolved": False,
+                        "resolved_at": None
+                    })
+
+        alerts = [alert for key_alerts in created.values() for alert in key_alerts]
+        self.created += len(alerts)
+        self.resolved += len(resolved) + sum(alert["is_resolved"] for alert in alerts)
+        return alerts, resolved
+
+    async def process(self, rows: List[Dict]):
+        """Writer listener: evaluate a stored batch and persist alert changes."""
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_interval:
+            await self.warm()
+
+        alerts, resolved = self.evaluate(rows)
+        if not alerts and not resolved:
+            return
+
+        alerts_table = Alert.__table__
+        resolve = (
+            update(alerts_table)
+            .where(alerts_table.c.threshold_id == bindparam("b_threshold_id"))
+            .where(alerts_table.c.sensor_id == bindparam("b_sensor_id"))
+            .where(alerts_table.c.is_resolved == False)
+            .values(is_resolved=True, resolved_at=bindparam("b_resolved_at"))
+        )
+
+        async with IngestSessionLocal() as session:
+            # Resolve first: alerts inserted below may reopen the same threshold
+            if resolved:
+                await session.execute(resolve, [
+                    {"b_threshold_id": threshold_id, "b_sensor_id": sensor_id, "b_resolved_at": resolved_at}
+                    for (threshold_id, sensor_id), resolved_at in resolved.items()
+                ])
+            if alerts:
+                await session.execute(insert(Alert), alerts)
+            await session.commit()
+        
+        opened = sum(not alert["is_resolved"] for alert in alerts)
+        dashboard_counters.adjust("unresolved_alerts", opened - len(resolved))
+
+        if alerts:
+            logger.info(f"{len(alerts)} alert(s) raised, {len(resolved)} resolved")
+
+    def stats(self) -> Dict:
+        return {
+            "thresholds": sum(len(thresholds) for thresholds in self._index.values()),
+            "open_alerts": len(self._open),
+            "evaluated": self.evaluated,
+            "created": self.created,
+            "resolved": self.resolved
+        }
+
+
+alert_engine = AlertEngine()
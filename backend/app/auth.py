@@ -1,5 +1,10 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Set, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
@@ -10,16 +15,157 @@ from sqlalchemy import select
 from app.config import settings
 from app.database import get_db
 from app.models import User
+from app.counters import dashboard_counters
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+class PrincipalCache:
+    """Short-lived cache of the user behind each bearer token.
+
+    Saves the JWT decode and the users query on repeated requests with the
+    same token. Entries live PRINCIPAL_CACHE_TTL seconds at most (never past
+    the token expiry) and are dropped as soon as an admin changes or
+    deletes the user, so role and is_active changes apply immediately.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else settings.PRINCIPAL_CACHE_TTL
+        self.max_entries = max_entries or settings.PRINCIPAL_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[User]:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        # A fresh detached instance per request: callers never share state
+        return User(**entry[1])
+
+    def put(self, token: str, user: User, token_expires_at: Optional[float] = None):
+        if self.ttl <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, time.monotonic() + token_expires_at - time.time())
+
+        key = self._key(token)
+        values = {column.key: getattr(user, column.key) for column in User.__table__.columns}
+        self._entries[key] = (expires_at, values)
+        self._entries.move_to_end(key)
+        self._tokens_by_user.setdefault(user.id, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        _, values = self._entries.pop(key)
+        tokens = self._tokens_by_user.get(values["id"])
+        if tokens is not None:
+            tokens.discard(key)
+            if not tokens:
+                del self._tokens_by_user[values["id"]]
+
+    def invalidate_user(self, user_id: int):
+        for key in self._tokens_by_user.pop(user_id, set()):
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._tokens_by_user.clear()
+
+    def stats(self) -> Dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+principal_cache = PrincipalCache()
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+class PasswordHasher:
+    """Runs bcrypt off the event loop on a small, bounded thread pool.
+
+    A bcrypt call takes 100-300 ms of CPU; run inline it stalls every
+    request and MQTT ingestion. bcrypt releases the GIL, so the pool
+    hashes in parallel. At most `workers` calls run at once, at most
+    `max_waiting` more wait for a slot, and beyond that requests are
+    refused with a 503 instead of piling up during a login storm.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_waiting: Optional[int] = None):
+        self.workers = workers or settings.PASSWORD_HASH_WORKERS
+        self.max_waiting = max_waiting if max_waiting is not None else settings.PASSWORD_HASH_MAX_WAITING
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._slots = asyncio.Semaphore(self.workers)
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def run(self, func, *args):
+        if self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Trop de connexions simultanées, réessayez dans un instant",
+                headers={"Retry-After": "1"},
+            )
+        
+        self.waiting += 1
+        queued_at = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        waited = time.perf_counter() - queued_at
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._slots.release()
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait / self.completed * 1000, 1) if self.completed else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1)
+        }
+
+password_hasher = PasswordHasher()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.run(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -36,7 +182,7 @@ async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User
 
 async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[User]:
     user = await get_user_by_username(db, username)
-    if not user or not verify_password(password, user.password_hash):
+    if not user or not await verify_password_async(password, user.password_hash):
         return None
     return user
 
@@ -50,6 +196,10 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    cached_user = principal_cache.get(credentials.credentials)
+    if cached_user is not None:
+        return cached_user
+    
     try:
         payload = jwt.decode(
             credentials.credentials, 
@@ -66,6 +216,7 @@ async def get_current_user(
     if user is None:
         raise credentials_exception
     
+    principal_cache.put(credentials.credentials, user, payload.get("exp"))
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
@@ -85,9 +236,10 @@ async def register_user(userName: str, password:str, email, db: AsyncSession) ->
     new_user = User(
         username=userName,
         email=email,
-        password_hash=get_password_hash(password)
+        password_hash=await get_password_hash_async(password)
     )
     db.add(new_user)
     await db.commit()
     await db.refresh(new_user)
+    dashboard_counters.adjust("total_users", 1)
     return new_user
\ No newline at end of file
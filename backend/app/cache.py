@@ -0,0 +1,124 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Request, Response
+
+from app.config import settings
+from app.encoding import dumps_json
+
+# (body, etag, media type, extra headers)
+CachedBody = Tuple[bytes, str, str, Optional[Dict[str, str]]]
+
+
+class MemoryCacheBackend:
+    """In-process TTL + LRU store. Other backends only need get/set/clear."""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or settings.RESPONSE_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[str, Tuple[float, CachedBody]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CachedBody]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: CachedBody, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class ResponseCache:
+    """Caches encoded JSON responses of read endpoints and answers If-None-Match.
+
+    Each key embeds the current generation of the tags it depends on
+    ("sensors" for the sensor list, "sensor:<id>" for one sensor). Bumping
+    a generation on ingestion or on an admin change makes every dependent
+    key unreachable at once; stale entries age out through TTL/LRU, so any
+    backend works without tag bookkeeping. Generations are per process.
+    """
+
+    def __init__(self, backend=None, ttl: Optional[float] = None):
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.ttl = ttl or settings.RESPONSE_CACHE_TTL
+        self._generations: Dict[str, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    def set_backend(self, backend):
+        self.backend = backend
+
+    def key(self, namespace: str, tags: Iterable[str], **params) -> str:
+        """Key from the parsed (already defaulted) parameters, so equivalent URLs share it."""
+        generations = ",".join(f"{tag}@{self._generations.get(tag, 0)}" for tag in sorted(tags))
+        encoded_params = dumps_json({name: params[name] for name in sorted(params)}).decode()
+        return f"{namespace}|{encoded_params}|{generations}"
+
+    def invalidate(self, *tags: str):
+        for tag in tags:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+        self.invalidations += 1
+
+    async def on_measurements(self, rows: List[Dict]):
+        """Writer listener: new readings change the sensor list and those sensors."""
+        self.invalidate("sensors", *{f"sensor:{row['sensor_id']}" for row in rows})
+
+    def lookup(self, request: Request, key: str) -> Optional[Response]:
+        cached = self.backend.get(key)
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._respond(request, *cached)
+
+    def store(self, request: Request, key: str, content: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+        return self.store_encoded(request, key, dumps_json(content), "application/json", headers)
+
+    def store_encoded(
+        self, request: Request, key: str, body: bytes, media_type: str, headers: Optional[Dict[str, str]] = None
+    ) -> Response:
+        """Store an already encoded body (columnar JSON, MessagePack...)."""
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self.backend.set(key, (body, etag, media_type, headers), self.ttl)
+        return self._respond(request, body, etag, media_type, headers)
+
+    def _respond(
+        self, request: Request, body: bytes, etag: str, media_type: str, extra_headers: Optional[Dict[str, str]] = None
+    ) -> Response:
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept", **(extra_headers or {})}
+        if etag in request.headers.get("if-none-match", ""):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.backend) if hasattr(self.backend, "__len__") else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations
+        }
+
+
+response_cache = ResponseCache()
@@ -6,6 +6,14 @@ class Settings:
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_HOURS: int = 8
     
+    # Authenticated user per token, cached to skip the users query
+    PRINCIPAL_CACHE_TTL: float = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+    
+    # bcrypt runs on this many threads; more waiting requests than this are refused
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_WAITING: int = int(os.getenv("PASSWORD_HASH_MAX_WAITING", "64"))
+    
     @property
     def DATABASE_URL(self) -> str:
         # Try production DATABASE_URL first, then fallback to Docker Compose format
@@ -21,6 +29,16 @@ class Settings:
             
             db_url = f"postgresql://{postgres_user}:{postgres_password}@{postgres_host}:{postgres_port}/{postgres_db}"
         
+        return self._async_url(db_url)
+    
+    @property
+    def DATABASE_REPLICA_URL(self) -> str:
+        # Read replica for exports and reports; the primary when not set
+        replica_url = os.getenv("DATABASE_REPLICA_URL")
+        return self._async_url(replica_url) if replica_url else self.DATABASE_URL
+    
+    @staticmethod
+    def _async_url(db_url: str) -> str:
         # Convert postgres:// to postgresql+asyncpg:// for async SQLAlchemy
         if db_url.startswith("postgres://"):
             db_url = db_url.replace("postgres://", "postgresql+asyncpg://", 1)
@@ -28,11 +46,78 @@ class Settings:
             db_url = db_url.replace("postgresql://", "postgresql+asyncpg://", 1)
         return db_url
     
+    # Connection pools: API requests, MQTT ingestion, exports/reports
+    DB_API_POOL_SIZE: int = int(os.getenv("DB_API_POOL_SIZE", "5"))
+    DB_API_MAX_OVERFLOW: int = int(os.getenv("DB_API_MAX_OVERFLOW", "10"))
+    DB_INGEST_POOL_SIZE: int = int(os.getenv("DB_INGEST_POOL_SIZE", "3"))
+    DB_INGEST_MAX_OVERFLOW: int = int(os.getenv("DB_INGEST_MAX_OVERFLOW", "2"))
+    DB_EXPORT_POOL_SIZE: int = int(os.getenv("DB_EXPORT_POOL_SIZE", "2"))
+    DB_EXPORT_MAX_OVERFLOW: int = int(os.getenv("DB_EXPORT_MAX_OVERFLOW", "2"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    
     MQTT_BROKER_HOST: str = os.getenv("MQTT_BROKER_HOST", "localhost")
     MQTT_BROKER_PORT: int = int(os.getenv("MQTT_BROKER_PORT", "1883"))
     MQTT_USERNAME: str = os.getenv("MQTT_USERNAME", "")
     MQTT_PASSWORD: str = os.getenv("MQTT_PASSWORD", "")
     
+    # MQTT message processing
+    MQTT_QUEUE_MAXSIZE: int = int(os.getenv("MQTT_QUEUE_MAXSIZE", "10000"))
+    MQTT_OVERFLOW_POLICY: str = os.getenv("MQTT_OVERFLOW_POLICY", "drop_oldest")  # block, drop_oldest or spill
+    MQTT_SPILL_PATH: str = os.getenv("MQTT_SPILL_PATH", "mqtt_spill.jsonl")
+    MQTT_WORKERS: int = int(os.getenv("MQTT_WORKERS", "4"))
+    MQTT_WORKER_QUEUE_SIZE: int = int(os.getenv("MQTT_WORKER_QUEUE_SIZE", "1000"))
+    MQTT_DRAIN_TIMEOUT: float = float(os.getenv("MQTT_DRAIN_TIMEOUT", "10.0"))
+    
+    # Window (seconds) for merging per-metric RuuviTag topics into one reading
+    RUUVITAG_MERGE_WINDOW: float = float(os.getenv("RUUVITAG_MERGE_WINDOW", "2.0"))
+    
+    # Same reading received on several topics within this window is stored once
+    DEDUPE_WINDOW: float = float(os.getenv("DEDUPE_WINDOW", "10.0"))
+    DEDUPE_MAX_ENTRIES: int = int(os.getenv("DEDUPE_MAX_ENTRIES", "100000"))
+    
+    # Write-behind buffer for incoming measurements
+    INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", "500"))
+    INGEST_FLUSH_INTERVAL: float = float(os.getenv("INGEST_FLUSH_INTERVAL", "1.0"))
+    INGEST_MAX_BACKLOG: int = int(os.getenv("INGEST_MAX_BACKLOG", "50000"))
+    INGEST_BACKFILL_BATCH_SIZE: int = int(os.getenv("INGEST_BACKFILL_BATCH_SIZE", "5000"))
+    
+    # Event time: device timestamps are trusted within these bounds (seconds)
+    INGEST_MAX_CLOCK_SKEW: float = float(os.getenv("INGEST_MAX_CLOCK_SKEW", "300"))
+    INGEST_LATE_AFTER: float = float(os.getenv("INGEST_LATE_AFTER", "300"))
+    # Not beyond the hourly aggregate refresh window (7 days in database/init.sql):
+    # older backfilled rows would never reach the rollups used for statistics
+    INGEST_MAX_LATENESS: float = float(os.getenv("INGEST_MAX_LATENESS", str(7 * 24 * 3600)))
+    INGEST_LATE_POLICY: str = os.getenv("INGEST_LATE_POLICY", "backfill")  # backfill, clamp or drop
+    
+    # Rows fetched per server-side cursor round trip when streaming exports
+    EXPORT_CHUNK_SIZE: int = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+    
+    # Seconds between reloads of the alert thresholds used during ingestion
+    ALERT_THRESHOLD_REFRESH: float = float(os.getenv("ALERT_THRESHOLD_REFRESH", "60"))
+    
+    # TimescaleDB storage of the measurements hypertable, applied at startup
+    MANAGE_STORAGE_POLICIES: bool = os.getenv("MANAGE_STORAGE_POLICIES", "true").lower() == "true"
+    MEASUREMENTS_CHUNK_INTERVAL_HOURS: int = int(os.getenv("MEASUREMENTS_CHUNK_INTERVAL_HOURS", "24"))
+    MEASUREMENTS_COMPRESS_AFTER_DAYS: int = int(os.getenv("MEASUREMENTS_COMPRESS_AFTER_DAYS", "7"))
+    # Uncompressed size a chunk should stay under (about 25% of the database's memory)
+    STORAGE_TARGET_CHUNK_MB: int = int(os.getenv("STORAGE_TARGET_CHUNK_MB", "512"))
+    
+    # Seconds between recounts of the admin dashboard counters from the database
+    COUNTER_RECONCILE_INTERVAL: float = float(os.getenv("COUNTER_RECONCILE_INTERVAL", "300"))
+    
+    # Live push (WebSocket / SSE): updates per second per sensor, per-client queue (in batches)
+    LIVE_MAX_RATE: float = float(os.getenv("LIVE_MAX_RATE", "1.0"))
+    LIVE_CLIENT_QUEUE_SIZE: int = int(os.getenv("LIVE_CLIENT_QUEUE_SIZE", "200"))
+    LIVE_KEEPALIVE: float = float(os.getenv("LIVE_KEEPALIVE", "15.0"))
+    
+    # In-process cache of read endpoint responses
+    RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+    
+    # Background report generation
+    REPORTS_DIR: str = os.getenv("REPORTS_DIR", "reports")
+    REPORT_WORKERS: int = int(os.getenv("REPORT_WORKERS", "2"))
+    
     CORS_ORIGINS: list = [
         "http://localhost",
         "http://localhost:80",
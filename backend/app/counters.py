@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import Alert, Sensor, User
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ("total_sensors", "active_sensors", "unresolved_alerts", "total_users")
+
+READINGS_WINDOW = 60
+SENSORS_SEEN_WINDOW = 300
+
+
+class DashboardCounters:
+    """Admin dashboard counters kept in memory instead of counted per request.
+
+    The mutation paths (sensor registry, admin routes, registration, alert
+    engine) adjust the counters as they commit; a background task recounts
+    them from the database every `reconcile_interval` seconds in a single
+    statement, which also repairs drift from changes made outside this
+    process. The measurement writer feeds readings/minute and the set of
+    sensors seen in the last five minutes, which are never queried.
+    """
+
+    def __init__(self, reconcile_interval: Optional[float] = None):
+        self.reconcile_interval = reconcile_interval or settings.COUNTER_RECONCILE_INTERVAL
+        self._counts: Optional[Dict[str, int]] = None
+        self._reconciled_at: Optional[float] = None
+        # (second, readings stored during that second)
+        self._readings: Deque[Tuple[int, int]] = deque()
+        self._last_seen: Dict[int, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        self.reconciliations = 0
+        self.drift = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._counts is not None
+
+    def adjust(self, name: str, delta: int):
+        # Before the first reconciliation there is nothing to adjust: the count will include it
+        if self._counts is not None:
+            self._counts[name] = max(self._counts[name] + delta, 0)
+
+    def sensor_added(self, is_active: bool = True):
+        self.adjust("total_sensors", 1)
+        if is_active:
+            self.adjust("active_sensors", 1)
+
+    def sensor_removed(self, was_active: bool):
+        self.adjust("total_sensors", -1)
+        if was_active:
+            self.adjust("active_sensors", -1)
+
+    def sensor_activity_changed(self, was_active: bool, is_active: bool):
+        if was_active != is_active:
+            self.adjust("active_sensors", 1 if is_active else -1)
+
+    def forget_sensor(self, sensor_id: int):
+        self._last_seen.pop(sensor_id, None)
+
+    async def on_measurements(self, rows: List[Dict]):
+        """Writer listener: count stored readings and remember which sensors sent them."""
+        now = time.monotonic()
+        second = int(now)
+        if self._readings and self._readings[-1][0] == second:
+            self._readings[-1] = (second, self._readings[-1][1] + len(rows))
+        else:
+            self._readings.append((second, len(rows)))
+        for row in rows:
+            self._last_seen[row["sensor_id"]] = now
+
+    def readings_per_minute(self) -> int:
+        horizon = int(time.monotonic()) - READINGS_WINDOW
+        while self._readings and self._readings[0][0] <= horizon:
+            self._readings.popleft()
+        return sum(count for _, count in self._readings)
+
+    def sensors_seen(self) -> int:
+        horizon = time.monotonic() - SENSORS_SEEN_WINDOW
+        stale = [sensor_id for sensor_id, seen_at in self._last_seen.items() if seen_at < horizon]
+        for sensor_id in stale:
+            del self._last_seen[sensor_id]
+        return len(self._last_seen)
+
+    async def reconcile(self):
+        query = select(
+            select(func.count(Sensor.id)).scalar_subquery().label("total_sensors"),
+            select(func.count(Sensor.id)).where(Sensor.is_active == True).scalar_subquery().label("active_sensors"),
+            select(func.count(Alert.id)).where(Alert.is_resolved == False).scalar_subquery().label("unresolved_alerts"),
+            select(func.count(User.id)).scalar_subquery().label("total_users"),
+        )
+        async with AsyncSessionLocal() as session:
+            row = (await session.execute(query)).one()
+        counts = dict(row._mapping)
+
+        if self._counts is not None:
+            drift = sum(abs(counts[name] - self._counts[name]) for name in COUNTERS)
+            if drift:
+                logger.info(f"Dashboard counters reconciled, corrected drift of {drift}")
+            self.drift += drift
+        self._counts = counts
+        self._reconciled_at = time.monotonic()
+        self.reconciliations += 1
+
+    async def snapshot(self) -> Dict:
+        if self._counts is None:
+            await self.reconcile()
+        return {
+            **self._counts,
+            "readings_per_minute": self.readings_per_minute(),
+            "sensors_seen_5min": self.sensors_seen()
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.error(f"Could not reconcile dashboard counters: {e}")
+            await asyncio.sleep(self.reconcile_interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {
+            "loaded": self.loaded,
+            "reconciliations": self.reconciliations,
+            "drift_corrected": self.drift,
+            "seconds_since_reconcile": (
+                round(time.monotonic() - self._reconciled_at, 1) if self._reconciled_at is not None else None
+            )
+        }
+
+
+dashboard_counters = DashboardCounters()
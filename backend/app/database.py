@@ -1,23 +1,81 @@
+import time
+from typing import Dict
+
+from sqlalchemy import exc
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from contextlib import asynccontextmanager
 from app.config import settings
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=False,  # Set to True for SQL debugging
-    pool_size=5,
-    max_overflow=10,
-    pool_pre_ping=True,
-    pool_recycle=1800,  # Recycle connections every 30 minutes
-    pool_reset_on_return='commit',
-    connect_args={
-        "command_timeout": 30,
-        "server_settings": {
-            "application_name": "sumatosensa_backend",
+class PoolMetricsMixin:
+    """Adds checkout wait-time and timeout counters to a queue pool."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        waited = time.perf_counter() - started
+        self.checkouts += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return connection
+
+    def metrics(self) -> Dict:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2)
         }
-    }
-)
+
+class InstrumentedAsyncPool(PoolMetricsMixin, AsyncAdaptedQueuePool):
+    pass
+
+def make_engine(url: str, name: str, pool_size: int, max_overflow: int):
+    return create_async_engine(
+        url,
+        echo=False,  # Set to True for SQL debugging
+        poolclass=InstrumentedAsyncPool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+        pool_recycle=1800,  # Recycle connections every 30 minutes
+        pool_reset_on_return='commit',
+        connect_args={
+            "command_timeout": 30,
+            "server_settings": {
+                "application_name": f"sumatosensa_{name}",
+            }
+        }
+    )
+
+# Separate pools so a burst on one workload cannot starve the others
+engine = make_engine(settings.DATABASE_URL, "backend", settings.DB_API_POOL_SIZE, settings.DB_API_MAX_OVERFLOW)
+ingest_engine = make_engine(settings.DATABASE_URL, "ingest", settings.DB_INGEST_POOL_SIZE, settings.DB_INGEST_MAX_OVERFLOW)
+export_engine = make_engine(settings.DATABASE_REPLICA_URL, "export", settings.DB_EXPORT_POOL_SIZE, settings.DB_EXPORT_MAX_OVERFLOW)
+
+ENGINES = {
+    "api": engine,
+    "ingest": ingest_engine,
+    "export": export_engine,
+}
 
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -25,8 +83,28 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+IngestSessionLocal = async_sessionmaker(
+    ingest_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
+# Read-only work (exports, report rollups); may point at a replica
+ExportSessionLocal = async_sessionmaker(
+    export_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
+def pool_metrics() -> Dict[str, Dict]:
+    return {name: pool_engine.pool.metrics() for name, pool_engine in ENGINES.items()}
+
+async def dispose_engines():
+    for pool_engine in ENGINES.values():
+        await pool_engine.dispose()
+
 @asynccontextmanager
 async def get_async_session():
     """Dependency to get async database session."""
@@ -48,4 +126,4 @@ async def get_db():
             await session.rollback()
             raise
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
@@ -0,0 +1,70 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.config import settings
+
+
+class ReadingDeduplicator:
+    """Recognises the same physical reading arriving on several topics.
+
+    A reading is identified by its sensor, its device timestamp and a hash
+    of its values. Readings without a device timestamp are never treated as
+    duplicates: two consecutive readings of a stable sensor have the same
+    values, and nothing tells them apart from a re-publication. Keys are
+    remembered for `window` seconds in an insertion-ordered map capped at
+    `max_entries`, so memory stays bounded however many sensors are
+    reporting.
+    """
+
+    def __init__(self, window: Optional[float] = None, max_entries: Optional[int] = None):
+        self.window = window or settings.DEDUPE_WINDOW
+        self.max_entries = max_entries or settings.DEDUPE_MAX_ENTRIES
+        self._seen: "OrderedDict[Hashable, float]" = OrderedDict()
+
+        self.checks = 0
+        self.hits = 0
+        self.unstamped = 0
+
+    def is_duplicate(
+        self,
+        sensor_id: int,
+        timestamp: Any,
+        values: Tuple,
+        now: Optional[float] = None
+    ) -> bool:
+        if timestamp is None:
+            self.unstamped += 1
+            return False
+
+        now = time.monotonic() if now is None else now
+        self.checks += 1
+        self._evict(now)
+
+        key = (sensor_id, timestamp, hash(values))
+        if key in self._seen:
+            self.hits += 1
+            return True
+
+        self._seen[key] = now
+        if len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+        return False
+
+    def _evict(self, now: float):
+        # Entries are inserted in time order, so expired ones are at the front
+        while self._seen:
+            key, seen_at = next(iter(self._seen.items()))
+            if now - seen_at < self.window:
+                break
+            self._seen.popitem(last=False)
+
+    def stats(self) -> Dict:
+        return {
+            "tracked": len(self._seen),
+            "checks": self.checks,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.checks, 4) if self.checks else 0.0,
+            "unstamped": self.unstamped,
+            "window": self.window
+        }
@@ -0,0 +1,87 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback, same output only slower
+    orjson = None
+
+# format -> media type
+SERIES_FORMATS = {
+    "json": "application/json",
+    "columnar": "application/vnd.sumatosensa.columnar+json",
+    "msgpack": "application/msgpack",
+}
+
+ACCEPT_FORMATS = {
+    "application/vnd.sumatosensa.columnar+json": "columnar",
+    "application/msgpack": "msgpack",
+    "application/x-msgpack": "msgpack",
+    "application/json": "json",
+}
+
+
+def load_msgpack():
+    try:
+        import msgpack
+    except ImportError as e:
+        raise RuntimeError("msgpack is required for MessagePack responses") from e
+    return msgpack
+
+
+def negotiate_format(request: Request, format: Optional[str] = None) -> str:
+    """Explicit `format` parameter first, then the Accept header in client preference order."""
+    if format:
+        if format not in SERIES_FORMATS:
+            raise ValueError(f"Unknown format: {format}")
+        return format
+
+    candidates = []
+    for position, part in enumerate(request.headers.get("accept", "").split(",")):
+        media_type, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type.strip().lower() in ACCEPT_FORMATS and quality > 0:
+            candidates.append((-quality, position, ACCEPT_FORMATS[media_type.strip().lower()]))
+    return min(candidates)[2] if candidates else "json"
+
+
+def dumps_json(content: Any) -> bytes:
+    """Compact JSON; orjson when installed, objects it does not know go through jsonable_encoder."""
+    if orjson is not None:
+        return orjson.dumps(content, default=jsonable_encoder)
+    return json.dumps(jsonable_encoder(content), separators=(",", ":")).encode()
+
+
+def epoch_ms(value: Optional[datetime]) -> Optional[int]:
+    return None if value is None else int(value.timestamp() * 1000)
+
+
+def rows_to_columns(fields: Sequence[str], rows: Iterable[Sequence]) -> Dict[str, List]:
+    """Transpose row tuples into one list per field; times become epoch milliseconds."""
+    rows = list(rows)
+    columns = dict(zip(fields, (list(column) for column in zip(*rows)))) if rows else {field: [] for field in fields}
+    if "time" in columns:
+        columns["time"] = [epoch_ms(value) for value in columns["time"]]
+    return columns
+
+
+def encode_series(format: str, meta: Dict, fields: Sequence[str], rows: Iterable[Sequence]) -> Tuple[bytes, str]:
+    """Columnar ("columnar" or "msgpack") body: the metadata keys plus
+    {"time_unit": "ms", "columns": {field: [...]}}, built without per-row dicts."""
+    content = {**meta, "time_unit": "ms", "columns": rows_to_columns(fields, rows)}
+    if format == "msgpack":
+        body = load_msgpack().packb(content, default=jsonable_encoder)
+    else:
+        body = dumps_json(content)
+    return body, SERIES_FORMATS[format]
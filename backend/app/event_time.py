@@ -0,0 +1,124 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+LATE_POLICIES = ("backfill", "drop", "clamp")
+
+# Smallest start_offset of the continuous aggregate refresh policies
+# (measurements_hourly in database/init.sql). Rows backfilled further back
+# are never re-materialized, so the rollups would silently miss them.
+AGGREGATE_REFRESH_WINDOW = timedelta(days=7)
+
+# Epoch values above this are milliseconds rather than seconds
+_EPOCH_MS_THRESHOLD = 100_000_000_000
+
+
+def parse_event_time(value: Any) -> Optional[datetime]:
+    """Parse a device timestamp (ISO 8601 string, epoch seconds/ms or datetime) as UTC."""
+    if value is None or isinstance(value, bool):
+        return None
+
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, (int, float)):
+        seconds = value / 1000 if value > _EPOCH_MS_THRESHOLD else value
+        try:
+            return datetime.fromtimestamp(seconds, tz=timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            return None
+    elif isinstance(value, str):
+        text = value.strip()
+        if text.isdigit():
+            return parse_event_time(int(text))
+        try:
+            parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    else:
+        return None
+
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+class EventTimePolicy:
+    """Decides which time a reading is stored with.
+
+    Readings carry the device timestamp when there is one. Timestamps more
+    than `max_clock_skew` seconds in the future are clamped to the arrival
+    time. Readings older than `late_after` seconds are late and handled by
+    `late_policy`: ``backfill`` stores them through the backfill buffer,
+    ``clamp`` stores them at arrival time and ``drop`` discards them.
+    Readings older than `max_lateness` are always dropped; it should not
+    exceed the aggregate refresh window, or backfilled readings never
+    reach the statistics.
+    """
+
+    def __init__(
+        self,
+        max_clock_skew: Optional[float] = None,
+        late_after: Optional[float] = None,
+        max_lateness: Optional[float] = None,
+        late_policy: Optional[str] = None
+    ):
+        self.max_clock_skew = timedelta(seconds=max_clock_skew or settings.INGEST_MAX_CLOCK_SKEW)
+        self.late_after = timedelta(seconds=late_after or settings.INGEST_LATE_AFTER)
+        self.max_lateness = timedelta(seconds=max_lateness or settings.INGEST_MAX_LATENESS)
+        self.late_policy = late_policy or settings.INGEST_LATE_POLICY
+        if self.late_policy not in LATE_POLICIES:
+            raise ValueError(f"Unknown late data policy: {self.late_policy}")
+        if self.late_policy == "backfill" and self.max_lateness > AGGREGATE_REFRESH_WINDOW:
+            logger.warning(
+                f"Readings up to {self.max_lateness} late are backfilled, but the continuous aggregates "
+                f"are only refreshed {AGGREGATE_REFRESH_WINDOW} back: older ones will be missing from statistics"
+            )
+
+        self.device_time = 0
+        self.arrival_time = 0
+        self.future_clamped = 0
+        self.late = 0
+        self.late_dropped = 0
+
+    def resolve(self, raw_timestamp: Any, now: Optional[datetime] = None) -> Tuple[Optional[datetime], bool]:
+        """Return (time to store, is_backfill); the time is None when the reading is dropped."""
+        now = now or datetime.now(timezone.utc)
+        event_time = parse_event_time(raw_timestamp)
+
+        if event_time is None:
+            if raw_timestamp is not None:
+                logger.debug(f"Unparseable device timestamp {raw_timestamp!r}, using arrival time")
+            self.arrival_time += 1
+            return now, False
+
+        self.device_time += 1
+
+        if event_time > now + self.max_clock_skew:
+            self.future_clamped += 1
+            return now, False
+
+        age = now - event_time
+        if age <= self.late_after:
+            return event_time, False
+
+        self.late += 1
+        if age > self.max_lateness or self.late_policy == "drop":
+            self.late_dropped += 1
+            return None, False
+        if self.late_policy == "clamp":
+            return now, False
+        return event_time, True
+
+    def stats(self) -> Dict:
+        return {
+            "device_time": self.device_time,
+            "arrival_time": self.arrival_time,
+            "future_clamped": self.future_clamped,
+            "late": self.late,
+            "late_dropped": self.late_dropped,
+            "late_policy": self.late_policy
+        }
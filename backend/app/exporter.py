@@ -0,0 +1,306 @@
+import csv
+import io
+import zipfile
+import zlib
+from datetime import datetime, timezone
+from itertools import groupby
+from typing import AsyncIterator, List, Optional, Sequence
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import ExportSessionLocal
+from app.encoding import dumps_json, load_msgpack, rows_to_columns
+from app.models import Measurement
+
+EXPORT_FIELDS = (
+    "time",
+    "sensor_id",
+    "temperature",
+    "humidity",
+    "pressure",
+    "acceleration_x",
+    "acceleration_y",
+    "acceleration_z",
+    "rssi",
+    "battery_voltage",
+    "movement_counter",
+)
+
+EXPORT_FORMATS = {
+    "json": ("application/json", "json"),
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    # A stream of MessagePack maps, one per chunk: {field: [values...]}, times in epoch ms
+    "msgpack": ("application/msgpack", "msgpack"),
+}
+
+COLUMNAR_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+# Columnar exports can be split into one file per sensor or per UTC day, zipped
+PARTITION_KEYS = {
+    "sensor": lambda row: row[1],
+    "day": lambda row: row[0].astimezone(timezone.utc).date(),
+}
+
+PARQUET_ROW_GROUP_SIZE = 65536
+
+
+def build_export_query(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    sensor_ids: Optional[List[int]] = None,
+    partition_by: Optional[str] = None
+):
+    # Plain columns: rows are tuples, no ORM identity map to grow
+    query = select(*[getattr(Measurement, field) for field in EXPORT_FIELDS])
+    if start_date:
+        query = query.where(Measurement.time >= start_date)
+    if end_date:
+        query = query.where(Measurement.time <= end_date)
+    if sensor_ids:
+        query = query.where(Measurement.sensor_id.in_(sensor_ids))
+    # Partitions are written one after the other, so rows come grouped by partition
+    if partition_by == "sensor":
+        return query.order_by(Measurement.sensor_id, Measurement.time)
+    if partition_by == "day":
+        return query.order_by(Measurement.time)
+    return query.order_by(Measurement.time.desc())
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class ExportEncoder:
+    """Turns chunks of export rows into bytes for one output format."""
+
+    def __init__(self, format: str):
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {format}")
+        self.format = format
+        self.count = 0
+        self._msgpack = load_msgpack() if format == "msgpack" else None
+
+    def header(self) -> str:
+        if self.format == "csv":
+            return ",".join(EXPORT_FIELDS) + "\r\n"
+        if self.format == "json":
+            return '{"data": ['
+        return ""
+
+    def encode(self, rows: Sequence[Sequence]) -> bytes:
+        if self.format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow(_json_value(value) for value in row)
+                self.count += 1
+            return buffer.getvalue().encode()
+
+        if self.format == "msgpack":
+            self.count += len(rows)
+            return self._msgpack.packb(rows_to_columns(EXPORT_FIELDS, rows)) if rows else b""
+
+        lines = []
+        for row in rows:
+            line = dumps_json(dict(zip(EXPORT_FIELDS, row)))
+            if self.format == "json" and self.count:
+                line = b", " + line
+            lines.append(line)
+            self.count += 1
+        if self.format == "ndjson":
+            return b"".join(line + b"\n" for line in lines)
+        return b"".join(lines)
+
+    def footer(self, exported_at: datetime) -> str:
+        if self.format == "json":
+            return f'], "count": {self.count}, "exported_at": "{exported_at.isoformat()}"}}'
+        return ""
+
+
+async def encode_chunks(
+    chunks: AsyncIterator[Sequence[Sequence]],
+    format: str,
+    compress: bool = False
+) -> AsyncIterator[bytes]:
+    """Encode row chunks one at a time, optionally gzip-compressed."""
+    encoder = ExportEncoder(format)
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def emit(text) -> bytes:
+        data = text.encode() if isinstance(text, str) else text
+        return compressor.compress(data) if compressor else data
+
+    yield emit(encoder.header())
+    async for rows in chunks:
+        data = emit(encoder.encode(rows))
+        if data:
+            yield data
+    yield emit(encoder.footer(datetime.utcnow()))
+    if compressor:
+        yield compressor.flush()
+
+
+def load_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("pyarrow is required for Parquet and Arrow exports") from e
+    return pyarrow
+
+
+def export_schema(pa):
+    return pa.schema([
+        ("time", pa.timestamp("us", tz="UTC")),
+        ("sensor_id", pa.int32()),
+        ("temperature", pa.float64()),
+        ("humidity", pa.float64()),
+        ("pressure", pa.float64()),
+        ("acceleration_x", pa.float64()),
+        ("acceleration_y", pa.float64()),
+        ("acceleration_z", pa.float64()),
+        ("rssi", pa.int32()),
+        ("battery_voltage", pa.float64()),
+        ("movement_counter", pa.int32()),
+    ])
+
+
+class _ByteSink(io.RawIOBase):
+    """Write-only, non-seekable file whose contents are drained as they are produced."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ColumnarWriter:
+    """Writes row chunks as Arrow record batches to a Parquet file or Arrow IPC stream."""
+
+    def __init__(self, format: str):
+        pa = load_pyarrow()
+        self.pa = pa
+        self.format = format
+        self.schema = export_schema(pa)
+        self.sink = _ByteSink()
+        self._pending = []
+        self._pending_rows = 0
+        if format == "parquet":
+            self.writer = pa.parquet.ParquetWriter(self.sink, self.schema, compression="zstd")
+        elif format == "arrow":
+            self.writer = pa.ipc.new_stream(self.sink, self.schema)
+        else:
+            raise ValueError(f"Unknown columnar format: {format}")
+
+    def to_batch(self, rows: Sequence[Sequence]):
+        # Transpose the row tuples into one array per column
+        columns = zip(*rows)
+        return self.pa.record_batch(
+            [self.pa.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema
+        )
+
+    def write(self, rows: Sequence[Sequence]):
+        if not rows:
+            return
+        batch = self.to_batch(rows)
+        if self.format == "arrow":
+            self.writer.write_batch(batch)
+            return
+        # Parquet row groups much smaller than the cursor chunk compress poorly
+        self._pending.append(batch)
+        self._pending_rows += batch.num_rows
+        if self._pending_rows >= PARQUET_ROW_GROUP_SIZE:
+            self._write_row_group()
+
+    def _write_row_group(self):
+        if self._pending:
+            self.writer.write_table(self.pa.Table.from_batches(self._pending, schema=self.schema))
+            self._pending, self._pending_rows = [], 0
+
+    def drain(self) -> bytes:
+        return self.sink.drain()
+
+    def close(self) -> bytes:
+        if self.format == "parquet":
+            self._write_row_group()
+        self.writer.close()
+        return self.drain()
+
+
+async def encode_columnar(
+    chunks: AsyncIterator[Sequence[Sequence]],
+    format: str,
+    partition_by: Optional[str] = None
+) -> AsyncIterator[bytes]:
+    """Encode row chunks as Parquet/Arrow, or as a zip with one file per partition."""
+    if partition_by is None:
+        writer = ColumnarWriter(format)
+        async for rows in chunks:
+            writer.write(rows)
+            data = writer.drain()
+            if data:
+                yield data
+        yield writer.close()
+        return
+
+    extension = COLUMNAR_FORMATS[format][1]
+    key_of = PARTITION_KEYS[partition_by]
+    archive_sink = _ByteSink()
+    # Entries are already compressed, store them as they are
+    archive = zipfile.ZipFile(archive_sink, "w", compression=zipfile.ZIP_STORED)
+    current_key, writer, entry = None, None, None
+
+    async for rows in chunks:
+        for key, group in groupby(rows, key=key_of):
+            if writer is None or key != current_key:
+                if writer is not None:
+                    entry.write(writer.close())
+                    entry.close()
+                current_key, writer = key, ColumnarWriter(format)
+                entry = archive.open(f"{partition_by}_{key}.{extension}", "w", force_zip64=True)
+            writer.write(list(group))
+            entry.write(writer.drain())
+        data = archive_sink.drain()
+        if data:
+            yield data
+
+    if writer is not None:
+        entry.write(writer.close())
+        entry.close()
+    archive.close()
+    yield archive_sink.drain()
+
+
+async def stream_measurements(query, chunk_size: Optional[int] = None) -> AsyncIterator[Sequence[Sequence]]:
+    """Fetch rows through a server-side cursor, chunk_size rows at a time.
+
+    Uses its own session: the generator outlives the request's dependencies.
+    The next chunk is only fetched once the client has consumed the previous
+    one, so memory stays bounded and slow clients slow the cursor down.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    async with ExportSessionLocal() as session:
+        result = await session.stream(query.execution_options(yield_per=chunk_size))
+        async for partition in result.partitions(chunk_size):
+            yield partition
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError
+
+from app.config import settings
+from app.database import IngestSessionLocal
+from app.models import Measurement
+
+logger = logging.getLogger(__name__)
+
+
+class MeasurementWriter:
+    """Write-behind buffer that flushes measurements as multi-row inserts.
+
+    Rows are flushed when `batch_size` rows are pending or every
+    `flush_interval` seconds, whichever comes first. At most `max_backlog`
+    rows are kept in memory; beyond that the oldest rows are dropped.
+
+    Late readings (e.g. a gateway emptying its buffer after reconnecting)
+    go to a separate backfill buffer. It is written on the flush interval
+    in larger batches sorted by time, so each batch touches as few
+    TimescaleDB chunks as possible and does not delay live readings.
+    """
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_backlog: Optional[int] = None,
+        backfill_batch_size: Optional[int] = None
+    ):
+        self.batch_size = batch_size or settings.INGEST_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.INGEST_FLUSH_INTERVAL
+        self.max_backlog = max_backlog or settings.INGEST_MAX_BACKLOG
+        self.backfill_batch_size = backfill_batch_size or settings.INGEST_BACKFILL_BATCH_SIZE
+
+        self._buffer: Deque[Dict] = deque()
+        self._backfill: Deque[Dict] = deque()
+        self._flush_requested = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[List[Dict]], Awaitable[None]]] = []
+        self.running = False
+
+        self.written = 0
+        self.backfilled = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.flushes = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    @property
+    def pending_backfill(self) -> int:
+        return len(self._backfill)
+
+    def add_listener(self, listener: Callable[[List[Dict]], Awaitable[None]]):
+        """Register a coroutine called with every batch of rows once it is stored."""
+        self._listeners.append(listener)
+
+    def add(self, row: Dict, backfill: bool = False):
+        buffer = self._backfill if backfill else self._buffer
+        if len(buffer) >= self.max_backlog:
+            buffer.popleft()
+            self.dropped += 1
+        buffer.append(row)
+
+        if not backfill and len(buffer) >= self.batch_size:
+            self._flush_requested.set()
+
+    async def flush(self, include_backfill: bool = True):
+        """Write every pending row, one batch at a time."""
+        async with self._flush_lock:
+            if not await self._flush_buffer(self._buffer, self.batch_size):
+                return
+            if include_backfill:
+                await self._flush_buffer(self._backfill, self.backfill_batch_size, sort=True)
+
+    async def _flush_buffer(self, buffer: Deque[Dict], batch_size: int, sort: bool = False) -> bool:
+        while buffer:
+            batch = [buffer.popleft() for _ in range(min(batch_size, len(buffer)))]
+            if sort:
+                batch.sort(key=lambda row: row["time"])
+            try:
+                await self._write(batch)
+                if sort:
+                    self.backfilled += len(batch)
+            except Exception as e:
+                logger.error(f"Error flushing {len(batch)} measurements: {e}")
+                self._requeue(buffer, batch)
+                return False
+        return True
+
+    async def _write(self, batch: List[Dict]):
+        stored = batch
+        async with IngestSessionLocal() as session:
+            try:
+                await session.execute(insert(Measurement), batch)
+                await session.commit()
+                self.written += len(batch)
+            except DBAPIError as e:
+                # One bad row (e.g. a NOT NULL violation) must not take the
+                # whole batch down with it: retry row by row and skip culprits.
+                await session.rollback()
+                if e.connection_invalidated:
+                    raise
+                logger.warning(f"Batch insert failed, retrying {len(batch)} rows individually: {e}")
+                stored = []
+                for row in batch:
+                    try:
+                        async with session.begin_nested():
+                            await session.execute(insert(Measurement), [row])
+                        stored.append(row)
+                        self.written += 1
+                    except DBAPIError as row_error:
+                        self.rejected += 1
+                        logger.debug(f"Rejected measurement for sensor {row.get('sensor_id')}: {row_error}")
+                await session.commit()
+        self.flushes += 1
+        logger.debug(f"Flushed {len(batch)} measurements")
+        await self._notify(stored)
+
+    async def _notify(self, rows: List[Dict]):
+        if not rows:
+            return
+        for listener in self._listeners:
+            try:
+                await listener(rows)
+            except Exception as e:
+                logger.error(f"Error in measurement listener {getattr(listener, '__qualname__', listener)}: {e}")
+
+    def _requeue(self, buffer: Deque[Dict], batch: List[Dict]):
+        """Put a failed batch back at the head of its buffer, within the backlog limit."""
+        room = self.max_backlog - len(buffer)
+        if room < len(batch):
+            self.dropped += len(batch) - max(room, 0)
+            batch = batch[len(batch) - max(room, 0):]
+        buffer.extendleft(reversed(batch))
+
+    async def _run(self):
+        last_backfill = time.monotonic()
+        while self.running:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+
+            # Size-triggered flushes only write live rows, backfill waits for the interval
+            include_backfill = time.monotonic() - last_backfill >= self.flush_interval
+            if include_backfill:
+                last_backfill = time.monotonic()
+            await self.flush(include_backfill=include_backfill)
+
+    def start(self):
+        if self._task and not self._task.done():
+            return
+        self.running = True
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and write whatever is still buffered."""
+        self.running = False
+        if self._task and not self._task.done():
+            self._flush_requested.set()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+
+    def stats(self) -> Dict:
+        return {
+            "pending": self.pending,
+            "pending_backfill": self.pending_backfill,
+            "written": self.written,
+            "backfilled": self.backfilled,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "flushes": self.flushes,
+            "batch_size": self.batch_size,
+            "backfill_batch_size": self.backfill_batch_size,
+            "flush_interval": self.flush_interval,
+            "max_backlog": self.max_backlog
+        }
@@ -0,0 +1,150 @@
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, func, or_, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database import IngestSessionLocal
+from app.models import Sensor, SensorLatest
+
+logger = logging.getLogger(__name__)
+
+LATEST_FIELDS = (
+    "temperature",
+    "humidity",
+    "pressure",
+    "acceleration_x",
+    "acceleration_y",
+    "acceleration_z",
+    "rssi",
+    "battery_voltage",
+    "movement_counter",
+)
+
+# Same scale as the frontend's voltageToPercent: 2.5 V is empty, 3.0 V is full
+BATTERY_EMPTY_VOLTAGE = 2.5
+BATTERY_FULL_VOLTAGE = 3.0
+
+# Seeds sensor_latest from the hypertable for sensors that have no row yet
+# (e.g. readings stored before the table existed). One index seek per sensor.
+SEED_MISSING_SQL = text(f"""
+    INSERT INTO sensor_latest (sensor_id, time, {", ".join(LATEST_FIELDS)})
+    SELECT s.id, m.time, {", ".join(f"m.{field}" for field in LATEST_FIELDS)}
+    FROM sensors s
+    CROSS JOIN LATERAL (
+        SELECT * FROM measurements
+        WHERE measurements.sensor_id = s.id
+        ORDER BY time DESC
+        LIMIT 1
+    ) m
+    WHERE NOT EXISTS (SELECT 1 FROM sensor_latest l WHERE l.sensor_id = s.id)
+    ON CONFLICT (sensor_id) DO NOTHING
+""")
+
+
+def battery_level_from_voltage(voltage: Optional[float]) -> Optional[float]:
+    if voltage is None:
+        return None
+    level = (voltage - BATTERY_EMPTY_VOLTAGE) / (BATTERY_FULL_VOLTAGE - BATTERY_EMPTY_VOLTAGE) * 100
+    return float(max(0, min(100, round(level))))
+
+
+class LatestReadings:
+    """Newest reading per sensor, kept in memory and in the sensor_latest table.
+
+    The measurement writer hands every stored batch to `record`, which
+    updates the in-memory map, upserts sensor_latest and fills
+    `sensors.last_seen` / `sensors.battery_level`. Read endpoints answer
+    from `get` without touching the measurements hypertable.
+    """
+
+    def __init__(self):
+        self._latest: Dict[int, Dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    async def warm(self):
+        async with IngestSessionLocal() as session:
+            await session.execute(SEED_MISSING_SQL)
+            await session.commit()
+
+            result = await session.execute(select(SensorLatest))
+            self._latest = {
+                latest.sensor_id: {"time": latest.time, **{field: getattr(latest, field) for field in LATEST_FIELDS}}
+                for latest in result.scalars()
+            }
+        logger.info(f"Latest readings warmed for {len(self._latest)} sensors")
+
+    def get(self, sensor_id: int) -> Optional[Dict]:
+        return self._latest.get(sensor_id)
+
+    def sensor_ids(self) -> List[int]:
+        return list(self._latest)
+
+    def remember(self, sensor_id: int, reading: Dict):
+        current = self._latest.get(sensor_id)
+        if current is None or reading["time"] >= current["time"]:
+            self._latest[sensor_id] = reading
+
+    def forget(self, sensor_id: int):
+        self._latest.pop(sensor_id, None)
+
+    def update(self, rows: Iterable[Dict]) -> List[Dict]:
+        """Apply stored rows to the in-memory map; return the rows that became the newest."""
+        newest: Dict[int, Dict] = {}
+        for row in rows:
+            sensor_id = row["sensor_id"]
+            candidate = newest.get(sensor_id) or self._latest.get(sensor_id)
+            if candidate is None or row["time"] >= candidate["time"]:
+                newest[sensor_id] = row
+
+        for sensor_id, row in newest.items():
+            self._latest[sensor_id] = {"time": row["time"], **{field: row.get(field) for field in LATEST_FIELDS}}
+        return list(newest.values())
+
+    async def record(self, rows: List[Dict]):
+        """Writer listener: update memory, then persist the newest row per sensor."""
+        newest = self.update(rows)
+        if not newest:
+            return
+
+        latest_rows = [
+            {"sensor_id": row["sensor_id"], "time": row["time"], **{field: row.get(field) for field in LATEST_FIELDS}}
+            for row in newest
+        ]
+        upsert = insert(SensorLatest).values(latest_rows)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[SensorLatest.sensor_id],
+            set_={
+                **{field: upsert.excluded[field] for field in ("time", *LATEST_FIELDS)},
+                "updated_at": func.now()
+            },
+            where=SensorLatest.time <= upsert.excluded.time
+        )
+
+        sensors = Sensor.__table__
+        touch_sensor = (
+            update(sensors)
+            .where(sensors.c.id == bindparam("b_sensor_id"))
+            .where(or_(sensors.c.last_seen.is_(None), sensors.c.last_seen < bindparam("b_time")))
+            .values(
+                last_seen=bindparam("b_time"),
+                battery_level=func.coalesce(bindparam("b_battery_level"), sensors.c.battery_level)
+            )
+        )
+
+        async with IngestSessionLocal() as session:
+            await session.execute(upsert)
+            await session.execute(touch_sensor, [
+                {
+                    "b_sensor_id": row["sensor_id"],
+                    "b_time": row["time"],
+                    "b_battery_level": battery_level_from_voltage(row.get("battery_voltage"))
+                }
+                for row in newest
+            ])
+            await session.commit()
+
+
+latest_readings = LatestReadings()
@@ -0,0 +1,175 @@
+import asyncio
+import itertools
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.config import settings
+from app.latest_store import LATEST_FIELDS, latest_readings
+
+logger = logging.getLogger(__name__)
+
+
+def reading_json(sensor_id: int, reading: Dict) -> str:
+    time = reading.get("time")
+    return json.dumps({
+        "sensor_id": sensor_id,
+        "time": time.isoformat() if isinstance(time, datetime) else time,
+        **{field: reading.get(field) for field in LATEST_FIELDS}
+    })
+
+
+def readings_message(readings: Iterable[str]) -> str:
+    """One message carrying several already-serialized readings."""
+    return '{"type": "readings", "data": [' + ", ".join(readings) + "]}"
+
+
+class Subscriber:
+    """One connected client: its sensor filter and its outgoing message queue."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, sensor_ids: Optional[Iterable[int]], queue_size: int):
+        self.id = next(self._ids)
+        self.sensor_ids: Optional[Set[int]] = set(sensor_ids) if sensor_ids is not None else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.evicted = False
+
+    async def next_message(self) -> Optional[str]:
+        """Next message to send, or None once the subscriber has been evicted."""
+        return await self.queue.get()
+
+
+class LiveHub:
+    """Fans out stored readings to WebSocket / SSE clients.
+
+    The measurement writer hands every stored batch to `publish`, which
+    only keeps the newest reading per sensor. A flush task sends those at
+    most `max_rate` times per second per sensor: each reading is
+    serialized once, and every subscriber gets a single batched message per
+    flush (and one for its snapshot) with the readings it is interested in.
+    A client that falls `queue_size` batches behind is evicted rather than
+    buffered without bound.
+    """
+
+    def __init__(self, max_rate: Optional[float] = None, queue_size: Optional[int] = None):
+        self.max_rate = max_rate or settings.LIVE_MAX_RATE
+        self.queue_size = queue_size or settings.LIVE_CLIENT_QUEUE_SIZE
+        self._subscribers: Dict[int, Subscriber] = {}
+        self._pending: Dict[int, Dict] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        self.published = 0
+        self.coalesced = 0
+        self.sent = 0
+        self.evicted = 0
+
+    def subscribe(self, sensor_ids: Optional[Iterable[int]] = None) -> Subscriber:
+        subscriber = Subscriber(sensor_ids, self.queue_size)
+        self._subscribers[subscriber.id] = subscriber
+        self.send_snapshot(subscriber)
+        return subscriber
+
+    def update_subscription(self, subscriber: Subscriber, sensor_ids: Optional[Iterable[int]]):
+        subscriber.sensor_ids = set(sensor_ids) if sensor_ids is not None else None
+        self.send_snapshot(subscriber)
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.pop(subscriber.id, None)
+
+    def send_snapshot(self, subscriber: Subscriber):
+        """Queue the latest known reading of each subscribed sensor, from memory, as one message."""
+        sensor_ids = subscriber.sensor_ids if subscriber.sensor_ids is not None else latest_readings.sensor_ids()
+        readings = []
+        for sensor_id in sensor_ids:
+            reading = latest_readings.get(sensor_id)
+            if reading is not None:
+                readings.append(reading_json(sensor_id, reading))
+        if readings:
+            self._deliver(subscriber, readings_message(readings))
+
+    async def publish(self, rows: List[Dict]):
+        """Writer listener: remember the newest reading per sensor until the next flush."""
+        for row in rows:
+            self.published += 1
+            current = self._pending.get(row["sensor_id"])
+            if current is not None:
+                if row["time"] < current["time"]:
+                    continue
+                self.coalesced += 1
+            self._pending[row["sensor_id"]] = row
+
+    def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        readings = {sensor_id: reading_json(sensor_id, row) for sensor_id, row in pending.items()}
+        everything = None
+
+        for subscriber in list(self._subscribers.values()):
+            if subscriber.sensor_ids is None:
+                # Unfiltered clients all share the same batch
+                if everything is None:
+                    everything = readings_message(readings.values())
+                self._deliver(subscriber, everything)
+                continue
+            wanted = [readings[sensor_id] for sensor_id in subscriber.sensor_ids if sensor_id in readings]
+            if wanted:
+                self._deliver(subscriber, readings_message(wanted))
+
+    def _deliver(self, subscriber: Subscriber, message: str) -> bool:
+        try:
+            subscriber.queue.put_nowait(message)
+            self.sent += 1
+            return True
+        except asyncio.QueueFull:
+            self._evict(subscriber)
+            return False
+
+    def _evict(self, subscriber: Subscriber):
+        logger.warning(f"Evicting slow live subscriber {subscriber.id}")
+        self.evicted += 1
+        self.close(subscriber)
+
+    def close(self, subscriber: Subscriber):
+        self.unsubscribe(subscriber)
+        subscriber.evicted = True
+        # Drop what it could not keep up with and wake it up with the end marker
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    async def _run(self):
+        interval = 1.0 / self.max_rate
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error while pushing live readings: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for subscriber in list(self._subscribers.values()):
+            self.close(subscriber)
+
+    def stats(self) -> Dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "coalesced": self.coalesced,
+            "sent": self.sent,
+            "evicted": self.evicted,
+            "max_rate": self.max_rate
+        }
+
+
+live_hub = LiveHub()
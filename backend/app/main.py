@@ -1,16 +1,23 @@
+import asyncio
 import logging
-from typing import List
+from typing import List, Optional
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends, HTTPException
 from app.database import get_db
 
-from app.database import engine
+from app.database import dispose_engines, engine
+from app.pagination import NEXT_CURSOR_HEADER
 from app.models import Base
 from app.mqtt_client import start_mqtt_client, stop_mqtt_client
-from app.routes import auth, admin, sensors
+from app.routes import auth, admin, sensors, reports
+from app.reports import report_jobs
+from app.live import live_hub
+from app.counters import dashboard_counters
+from app.storage import apply_storage_policies
 from app.config import settings
 from app.auth import register_user
 
@@ -22,15 +29,16 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Sumātosensā backend...")
     
     # Retry database connection with exponential backoff
-    import asyncio
     max_retries = 5
     retry_delay = 2
+    connected = False
     
     for attempt in range(max_retries):
         try:
             async with engine.begin() as conn:
                 await conn.run_sync(Base.metadata.create_all)
             logger.info("Database connection established successfully")
+            connected = True
             break
         except Exception as e:
             logger.error(f"Database connection attempt {attempt + 1}/{max_retries} failed: {e}")
@@ -41,9 +49,23 @@ async def lifespan(app: FastAPI):
             await asyncio.sleep(retry_delay)
             retry_delay *= 2  # Exponential backoff
     
+    # Not a connection problem: a failure here must not trigger a retry
+    if connected and settings.MANAGE_STORAGE_POLICIES:
+        try:
+            await apply_storage_policies()
+        except Exception as e:
+            logger.warning(f"Could not apply storage policies: {e}")
+    
+    live_hub.start()
     await start_mqtt_client()
+    await report_jobs.start()
+    dashboard_counters.start()
     yield
+    await dashboard_counters.stop()
+    await report_jobs.stop()
     await stop_mqtt_client()
+    await live_hub.stop()
+    await dispose_engines()
 
 app = FastAPI(title="Sumātosensā API", version="1.0.0", lifespan=lifespan)
 
@@ -53,6 +75,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 @app.get("/")
@@ -66,6 +89,83 @@ async def health_check():
 app.include_router(auth.router)
 app.include_router(admin.router)
 app.include_router(sensors.router)
+app.include_router(reports.router)
+
+def parse_sensor_ids(value: Optional[str]) -> Optional[List[int]]:
+    """"1,2,3" -> [1, 2, 3]; empty means every sensor."""
+    if not value:
+        return None
+    return [int(part) for part in value.split(",") if part.strip()]
+
+@app.websocket("/ws")
+async def live_readings_ws(websocket: WebSocket, sensors: Optional[str] = None):
+    """Live readings, batched as {"type": "readings", "data": [...]}. Send {"subscribe": [1, 2]} (or null for all) to change sensors."""
+    await websocket.accept()
+    try:
+        subscriber = live_hub.subscribe(parse_sensor_ids(sensors))
+    except ValueError:
+        await websocket.close(code=1003, reason="Liste de capteurs invalide")
+        return
+    
+    async def receive_subscriptions():
+        try:
+            while True:
+                message = await websocket.receive_json()
+                if isinstance(message, dict) and "subscribe" in message:
+                    sensor_ids = message["subscribe"]
+                    live_hub.update_subscription(subscriber, [int(i) for i in sensor_ids] if sensor_ids is not None else None)
+        finally:
+            # Client gone or sent garbage: wake the sending loop up
+            live_hub.close(subscriber)
+    
+    receiver = asyncio.create_task(receive_subscriptions())
+    try:
+        while True:
+            message = await subscriber.next_message()
+            if message is None:
+                if not receiver.done():
+                    await websocket.close(code=1013, reason="Client trop lent")
+                break
+            await websocket.send_text(message)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.warning(f"Live WebSocket closed: {e}")
+    finally:
+        receiver.cancel()
+        live_hub.unsubscribe(subscriber)
+
+@app.get("/events")
+async def live_readings_sse(request: Request, sensors: Optional[str] = Query(None, description="Identifiants de capteurs séparés par des virgules")):
+    """Live readings as Server-Sent Events."""
+    try:
+        sensor_ids = parse_sensor_ids(sensors)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Liste de capteurs invalide")
+    subscriber = live_hub.subscribe(sensor_ids)
+    
+    async def event_stream():
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.next_message(), timeout=settings.LIVE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is None:
+                    yield "event: evicted\ndata: {}\n\n"
+                    break
+                yield f"data: {message}\n\n"
+        finally:
+            live_hub.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 
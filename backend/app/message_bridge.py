@@ -0,0 +1,201 @@
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "spill")
+
+Message = Tuple[str, str, float]
+
+
+class MessageBridge:
+    """Hands MQTT messages from paho's network thread to the asyncio loop.
+
+    Messages submitted from the paho thread are collected in a small
+    thread-side batch and moved into a bounded `asyncio.Queue` with a
+    single `call_soon_threadsafe` per batch. When the queue is full the
+    overflow policy decides what happens:
+
+    - ``block``: the paho thread waits for room (backpressure to the broker)
+    - ``drop_oldest``: the oldest queued message is discarded
+    - ``spill``: the message is appended to a file and replayed later
+    """
+
+    def __init__(
+        self,
+        maxsize: Optional[int] = None,
+        overflow_policy: Optional[str] = None,
+        spill_path: Optional[str] = None
+    ):
+        self.maxsize = maxsize or settings.MQTT_QUEUE_MAXSIZE
+        self.overflow_policy = overflow_policy or settings.MQTT_OVERFLOW_POLICY
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown MQTT overflow policy: {self.overflow_policy}")
+        self.spill_path = spill_path or settings.MQTT_SPILL_PATH
+
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=self.maxsize)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.closed = False
+
+        self._pending: List[Message] = []
+        self._pending_lock = threading.Lock()
+        self._drain_scheduled = False
+        self._spill_lock = threading.Lock()
+        # Counters are bumped from both paho's thread and the event loop
+        self._stats_lock = threading.Lock()
+        self._spilled_pending = 0
+
+        self.received = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.replayed = 0
+
+    def _count(self, **deltas: int):
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.closed = False
+        if self.overflow_policy == "spill":
+            self._spilled_pending = self._count_spilled()
+
+    def submit(self, message: Message):
+        """Called from the paho network thread."""
+        if self.closed or self.loop is None or self.loop.is_closed():
+            self._count(dropped=1)
+            return
+
+        if self.overflow_policy == "block":
+            future = asyncio.run_coroutine_threadsafe(self.queue.put(message), self.loop)
+            while True:
+                try:
+                    future.result(timeout=0.5)
+                    break
+                except concurrent.futures.TimeoutError:
+                    # Don't hold the paho thread hostage while we are shutting down
+                    if self.closed:
+                        future.cancel()
+                        self._count(dropped=1)
+                        return
+            self._count(received=1)
+            return
+
+        overflow = None
+        self._count(received=1)
+        with self._pending_lock:
+            if len(self._pending) >= self.maxsize:
+                # The loop is not keeping up at all, don't let the batch grow unbounded
+                overflow = self._pending.pop(0)
+            self._pending.append(message)
+            schedule = not self._drain_scheduled
+            self._drain_scheduled = True
+
+        if overflow is not None:
+            if self.overflow_policy == "spill":
+                self._spill([overflow])
+            else:
+                self._count(dropped=1)
+        if schedule:
+            self.loop.call_soon_threadsafe(self._drain_pending)
+
+    def close(self):
+        """Stop accepting messages; blocked submitters give up."""
+        self.closed = True
+
+    def _drain_pending(self):
+        with self._pending_lock:
+            messages, self._pending = self._pending, []
+            self._drain_scheduled = False
+
+        overflow = []
+        for message in messages:
+            if self.queue.full():
+                if self.overflow_policy == "spill":
+                    overflow.append(message)
+                    continue
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self._count(dropped=1)
+            self.queue.put_nowait(message)
+
+        if overflow:
+            self._spill(overflow)
+
+    def _spill(self, messages: List[Message]):
+        try:
+            with self._spill_lock, open(self.spill_path, "a", encoding="utf-8") as spill_file:
+                for topic, payload, _ in messages:
+                    spill_file.write(json.dumps([topic, payload]) + "\n")
+            self._count(spilled=len(messages), _spilled_pending=len(messages))
+        except OSError as e:
+            logger.error(f"Could not spill {len(messages)} MQTT messages to {self.spill_path}: {e}")
+            self._count(dropped=len(messages))
+
+    async def replay_spilled(self):
+        """Move spilled messages back into the queue once it has drained to half full."""
+        if not self._spilled_pending or self.queue.qsize() > self.maxsize // 2:
+            return
+
+        lines = await asyncio.to_thread(self._take_spilled, self.maxsize - self.queue.qsize())
+        received_at = time.monotonic()
+        for line in lines:
+            try:
+                topic, payload = json.loads(line)
+            except (ValueError, TypeError):
+                logger.warning(f"Skipping unreadable spilled MQTT message: {line[:100]}")
+                continue
+            if self.queue.full():
+                self._spill([(topic, payload, received_at)])
+                continue
+            self.queue.put_nowait((topic, payload, received_at))
+            self._count(replayed=1)
+
+    def _take_spilled(self, limit: int) -> List[str]:
+        with self._spill_lock:
+            try:
+                with open(self.spill_path, "r", encoding="utf-8") as spill_file:
+                    lines = spill_file.read().splitlines()
+            except FileNotFoundError:
+                with self._stats_lock:
+                    self._spilled_pending = 0
+                return []
+
+            taken, remaining = lines[:limit], lines[limit:]
+            if remaining:
+                with open(self.spill_path, "w", encoding="utf-8") as spill_file:
+                    spill_file.write("\n".join(remaining) + "\n")
+            else:
+                os.remove(self.spill_path)
+            with self._stats_lock:
+                self._spilled_pending = len(remaining)
+            return taken
+
+    def _count_spilled(self) -> int:
+        try:
+            with open(self.spill_path, "r", encoding="utf-8") as spill_file:
+                return sum(1 for _ in spill_file)
+        except FileNotFoundError:
+            return 0
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                "queue_depth": self.queue.qsize(),
+                "maxsize": self.maxsize,
+                "overflow_policy": self.overflow_policy,
+                "received": self.received,
+                "dropped": self.dropped,
+                "spilled": self.spilled,
+                "replayed": self.replayed,
+                "spilled_pending": self._spilled_pending
+            }
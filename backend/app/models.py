@@ -51,6 +51,22 @@ class Measurement(Base):
     
     sensor = relationship("Sensor", back_populates="measurements")
 
+class SensorLatest(Base):
+    __tablename__ = "sensor_latest"
+    
+    sensor_id = Column(Integer, ForeignKey("sensors.id", ondelete="CASCADE"), primary_key=True)
+    time = Column(DateTime(timezone=True), nullable=False)
+    temperature = Column(Float)
+    humidity = Column(Float)
+    pressure = Column(Float)
+    acceleration_x = Column(Float)
+    acceleration_y = Column(Float)
+    acceleration_z = Column(Float)
+    rssi = Column(Integer)
+    battery_voltage = Column(Float)
+    movement_counter = Column(Integer)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class AlertThreshold(Base):
     __tablename__ = "alert_thresholds"
     
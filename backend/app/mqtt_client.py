@@ -1,16 +1,66 @@
 import asyncio
 import json
 import logging
-from datetime import datetime
-from typing import  Optional
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import  Any, Dict, List, Optional
 import paho.mqtt.client as mqtt
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import AsyncSessionLocal
-from app.models import Sensor, Measurement
+from app.config import settings
+from app.ingestion import MeasurementWriter
+from app.message_bridge import MessageBridge
+from app.reading_merger import PARTIAL_TOPICS, ReadingMerger
+from app.deduplicator import ReadingDeduplicator
+from app.event_time import EventTimePolicy
+from app.sensor_registry import sensor_registry
+from app.latest_store import latest_readings
+from app.alerts import alert_engine
+from app.live import live_hub
+from app.cache import response_cache
+from app.counters import dashboard_counters
 import os
 
 logger = logging.getLogger(__name__)
 
+class WorkerStats:
+    """Counters for one message worker."""
+    
+    RATE_WINDOW = 5.0
+    
+    def __init__(self):
+        self.processed = 0
+        self.errors = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.rate = 0.0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+    
+    def record(self, lag: float):
+        self.processed += 1
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        
+        self._window_count += 1
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= self.RATE_WINDOW:
+            self.rate = self._window_count / elapsed
+            self._window_start = now
+            self._window_count = 0
+    
+    def as_dict(self, queue_depth: int) -> Dict:
+        # A worker that has been idle for a whole window is not processing anything
+        idle = time.monotonic() - self._window_start > 2 * self.RATE_WINDOW
+        return {
+            "queue_depth": queue_depth,
+            "processed": self.processed,
+            "errors": self.errors,
+            "messages_per_second": 0.0 if idle else round(self.rate, 2),
+            "last_lag_seconds": round(self.last_lag, 4),
+            "max_lag_seconds": round(self.max_lag, 4)
+        }
+
 class MQTTClient:
     def __init__(self):
         self.client = mqtt.Client()
@@ -25,10 +75,30 @@ class MQTTClient:
         self.hetic_broker_port = int(os.getenv("HETIC_MQTT_PORT", "8818"))  # Groupe 1
         
         self.connected = False
-        self.message_queue = asyncio.Queue()
+        self.bridge = MessageBridge()
+        self.message_queue = self.bridge.queue
         self.processor_task = None
         self.running = False
         
+        # Messages are sharded by sensor so that readings from one device
+        # are always handled in order by the same worker
+        self.worker_count = max(1, settings.MQTT_WORKERS)
+        self.worker_queues: List[asyncio.Queue] = [
+            asyncio.Queue(maxsize=settings.MQTT_WORKER_QUEUE_SIZE) for _ in range(self.worker_count)
+        ]
+        self.worker_stats: List[WorkerStats] = [WorkerStats() for _ in range(self.worker_count)]
+        self.worker_tasks: List[asyncio.Task] = []
+        self.writer = MeasurementWriter()
+        self.writer.add_listener(latest_readings.record)
+        self.writer.add_listener(alert_engine.process)
+        self.writer.add_listener(live_hub.publish)
+        self.writer.add_listener(response_cache.on_measurements)
+        self.writer.add_listener(dashboard_counters.on_measurements)
+        self.merger = ReadingMerger()
+        self.deduplicator = ReadingDeduplicator()
+        self.event_time = EventTimePolicy()
+        self.merge_task = None
+        
     def on_connect(self, client, userdata, flags, rc):
         if rc == 0:
             self.connected = True
@@ -63,8 +133,8 @@ class MQTTClient:
             topic = msg.topic
             payload = msg.payload.decode('utf-8')
             
-            # Store message for async processing
-            self.message_queue.put_nowait((topic, payload))
+            # Hand the message over to the asyncio loop for processing
+            self.bridge.submit((topic, payload, time.monotonic()))
             
         except Exception as e:
             logger.error(f"Error processing MQTT message: {e}")
@@ -99,44 +169,55 @@ class MQTTClient:
 
     async def handle_ruuvitag_data(self, sensor_id: str, measurement_type: str, payload: str):
         try:
-            async with AsyncSessionLocal() as session:
-                sensor = await self.get_or_create_sensor(session, sensor_id)
+            db_sensor_id = await self.get_or_create_sensor(sensor_id)
+            
+            if measurement_type == "data":
+                data = json.loads(payload)
+                if not self.merger.add_full(db_sensor_id):
+                    logger.debug(f"Skipping /data for sensor {db_sensor_id}, already merged from partial topics")
+                    return
+                self.store_measurement(
+                    db_sensor_id, 
+                    data.get("temperature"),
+                    data.get("humidity"),
+                    data.get("pressure"),
+                    data.get("acceleration_x"),
+                    data.get("acceleration_y"), 
+                    data.get("acceleration_z"),
+                    data.get("rssi"),
+                    data.get("battery_voltage"),
+                    data.get("movement_counter"),
+                    timestamp=data.get("timestamp")
+                )
+            elif measurement_type in PARTIAL_TOPICS:
+                # Same tick already received as a full /data message, don't even parse it
+                if self.merger.covered(db_sensor_id):
+                    self.merger.deduplicated += 1
+                    return
                 
-                if measurement_type == "data":
-                    data = json.loads(payload)
-                    await self.store_measurement(
-                        session, 
-                        sensor.id, 
-                        data.get("temperature"),
-                        data.get("humidity"),
-                        data.get("pressure"),
-                        data.get("acceleration_x"),
-                        data.get("acceleration_y"), 
-                        data.get("acceleration_z"),
-                        data.get("rssi"),
-                        data.get("battery_voltage"),
-                        data.get("movement_counter")
-                    )
+                if measurement_type == "acceleration":
+                    try:
+                        accel_data = json.loads(payload)
+                        values = {
+                            "acceleration_x": accel_data.get("x"),
+                            "acceleration_y": accel_data.get("y"),
+                            "acceleration_z": accel_data.get("z"),
+                            "movement_counter": accel_data.get("movement_counter")
+                        }
+                    except (json.JSONDecodeError, ValueError, AttributeError):
+                        logger.warning(f"Could not parse acceleration data: {payload}")
+                        return
                 else:
-                    # Handle acceleration data properly
-                    if measurement_type == "acceleration":
-                        try:
-                            accel_data = json.loads(payload)
-                            await self.store_measurement(
-                                session,
-                                sensor.id,
-                                acceleration_x=accel_data.get("x"),
-                                acceleration_y=accel_data.get("y"),
-                                acceleration_z=accel_data.get("z")
-                            )
-                        except (json.JSONDecodeError, ValueError):
-                            logger.warning(f"Could not parse acceleration data: {payload}")
-                    else:
-                        try:
-                            value = float(payload)
-                            await self.store_partial_measurement(session, sensor.id, measurement_type, value)
-                        except ValueError:
-                            logger.warning(f"Could not convert {measurement_type} payload to float: {payload}")
+                    try:
+                        field = PARTIAL_TOPICS[measurement_type][0]
+                        values = {field: float(payload)}
+                    except ValueError:
+                        logger.warning(f"Could not convert {measurement_type} payload to float: {payload}")
+                        return
+                
+                self.store_partial_measurement(db_sensor_id, measurement_type, values)
+            else:
+                logger.debug(f"Ignoring unknown RuuviTag topic type: {measurement_type}")
                     
         except Exception as e:
             logger.error(f"Error handling RuuviTag data: {e}")
@@ -148,18 +229,17 @@ class MQTTClient:
             source_endpoint = data.get("source_endpoint", "unknown")
             sensor_data = data.get("data", {})
             
-            async with AsyncSessionLocal() as session:
-                sensor_id = f"hetic_{source_endpoint}"
-                sensor = await self.get_or_create_sensor(session, sensor_id)
-                
-                await self.store_measurement(
-                    session,
-                    sensor.id,
-                    sensor_data.get("temperature"),
-                    sensor_data.get("humidity"),
-                    sensor_data.get("pressure"),
-                    rssi=data.get("rx_time_ms_epoch")
-                )
+            sensor_id = f"hetic_{source_endpoint}"
+            db_sensor_id = await self.get_or_create_sensor(sensor_id)
+            
+            self.store_measurement(
+                db_sensor_id,
+                sensor_data.get("temperature"),
+                sensor_data.get("humidity"),
+                sensor_data.get("pressure"),
+                rssi=data.get("rssi"),
+                timestamp=data.get("rx_time_ms_epoch")
+            )
                 
         except Exception as e:
             logger.error(f"Error handling Hetic gateway data: {e}")
@@ -168,22 +248,21 @@ class MQTTClient:
         try:
             data = json.loads(payload)
             
-            async with AsyncSessionLocal() as session:
-                sensor = await self.get_or_create_sensor(session, sensor_id)
-                
-                await self.store_measurement(
-                    session,
-                    sensor.id,
-                    data.get("temperature"),
-                    data.get("humidity"), 
-                    data.get("pressure"),
-                    data.get("acceleration_x"),
-                    data.get("acceleration_y"),
-                    data.get("acceleration_z"),
-                    data.get("rssi"),
-                    data.get("battery_voltage"),
-                    data.get("movement_counter")
-                )
+            db_sensor_id = await self.get_or_create_sensor(sensor_id)
+            
+            self.store_measurement(
+                db_sensor_id,
+                data.get("temperature"),
+                data.get("humidity"), 
+                data.get("pressure"),
+                data.get("acceleration_x"),
+                data.get("acceleration_y"),
+                data.get("acceleration_z"),
+                data.get("rssi"),
+                data.get("battery_voltage"),
+                data.get("movement_counter"),
+                timestamp=data.get("timestamp")
+            )
                 
         except Exception as e:
             logger.error(f"Error handling sensor data: {e}")
@@ -196,51 +275,31 @@ class MQTTClient:
             if not sensor_data or "trace_options" in sensor_data:
                 return
             
-            async with AsyncSessionLocal() as session:
-                sensor_id = f"wirepas_{source_address}"
-                sensor = await self.get_or_create_sensor(session, sensor_id)
-                
-                await self.store_measurement(
-                    session,
-                    sensor.id,
-                    sensor_data.get("temperature"),
-                    sensor_data.get("humidity"),
-                    sensor_data.get("pressure"),
-                    sensor_data.get("acceleration_x"),
-                    sensor_data.get("acceleration_y"),
-                    sensor_data.get("acceleration_z"),
-                    rssi=data.get("rssi"),
-                    battery_voltage=sensor_data.get("battery_voltage"),
-                    movement_counter=sensor_data.get("movement_counter")
-                )
+            sensor_id = f"wirepas_{source_address}"
+            db_sensor_id = await self.get_or_create_sensor(sensor_id)
+            
+            self.store_measurement(
+                db_sensor_id,
+                sensor_data.get("temperature"),
+                sensor_data.get("humidity"),
+                sensor_data.get("pressure"),
+                sensor_data.get("acceleration_x"),
+                sensor_data.get("acceleration_y"),
+                sensor_data.get("acceleration_z"),
+                rssi=data.get("rssi"),
+                battery_voltage=sensor_data.get("battery_voltage"),
+                movement_counter=sensor_data.get("movement_counter")
+            )
                 
         except Exception as e:
             logger.error(f"Error handling Wirepas data: {e}")
 
-    async def get_or_create_sensor(self, session: AsyncSession, mac_address: str) -> Sensor:
-        from sqlalchemy import select
-        
-        result = await session.execute(
-            select(Sensor).where(Sensor.mac_address == mac_address)
-        )
-        sensor = result.scalar_one_or_none()
-        
-        if not sensor:
-            sensor = Sensor(
-                mac_address=mac_address,
-                name=f"RuuviTag {mac_address}",
-                is_active=True
-            )
-            session.add(sensor)
-            await session.commit()
-            await session.refresh(sensor)
-            logger.info(f"Created new sensor: {mac_address}")
-            
-        return sensor
+    async def get_or_create_sensor(self, mac_address: str) -> int:
+        """Return the database id for a MAC address, creating the sensor if needed."""
+        return await sensor_registry.get_or_create(mac_address)
 
-    async def store_measurement(
+    def store_measurement(
         self, 
-        session: AsyncSession, 
         sensor_id: int,
         temperature: Optional[float] = None,
         humidity: Optional[float] = None,
@@ -250,82 +309,212 @@ class MQTTClient:
         acceleration_z: Optional[float] = None,
         rssi: Optional[int] = None,
         battery_voltage: Optional[float] = None,
-        movement_counter: Optional[int] = None
+        movement_counter: Optional[int] = None,
+        timestamp: Optional[Any] = None
     ):
-        try:
-            if not any([temperature, humidity, pressure]):
-                logger.debug("No valid sensor data to store")
-                return
-                
-            measurement = Measurement(
-                time=datetime.utcnow(),
-                sensor_id=sensor_id,
-                temperature=temperature,
-                humidity=humidity,
-                pressure=pressure,
-                acceleration_x=acceleration_x,
-                acceleration_y=acceleration_y,
-                acceleration_z=acceleration_z,
-                rssi=rssi,
-                battery_voltage=battery_voltage,
-                movement_counter=movement_counter
-            )
-            
-            session.add(measurement)
-            await session.commit()
-            logger.debug(f"Stored measurement for sensor {sensor_id}")
+        """Queue a measurement for the next batched insert.
+        
+        `timestamp` is the device-supplied time of the reading, if any. The
+        row is stored at that time (see EventTimePolicy) and it lets the same
+        reading published on several topics be stored once.
+        """
+        if not any([temperature, humidity, pressure]):
+            logger.debug("No valid sensor data to store")
+            return
+        
+        values = (
+            temperature, humidity, pressure,
+            acceleration_x, acceleration_y, acceleration_z,
+            rssi, battery_voltage, movement_counter
+        )
+        if self.deduplicator.is_duplicate(sensor_id, timestamp, values):
+            logger.debug(f"Skipping duplicate measurement for sensor {sensor_id}")
+            return
+        
+        event_time, backfill = self.event_time.resolve(timestamp)
+        if event_time is None:
+            logger.debug(f"Dropping late measurement for sensor {sensor_id} stamped {timestamp}")
+            return
             
-        except Exception as e:
-            logger.error(f"Error storing measurement: {e}")
-            await session.rollback()
+        self.writer.add({
+            "time": event_time,
+            "sensor_id": sensor_id,
+            "temperature": temperature,
+            "humidity": humidity,
+            "pressure": pressure,
+            "acceleration_x": acceleration_x,
+            "acceleration_y": acceleration_y,
+            "acceleration_z": acceleration_z,
+            "rssi": rssi,
+            "battery_voltage": battery_voltage,
+            "movement_counter": movement_counter
+        }, backfill=backfill)
+        logger.debug(f"Queued measurement for sensor {sensor_id}")
+
+    def store_partial_measurement(self, sensor_id: int, measurement_type: str, values: Dict):
+        """Merge one per-metric topic and store the readings it completes."""
+        logger.debug(f"Received partial measurement: {measurement_type}={values} for sensor {sensor_id}")
+        # Partial topics carry no device time: the reading is stamped when its first topic arrives
+        values = {**values, "timestamp": datetime.now(timezone.utc)}
+        for merged in self.merger.add_partial(sensor_id, measurement_type, values):
+            self.store_measurement(sensor_id, **merged)
+
+    def flush_partial_measurements(self, force: bool = False):
+        """Store readings whose merge window has expired (or all of them when forced)."""
+        now = float("inf") if force else None
+        for sensor_id, merged in self.merger.expire(now):
+            self.store_measurement(sensor_id, **merged)
+
+    async def _expire_partials(self):
+        while self.running:
+            await asyncio.sleep(self.merger.window / 2)
+            try:
+                self.flush_partial_measurements()
+            except Exception as e:
+                logger.error(f"Error flushing merged partial measurements: {e}")
+
+    @staticmethod
+    def shard_key(topic: str) -> str:
+        """Return the sensor identifier a topic belongs to, or the topic itself."""
+        topic_parts = topic.split('/')
+        
+        if len(topic_parts) >= 3 and topic_parts[0] == "sensors":
+            return topic_parts[2]
+        if len(topic_parts) >= 2 and topic_parts[0] == "sensor":
+            return topic_parts[1]
+        if topic.startswith("wirepas-json-event/packet/") and len(topic_parts) >= 5:
+            return f"wirepas_{topic_parts[3]}"
+        return topic
 
-    async def store_partial_measurement(self, session: AsyncSession, sensor_id: int, measurement_type: str, value: float):
-        logger.debug(f"Received partial measurement: {measurement_type}={value} for sensor {sensor_id}")
+    def shard_for(self, topic: str) -> int:
+        return zlib.crc32(self.shard_key(topic).encode('utf-8')) % self.worker_count
 
     async def _process_messages(self):
-        """Process messages from queue in async context"""
+        """Dispatch queued messages to the worker owning their sensor"""
         while self.running:
             try:
+                await self.bridge.replay_spilled()
+                
                 # Wait for message with timeout
-                topic, payload = await asyncio.wait_for(
+                topic, payload, received_at = await asyncio.wait_for(
                     self.message_queue.get(), timeout=1.0
                 )
-                await self.process_message(topic, payload)
             except asyncio.TimeoutError:
                 continue
+            
+            try:
+                await self.worker_queues[self.shard_for(topic)].put((topic, payload, received_at))
             except Exception as e:
                 if self.running:  # Only log if we're not shutting down
-                    logger.error(f"Error in message processor: {e}")
+                    logger.error(f"Error in message dispatcher: {e}")
+            finally:
+                self.message_queue.task_done()
+
+    async def _worker(self, index: int):
+        queue = self.worker_queues[index]
+        stats = self.worker_stats[index]
+        
+        while True:
+            topic, payload, received_at = await queue.get()
+            try:
+                stats.record(time.monotonic() - received_at)
+                await self.process_message(topic, payload)
+            except Exception as e:
+                stats.errors += 1
+                logger.error(f"Error in message worker {index}: {e}")
+            finally:
+                queue.task_done()
+
+    async def _drain(self):
+        await self.message_queue.join()
+        for queue in self.worker_queues:
+            await queue.join()
+
+    def stats(self) -> Dict:
+        return {
+            "connected": self.connected,
+            "queue": self.bridge.stats(),
+            "workers": [
+                stats.as_dict(queue.qsize())
+                for queue, stats in zip(self.worker_queues, self.worker_stats)
+            ],
+            "partial_merge": self.merger.stats(),
+            "deduplication": self.deduplicator.stats(),
+            "event_time": self.event_time.stats(),
+            "writer": self.writer.stats(),
+            "sensor_registry": sensor_registry.stats(),
+            "alerts": alert_engine.stats(),
+            "live": live_hub.stats(),
+            "response_cache": response_cache.stats(),
+            "dashboard_counters": dashboard_counters.stats()
+        }
 
     async def connect(self):
         try:
             self.running = True
+            
+            try:
+                await sensor_registry.warm()
+            except Exception as e:
+                logger.error(f"Could not warm sensor registry: {e}")
+            
+            try:
+                await latest_readings.warm()
+            except Exception as e:
+                logger.error(f"Could not warm latest readings: {e}")
+            
+            try:
+                await alert_engine.warm()
+            except Exception as e:
+                logger.error(f"Could not load alert thresholds: {e}")
+            
+            self.bridge.bind(asyncio.get_running_loop())
             self.client.connect(self.broker_host, self.broker_port, 60)
             self.client.loop_start()
             
-            # Start message processor task
+            self.writer.start()
+            
+            # Start message workers and the dispatcher feeding them
+            self.worker_tasks = [
+                asyncio.create_task(self._worker(index)) for index in range(self.worker_count)
+            ]
             self.processor_task = asyncio.create_task(self._process_messages())
+            self.merge_task = asyncio.create_task(self._expire_partials())
             
-            logger.info(f"MQTT client started for {self.broker_host}:{self.broker_port}")
+            logger.info(f"MQTT client started for {self.broker_host}:{self.broker_port} with {self.worker_count} workers")
         except Exception as e:
             logger.error(f"Failed to connect to MQTT broker: {e}")
 
     async def disconnect(self):
         try:
-            self.running = False
-            
-            # Cancel processor task
-            if self.processor_task and not self.processor_task.done():
-                self.processor_task.cancel()
-                try:
-                    await self.processor_task
-                except asyncio.CancelledError:
-                    pass
-            
+            # Stop receiving first so the queues can only shrink
+            self.bridge.close()
             if self.connected:
                 self.client.loop_stop()
                 self.client.disconnect()
                 logger.info("MQTT client disconnected")
+            
+            if self.processor_task and not self.processor_task.done():
+                try:
+                    await asyncio.wait_for(self._drain(), timeout=settings.MQTT_DRAIN_TIMEOUT)
+                except asyncio.TimeoutError:
+                    logger.warning("Timed out draining MQTT message queues, pending messages are lost")
+            
+            self.running = False
+            
+            # Cancel dispatcher and worker tasks
+            tasks = [
+                task for task in [self.processor_task, self.merge_task, *self.worker_tasks]
+                if task and not task.done()
+            ]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.worker_tasks = []
+            
+            # Write whatever is still buffered before shutting down
+            self.flush_partial_measurements(force=True)
+            await self.writer.stop()
         except Exception as e:
             logger.error(f"Error during MQTT disconnect: {e}")
 
@@ -0,0 +1,58 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Opaque token for the last row of a page; datetimes are kept as ISO strings."""
+    payload = {
+        key: {"dt": value.isoformat()} if isinstance(value, datetime) else value
+        for key, value in values.items()
+    }
+    raw = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, keys: Sequence[str]) -> Dict[str, Any]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        values = {}
+        for key in keys:
+            value = payload[key]
+            values[key] = datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value
+        return values
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {e}") from e
+
+
+def keyset_page(query, columns: Sequence, after: Optional[Sequence], limit: int, descending: bool = False):
+    """Seek past `after` on `columns` and fetch one extra row to know if a next page exists.
+
+    The comparison is a row-value one on the same columns as the ORDER BY,
+    so each page is an index range scan whatever its depth, unlike OFFSET.
+    """
+    if after is not None:
+        key = tuple_(*columns) if len(columns) > 1 else columns[0]
+        bound = tuple_(*after) if len(columns) > 1 else after[0]
+        query = query.where(key < bound if descending else key > bound)
+    order = [column.desc() if descending else column.asc() for column in columns]
+    return query.order_by(*order).limit(limit + 1)
+
+
+def split_page(rows: Sequence, limit: int, cursor_values) -> Tuple[List, Optional[str]]:
+    """Trim the extra row fetched by keyset_page and build the cursor of the next page."""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(cursor_values(rows[-1]))
@@ -0,0 +1,109 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+# Per-metric RuuviTag topics and the measurement fields each one carries
+PARTIAL_TOPICS = {
+    "temperature": ("temperature",),
+    "humidity": ("humidity",),
+    "pressure": ("pressure",),
+    "battery": ("battery_voltage",),
+    "acceleration": ("acceleration_x", "acceleration_y", "acceleration_z", "movement_counter"),
+}
+
+
+class ReadingMerger:
+    """Merges per-metric RuuviTag topics into one reading per sensor and tick.
+
+    Partial topics for a sensor are collected for at most `window` seconds.
+    The merged reading is emitted as soon as every metric has been seen,
+    when a metric repeats (next tick), or when the window expires. A full
+    `/data` message for the same tick wins over the partial topics, so each
+    tick is stored once whichever of the two arrives first.
+    """
+
+    def __init__(self, window: Optional[float] = None):
+        self.window = window or settings.RUUVITAG_MERGE_WINDOW
+        self._open: Dict[int, Dict] = {}
+        self._last_full: Dict[int, float] = {}
+        self._last_merged: Dict[int, float] = {}
+
+        self.merged = 0
+        self.deduplicated = 0
+
+    def covered(self, sensor_id: int, now: Optional[float] = None) -> bool:
+        """True if a full reading was received for this sensor's current tick."""
+        now = time.monotonic() if now is None else now
+        last_full = self._last_full.get(sensor_id)
+        return last_full is not None and now - last_full < self.window
+
+    def add_partial(
+        self,
+        sensor_id: int,
+        measurement_type: str,
+        values: Dict,
+        now: Optional[float] = None
+    ) -> List[Dict]:
+        """Add one partial topic and return the readings completed by it."""
+        now = time.monotonic() if now is None else now
+
+        if self.covered(sensor_id, now):
+            self.deduplicated += 1
+            return []
+
+        completed = []
+        pending = self._open.get(sensor_id)
+        if pending and (measurement_type in pending["topics"] or now - pending["started"] >= self.window):
+            completed.append(self._close(sensor_id, now))
+            pending = None
+
+        if pending is None:
+            pending = self._open[sensor_id] = {"started": now, "topics": set(), "values": {}}
+        pending["topics"].add(measurement_type)
+        for field, value in values.items():
+            # Keep the first value, e.g. the arrival time of the tick's first topic
+            pending["values"].setdefault(field, value)
+
+        if len(pending["topics"]) == len(PARTIAL_TOPICS):
+            completed.append(self._close(sensor_id, now))
+
+        return completed
+
+    def add_full(self, sensor_id: int, now: Optional[float] = None) -> bool:
+        """Register a full reading; return False if the partials already stored this tick."""
+        now = time.monotonic() if now is None else now
+        self._last_full[sensor_id] = now
+
+        if self._open.pop(sensor_id, None) is not None:
+            self.deduplicated += 1
+            return True
+
+        last_merged = self._last_merged.get(sensor_id)
+        if last_merged is not None and now - last_merged < self.window:
+            self.deduplicated += 1
+            return False
+        return True
+
+    def expire(self, now: Optional[float] = None) -> List[Tuple[int, Dict]]:
+        """Close every merge window older than `window` seconds."""
+        now = time.monotonic() if now is None else now
+        expired = [
+            sensor_id for sensor_id, pending in self._open.items()
+            if now - pending["started"] >= self.window
+        ]
+        return [(sensor_id, self._close(sensor_id, now)) for sensor_id in expired]
+
+    def _close(self, sensor_id: int, now: float) -> Dict:
+        pending = self._open.pop(sensor_id)
+        self._last_merged[sensor_id] = now
+        self.merged += 1
+        return pending["values"]
+
+    def stats(self) -> Dict:
+        return {
+            "open_windows": len(self._open),
+            "merged": self.merged,
+            "deduplicated": self.deduplicated,
+            "window": self.window
+        }
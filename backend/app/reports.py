@@ -0,0 +1,176 @@
+import asyncio
+import csv
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import literal_column, select, update
+
+from app.aggregates import SERIES_LEVELS, compute_sensor_series
+from app.config import settings
+from app.database import AsyncSessionLocal, ExportSessionLocal
+from app.models import Report, Sensor
+
+logger = logging.getLogger(__name__)
+
+REPORT_FORMATS = ("CSV",)
+
+# Rollup period per report type; daily/hourly aggregate buckets nest into all of them
+REPORT_PERIODS = {
+    "daily": "1 day",
+    "weekly": "1 week",
+    "monthly": "1 month",
+    "custom": "1 day",
+}
+
+REPORT_COLUMNS = (
+    "sensor_id", "sensor_name", "period_start", "measurement_count",
+    "temperature_avg", "temperature_min", "temperature_max",
+    "humidity_avg", "humidity_min", "humidity_max",
+    "pressure_avg", "pressure_min", "pressure_max",
+    "battery_voltage_avg",
+)
+
+
+def report_row(sensor: Sensor, point: Dict) -> List:
+    def rounded(value, digits=2):
+        return None if value is None else round(value, digits)
+
+    return [
+        sensor.id, sensor.name, point["time"].isoformat(), point["count"],
+        rounded(point["temperature"]), rounded(point["temperature_min"]), rounded(point["temperature_max"]),
+        rounded(point["humidity"]), rounded(point["humidity_min"]), rounded(point["humidity_max"]),
+        rounded(point["pressure"]), rounded(point["pressure_min"]), rounded(point["pressure_max"]),
+        rounded(point["battery_voltage"], 3),
+    ]
+
+
+def write_csv(path: str, rows: List[List]):
+    # Written next to the final file, then renamed: downloads never see a partial report
+    partial_path = path + ".part"
+    with open(partial_path, "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(REPORT_COLUMNS)
+        writer.writerows(rows)
+    os.replace(partial_path, path)
+
+
+class ReportJobs:
+    """Generates queued reports in background workers, off the request path.
+
+    A report row is created as `pending` by the API, then a worker moves it
+    to `processing` and to `completed` (with `file_path`) or `failed`. The
+    rollups come from the continuous aggregates, so a report costs a few
+    aggregate reads per sensor rather than a scan of the hypertable.
+    """
+
+    def __init__(self, workers: Optional[int] = None, reports_dir: Optional[str] = None):
+        self.workers = workers or settings.REPORT_WORKERS
+        self.reports_dir = reports_dir or settings.REPORTS_DIR
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, report_id: int):
+        self.queue.put_nowait(report_id)
+
+    async def start(self):
+        os.makedirs(self.reports_dir, exist_ok=True)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+        # Reports left pending or interrupted by a restart are picked up again
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(
+                    update(Report).where(Report.status == "processing").values(status="pending")
+                )
+                await session.commit()
+                result = await session.execute(
+                    select(Report.id).where(Report.status == "pending").order_by(Report.created_at)
+                )
+                for report_id in result.scalars():
+                    self.submit(report_id)
+        except Exception as e:
+            logger.error(f"Could not resume pending reports: {e}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self):
+        while True:
+            report_id = await self.queue.get()
+            try:
+                await self.run(report_id)
+            except Exception as e:
+                logger.error(f"Report {report_id} failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def run(self, report_id: int):
+        # API pool sessions stay short: none is held while the report is generated
+        async with AsyncSessionLocal() as session:
+            claimed = await session.execute(
+                update(Report)
+                .where(Report.id == report_id, Report.status == "pending")
+                .values(status="processing")
+                .returning(Report.id)
+            )
+            await session.commit()
+            if claimed.scalar_one_or_none() is None:
+                return
+            report = await session.get(Report, report_id)
+
+        try:
+            # Rollups are read through the export pool (replica if configured),
+            # the status updates stay on the primary
+            async with ExportSessionLocal() as read_session:
+                path = await self.generate(read_session, report)
+            values = {"status": "completed", "file_path": path}
+            self.completed += 1
+        except Exception as e:
+            logger.error(f"Report {report_id} generation failed: {e}")
+            values = {"status": "failed"}
+            self.failed += 1
+
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(Report)
+                .where(Report.id == report_id)
+                .values(**values, completed_at=datetime.now(timezone.utc))
+            )
+            await session.commit()
+
+    async def generate(self, session, report: Report) -> str:
+        sensor_query = select(Sensor).order_by(Sensor.id)
+        if report.sensors_included:
+            sensor_query = sensor_query.where(Sensor.id.in_(report.sensors_included))
+        sensors = (await session.execute(sensor_query)).scalars().all()
+
+        period = literal_column(f"INTERVAL '{REPORT_PERIODS[report.report_type]}'")
+        rows = []
+        for sensor in sensors:
+            points = await compute_sensor_series(
+                session, sensor.id, report.start_date, report.end_date, period, levels=SERIES_LEVELS
+            )
+            rows.extend(report_row(sensor, point) for point in points)
+
+        path = os.path.join(self.reports_dir, f"report_{report.id}.csv")
+        await asyncio.to_thread(write_csv, path, rows)
+        return path
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self.queue.qsize(),
+            "workers": len(self._tasks),
+            "completed": self.completed,
+            "failed": self.failed
+        }
+
+
+report_jobs = ReportJobs()
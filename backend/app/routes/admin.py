@@ -1,23 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, update, delete
+from sqlalchemy import select, update, delete
 from typing import List, Optional
 from datetime import datetime
 
-from app.auth import get_current_admin_user
-from app.database import get_db
-from app.models import User, Sensor, Alert, Measurement
-from app.schemas import UserResponse, SensorResponse, UserUpdate
+from app.auth import get_current_admin_user, password_hasher, principal_cache
+from app.database import get_db, pool_metrics
+from app.models import User, Sensor, Alert
+from app.schemas import AlertResponse, UserResponse, SensorResponse, UserUpdate
+from app.sensor_registry import sensor_registry
+from app.latest_store import latest_readings
+from app.cache import response_cache
+from app.counters import dashboard_counters
+from app.storage import chunk_report
+from app.pagination import NEXT_CURSOR_HEADER, InvalidCursor, decode_cursor, keyset_page, split_page
+from app.mqtt_client import mqtt_client
+from app.encoding import load_msgpack
+from app.exporter import (
+    COLUMNAR_FORMATS, EXPORT_FORMATS, PARTITION_KEYS, build_export_query, encode_chunks, encode_columnar,
+    load_pyarrow, stream_measurements
+)
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+def decode_id_cursor(cursor: Optional[str]) -> Optional[List[int]]:
+    if cursor is None:
+        return None
+    try:
+        return [decode_cursor(cursor, ("id",))["id"]]
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/users", response_model=List[UserResponse])
 async def get_all_users(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size (paginated by id)"),
+    cursor: Optional[str] = Query(None, description="Next page cursor (X-Next-Cursor header)"),
     current_user: User = Depends(get_current_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(select(User))
-    users = result.scalars().all()
+    if limit is None and cursor is None:
+        result = await db.execute(select(User))
+        return [UserResponse.model_validate(user) for user in result.scalars().all()]
+
+    page_size = limit or 100
+    query = keyset_page(select(User), [User.id], decode_id_cursor(cursor), page_size)
+    result = await db.execute(query)
+    users, next_cursor = split_page(result.scalars().all(), page_size, lambda user: {"id": user.id})
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return [UserResponse.model_validate(user) for user in users]
 
 @router.put("/users/{user_id}", response_model=UserResponse)
@@ -42,6 +74,7 @@ async def update_user(
         user.updated_at = datetime.utcnow()
         await db.commit()
         await db.refresh(user)
+        principal_cache.invalidate_user(user_id)
     
     return UserResponse.model_validate(user)
 
@@ -62,36 +95,69 @@ async def delete_user(
     
     await db.execute(delete(User).where(User.id == user_id))
     await db.commit()
+    principal_cache.invalidate_user(user_id)
+    dashboard_counters.adjust("total_users", -1)
     return {"message": "User deleted successfully"}
 
 @router.get("/dashboard")
 async def get_admin_dashboard(
+    current_user: User = Depends(get_current_admin_user)
+):
+    # Maintained in memory and reconciled in the background: no query per load
+    return await dashboard_counters.snapshot()
+
+@router.get("/alerts", response_model=List[AlertResponse])
+async def get_alerts(
+    response: Response,
+    is_resolved: Optional[bool] = None,
+    sensor_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
-    sensors_count = await db.execute(select(func.count(Sensor.id)))
-    total_sensors = sensors_count.scalar()
-    
-    active_sensors_count = await db.execute(
-        select(func.count(Sensor.id)).where(Sensor.is_active == True)
-    )
-    active_sensors = active_sensors_count.scalar()
-    
-    unresolved_alerts_count = await db.execute(
-        select(func.count(Alert.id)).where(Alert.is_resolved == False)
-    )
-    unresolved_alerts = unresolved_alerts_count.scalar()
-    
-    users_count = await db.execute(select(func.count(User.id)))
-    total_users = users_count.scalar()
+    # Newest first: ids are assigned in creation order
+    query = select(Alert)
+    if is_resolved is not None:
+        query = query.where(Alert.is_resolved == is_resolved)
+    if sensor_id is not None:
+        query = query.where(Alert.sensor_id == sensor_id)
+    query = keyset_page(query, [Alert.id], decode_id_cursor(cursor), limit, descending=True)
     
+    result = await db.execute(query)
+    alerts, next_cursor = split_page(result.scalars().all(), limit, lambda alert: {"id": alert.id})
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [AlertResponse.model_validate(alert) for alert in alerts]
+
+@router.get("/metrics/ingestion")
+async def get_ingestion_metrics(
+    current_user: User = Depends(get_current_admin_user)
+):
+    return mqtt_client.stats()
+
+@router.get("/metrics/auth")
+async def get_auth_metrics(
+    current_user: User = Depends(get_current_admin_user)
+):
     return {
-        "total_sensors": total_sensors,
-        "active_sensors": active_sensors,
-        "unresolved_alerts": unresolved_alerts,
-        "total_users": total_users
+        "password_hashing": password_hasher.stats(),
+        "principal_cache": principal_cache.stats()
     }
 
+@router.get("/metrics/database")
+async def get_database_metrics(
+    current_user: User = Depends(get_current_admin_user)
+):
+    return pool_metrics()
+
+@router.get("/storage/chunks")
+async def get_storage_chunks(
+    current_user: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    return await chunk_report(db)
+
 # CRUD DEVICES (Admin only)
 @router.post("/sensors", response_model=SensorResponse)
 async def create_sensor(
@@ -110,6 +176,9 @@ async def create_sensor(
     db.add(sensor)
     await db.commit()
     await db.refresh(sensor)
+    sensor_registry.remember(sensor.mac_address, sensor.id)
+    response_cache.invalidate("sensors")
+    dashboard_counters.sensor_added(sensor.is_active)
     return SensorResponse.model_validate(sensor)
 
 @router.put("/sensors/{sensor_id}", response_model=SensorResponse)
@@ -126,6 +195,7 @@ async def update_sensor(
     if not sensor:
         raise HTTPException(status_code=404, detail="Sensor not found")
     
+    was_active = sensor.is_active
     if name is not None:
         sensor.name = name
     if is_active is not None:
@@ -134,6 +204,9 @@ async def update_sensor(
     sensor.updated_at = datetime.utcnow()
     await db.commit()
     await db.refresh(sensor)
+    sensor_registry.invalidate(sensor.mac_address)
+    response_cache.invalidate("sensors", f"sensor:{sensor_id}")
+    dashboard_counters.sensor_activity_changed(was_active, sensor.is_active)
     return SensorResponse.model_validate(sensor)
 
 @router.delete("/sensors/{sensor_id}")
@@ -150,52 +223,54 @@ async def delete_sensor(
     
     await db.execute(delete(Sensor).where(Sensor.id == sensor_id))
     await db.commit()
+    sensor_registry.invalidate(sensor.mac_address)
+    latest_readings.forget(sensor_id)
+    response_cache.invalidate("sensors", f"sensor:{sensor_id}")
+    dashboard_counters.sensor_removed(sensor.is_active)
+    dashboard_counters.forget_sensor(sensor_id)
     return {"message": "Sensor deleted successfully"}
 
 @router.get("/export/sensors")
 async def export_sensors_data(
-    format: str = "json",  # "json" ou "csv"
+    format: str = "json",  # "json", "csv", "ndjson", "msgpack", "parquet" ou "arrow"
+    compress: bool = False,
+    partition_by: Optional[str] = None,  # "sensor" ou "day" (parquet/arrow)
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    sensor_ids: Optional[List[int]] = None,
-    current_user: User = Depends(get_current_admin_user),
-    db: AsyncSession = Depends(get_db)
+    sensor_ids: Optional[List[int]] = Query(None),
+    current_user: User = Depends(get_current_admin_user)
 ):
-    if format not in ["json", "csv"]:
-        raise HTTPException(status_code=400, detail="Format must be 'json' or 'csv'")
-    
-    query = select(Measurement)
-    
-    if start_date:
-        query = query.where(Measurement.time >= start_date)
-    if end_date:
-        query = query.where(Measurement.time <= end_date)
-    if sensor_ids:
-        query = query.where(Measurement.sensor_id.in_(sensor_ids))
-    
-    result = await db.execute(query.order_by(Measurement.time.desc()))
-    measurements = result.scalars().all()
-    
-    if format == "json":
-        return {
-            "data": [
-                {
-                    "time": measurement.time.isoformat(),
-                    "sensor_id": measurement.sensor_id,
-                    "temperature": measurement.temperature,
-                    "humidity": measurement.humidity,
-                    "pressure": measurement.pressure,
-                    "acceleration_x": measurement.acceleration_x,
-                    "acceleration_y": measurement.acceleration_y,
-                    "acceleration_z": measurement.acceleration_z,
-                    "rssi": measurement.rssi,
-                    "battery_voltage": measurement.battery_voltage,
-                    "movement_counter": measurement.movement_counter
-                } for measurement in measurements
-            ],
-            "count": len(measurements),
-            "exported_at": datetime.utcnow().isoformat()
-        }
-    
-    # TODO: Implémenter l'export CSV
-    return {"message": "CSV export not implemented yet"}
\ No newline at end of file
+    if format not in EXPORT_FORMATS and format not in COLUMNAR_FORMATS:
+        raise HTTPException(status_code=400, detail="Format must be 'json', 'csv', 'ndjson', 'msgpack', 'parquet' or 'arrow'")
+    if partition_by is not None and (format not in COLUMNAR_FORMATS or partition_by not in PARTITION_KEYS):
+        raise HTTPException(status_code=400, detail="partition_by must be 'sensor' or 'day' with parquet or arrow")
+    
+    # Streamed straight from a server-side cursor, never held in memory
+    query = build_export_query(start_date, end_date, sensor_ids, partition_by)
+    stamp = f"{datetime.utcnow():%Y%m%d_%H%M%S}"
+    
+    if format in COLUMNAR_FORMATS:
+        try:
+            load_pyarrow()
+        except RuntimeError as e:
+            raise HTTPException(status_code=501, detail=str(e))
+        media_type, extension = COLUMNAR_FORMATS[format]
+        if partition_by:
+            media_type, extension = "application/zip", f"{partition_by}.zip"
+        body = encode_columnar(stream_measurements(query), format, partition_by)
+    else:
+        if format == "msgpack":
+            try:
+                load_msgpack()
+            except RuntimeError as e:
+                raise HTTPException(status_code=501, detail=str(e))
+        media_type, extension = EXPORT_FORMATS[format]
+        if compress:
+            media_type, extension = "application/gzip", extension + ".gz"
+        body = encode_chunks(stream_measurements(query), format, compress)
+    
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="sumatosensa_export_{stamp}.{extension}"'}
+    )
\ No newline at end of file
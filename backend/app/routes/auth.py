@@ -3,8 +3,9 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.auth import authenticate_user, create_access_token, get_current_active_user, get_password_hash, get_user_by_username
+from app.auth import authenticate_user, create_access_token, get_current_active_user, get_password_hash_async, get_user_by_username
 from app.database import get_db
+from app.counters import dashboard_counters
 from app.models import User
 from app.schemas import LoginRequest, LoginResponse, UserCreate, UserResponse
 from app.config import settings
@@ -56,7 +57,7 @@ async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_db
             detail="Email déjà enregistré"
         )
     
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     db_user = User(
         username=user_data.username,
         email=user_data.email,
@@ -67,5 +68,6 @@ async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_db
     db.add(db_user)
     await db.commit()
     await db.refresh(db_user)
+    dashboard_counters.adjust("total_users", 1)
     
     return UserResponse.model_validate(db_user)
\ No newline at end of file
@@ -0,0 +1,89 @@
+import os
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import get_current_active_user
+from app.database import get_db
+from app.models import Report, User
+from app.reports import REPORT_FORMATS, REPORT_PERIODS, report_jobs
+from app.schemas import ReportCreate, ReportResponse
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+
+
+async def get_own_report(report_id: int, current_user: User, db: AsyncSession) -> Report:
+    report = await db.get(Report, report_id)
+    if not report or (report.user_id != current_user.id and current_user.role != "admin"):
+        raise HTTPException(status_code=404, detail="Rapport introuvable")
+    return report
+
+@router.post("/", response_model=ReportResponse, status_code=202)
+async def create_report(
+    report_data: ReportCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    if report_data.report_type not in REPORT_PERIODS:
+        raise HTTPException(status_code=400, detail="Type de rapport invalide (daily, weekly, monthly ou custom)")
+    if report_data.format.upper() not in REPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Seul le format CSV est pris en charge")
+    if report_data.end_date <= report_data.start_date:
+        raise HTTPException(status_code=400, detail="La date de fin doit être postérieure à la date de début")
+    
+    report = Report(
+        user_id=current_user.id,
+        report_type=report_data.report_type,
+        format=report_data.format.upper(),
+        start_date=report_data.start_date,
+        end_date=report_data.end_date,
+        sensors_included=report_data.sensor_ids,
+        status="pending"
+    )
+    db.add(report)
+    await db.commit()
+    await db.refresh(report)
+    
+    # Generated by a background worker; poll GET /reports/{id} for the status
+    report_jobs.submit(report.id)
+    return ReportResponse.model_validate(report)
+
+@router.get("/", response_model=List[ReportResponse])
+async def list_reports(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    query = select(Report).order_by(Report.created_at.desc())
+    if current_user.role != "admin":
+        query = query.where(Report.user_id == current_user.id)
+    result = await db.execute(query)
+    return [ReportResponse.model_validate(report) for report in result.scalars().all()]
+
+@router.get("/{report_id}", response_model=ReportResponse)
+async def get_report(
+    report_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    return ReportResponse.model_validate(await get_own_report(report_id, current_user, db))
+
+@router.get("/{report_id}/download")
+async def download_report(
+    report_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    report = await get_own_report(report_id, current_user, db)
+    if report.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Rapport non disponible (statut : {report.status})")
+    if not report.file_path or not os.path.exists(report.file_path):
+        raise HTTPException(status_code=410, detail="Fichier du rapport introuvable")
+    
+    return FileResponse(
+        report.file_path,
+        media_type="text/csv",
+        filename=f"sumatosensa_report_{report.id}_{report.report_type}.csv"
+    )
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc, and_
 from typing import List, Optional
@@ -7,57 +7,107 @@ import logging
 from datetime import datetime, timezone
 
 from app.database import get_db
-from app.models import Sensor, Measurement, AlertThreshold
+from app.models import Sensor, SensorLatest, Measurement, AlertThreshold
+from app.latest_store import latest_readings, LATEST_FIELDS
+from app.cache import response_cache
+from app.encoding import encode_series, load_msgpack, negotiate_format
+from app.aggregates import RESOLUTIONS, choose_bucket_width, compute_sensor_series, compute_sensor_stats
 from app.auth import get_current_user
+from app.pagination import NEXT_CURSOR_HEADER, InvalidCursor, decode_cursor, keyset_page, split_page
 from app.schemas import SensorResponse, MeasurementResponse, SensorListResponse
 
 router = APIRouter(prefix="/sensors", tags=["sensors"])
 logger = logging.getLogger(__name__)
 
+# Read paths select plain columns and serialise the rows once: no ORM
+# entities, identity map or pydantic re-validation per row
+
+MEASUREMENT_FIELDS = (
+    "time", "temperature", "humidity", "pressure",
+    "acceleration_x", "acceleration_y", "acceleration_z",
+    "rssi", "battery_voltage", "movement_counter",
+)
+
+# What SensorResponse exposes, read as plain columns
+SENSOR_COLUMNS = (
+    Sensor.id, Sensor.mac_address, Sensor.name, Sensor.is_active, Sensor.battery_level,
+    Sensor.firmware_version, Sensor.last_seen, Sensor.created_at, Sensor.updated_at,
+)
+
+LAST_MEASUREMENT_COLUMNS = (
+    SensorLatest.temperature, SensorLatest.humidity, SensorLatest.pressure,
+    SensorLatest.battery_voltage, SensorLatest.time,
+)
+
+SENSOR_FIELDS = tuple(column.key for column in SENSOR_COLUMNS)
+LAST_MEASUREMENT_FIELDS = tuple(column.key for column in LAST_MEASUREMENT_COLUMNS)
+
+SERIES_FIELDS = (
+    "time", "count",
+    "temperature", "temperature_min", "temperature_max",
+    "humidity", "humidity_min", "humidity_max",
+    "pressure", "pressure_min", "pressure_max",
+    "battery_voltage",
+)
+
 @router.get("/", response_model=List[SensorResponse])
 async def get_all_sensors(
+    request: Request,
     active_only: bool = Query(True, description="Filtrer uniquement les capteurs actifs"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Taille de page (pagination par id)"),
+    cursor: Optional[str] = Query(None, description="Curseur de la page suivante (en-tête X-Next-Cursor)"),
     session: AsyncSession = Depends(get_db)
 ):
     try:
-        query = select(Sensor)
+        after = None
+        if cursor is not None:
+            try:
+                after = decode_cursor(cursor, ("id",))
+            except InvalidCursor:
+                raise HTTPException(status_code=400, detail="Curseur invalide")
+        
+        cache_key = response_cache.key(
+            "sensors", ["sensors"], active_only=active_only, limit=limit, cursor=cursor
+        )
+        cached = response_cache.lookup(request, cache_key)
+        if cached is not None:
+            return cached
+        
+        # Latest measurement per sensor comes from the sensor_latest table
+        # maintained by ingestion, so the hypertable is not touched at all
+        query = select(*SENSOR_COLUMNS, *LAST_MEASUREMENT_COLUMNS).outerjoin(
+            SensorLatest, SensorLatest.sensor_id == Sensor.id
+        )
         if active_only:
             query = query.where(Sensor.is_active == True)
         
-        result = await session.execute(query.order_by(Sensor.name))
-        sensors = result.scalars().all()
+        next_cursor = None
+        if limit is None and after is None:
+            result = (await session.execute(query.order_by(Sensor.name))).all()
+        else:
+            # Paginated listing is ordered by id so the cursor stays stable
+            page_size = limit or 100
+            query = keyset_page(query, [Sensor.id], [after["id"]] if after else None, page_size)
+            result, next_cursor = split_page(
+                (await session.execute(query)).all(), page_size, lambda row: {"id": row.id}
+            )
         
-        sensor_data = []
-        for sensor in sensors:
-            last_measurement_query = select(Measurement).where(
-                Measurement.sensor_id == sensor.id
-            ).order_by(desc(Measurement.time)).limit(1)
-            
-            last_measurement_result = await session.execute(last_measurement_query)
-            last_measurement = last_measurement_result.scalar_one_or_none()
-            
-            sensor_dict = {
-                "id": sensor.id,
-                "mac_address": sensor.mac_address,
-                "name": sensor.name,
-                "is_active": sensor.is_active,
-                "battery_level": sensor.battery_level,
-                "firmware_version": sensor.firmware_version,
-                "last_seen": sensor.last_seen,
-                "created_at": sensor.created_at,
-                "updated_at": sensor.updated_at,
-                "last_measurement": {
-                    "temperature": last_measurement.temperature if last_measurement else None,
-                    "humidity": last_measurement.humidity if last_measurement else None,
-                    "pressure": last_measurement.pressure if last_measurement else None,
-                    "battery_voltage": last_measurement.battery_voltage if last_measurement else None,
-                    "time": last_measurement.time if last_measurement else None
-                } if last_measurement else None
+        sensor_count = len(SENSOR_COLUMNS)
+        sensor_data = [
+            {
+                **dict(zip(SENSOR_FIELDS, row[:sensor_count])),
+                "last_measurement": dict(zip(LAST_MEASUREMENT_FIELDS, row[sensor_count:])) if row.time is not None else None
             }
-            sensor_data.append(sensor_dict)
+            for row in result
+        ]
             
-        return sensor_data
+        return response_cache.store(
+            request, cache_key, sensor_data,
+            headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des capteurs: {e}")
         raise HTTPException(status_code=500, detail="Erreur interne du serveur")
@@ -65,17 +115,23 @@ async def get_all_sensors(
 @router.get("/{sensor_id}", response_model=SensorResponse)
 async def get_sensor(
     sensor_id: int,
+    request: Request,
     session: AsyncSession = Depends(get_db)
 ):
     try:
-        query = select(Sensor).where(Sensor.id == sensor_id)
+        cache_key = response_cache.key("sensor", [f"sensor:{sensor_id}"], sensor_id=sensor_id)
+        cached = response_cache.lookup(request, cache_key)
+        if cached is not None:
+            return cached
+        
+        query = select(*SENSOR_COLUMNS).where(Sensor.id == sensor_id)
         result = await session.execute(query)
-        sensor = result.scalar_one_or_none()
+        sensor = result.one_or_none()
         
         if not sensor:
             raise HTTPException(status_code=404, detail="Capteur introuvable")
             
-        return sensor
+        return response_cache.store(request, cache_key, {**dict(zip(SENSOR_FIELDS, sensor)), "last_measurement": None})
         
     except HTTPException:
         raise
@@ -86,21 +142,87 @@ async def get_sensor(
 @router.get("/{sensor_id}/measurements")
 async def get_sensor_measurements(
     sensor_id: int,
+    request: Request,
     limit: int = Query(100, ge=1, le=1000, description="Nombre de mesures à récupérer"),
     hours: Optional[int] = Query(None, ge=1, le=8760, description="Dernières X heures"),
     start_date: Optional[datetime] = Query(None, description="Date de début (ISO format)"),
     end_date: Optional[datetime] = Query(None, description="Date de fin (ISO format)"),
+    resolution: str = Query("raw", pattern="^(raw|hour|day|auto)$", description="Mesures brutes ou agrégées par heure, par jour ou automatiquement"),
+    max_points: int = Query(500, ge=2, le=5000, description="Nombre maximal de points en résolution auto"),
+    cursor: Optional[str] = Query(None, description="Curseur de la page suivante (next_cursor)"),
+    format: Optional[str] = Query(None, pattern="^(json|columnar|msgpack)$", description="json, columnar ou msgpack (sinon selon l'en-tête Accept)"),
     session: AsyncSession = Depends(get_db)
 ):
     try:
-        sensor_query = select(Sensor).where(Sensor.id == sensor_id)
+        response_format = negotiate_format(request, format)
+        if response_format == "msgpack":
+            try:
+                load_msgpack()
+            except RuntimeError as e:
+                raise HTTPException(status_code=501, detail=str(e))
+        
+        after = None
+        if cursor is not None:
+            try:
+                after = decode_cursor(cursor, ("time", "sensor_id"))
+            except InvalidCursor:
+                raise HTTPException(status_code=400, detail="Curseur invalide")
+            if resolution != "raw" or after["sensor_id"] != sensor_id:
+                raise HTTPException(status_code=400, detail="Curseur invalide")
+        
+        cache_key = response_cache.key(
+            "measurements", [f"sensor:{sensor_id}"],
+            sensor_id=sensor_id, limit=limit, hours=hours, start_date=start_date, end_date=end_date,
+            resolution=resolution, max_points=max_points, cursor=cursor, format=response_format
+        )
+        cached = response_cache.lookup(request, cache_key)
+        if cached is not None:
+            return cached
+        
+        sensor_query = select(Sensor.id, Sensor.name, Sensor.mac_address).where(Sensor.id == sensor_id)
         sensor_result = await session.execute(sensor_query)
-        sensor = sensor_result.scalar_one_or_none()
+        sensor = sensor_result.one_or_none()
         
         if not sensor:
             raise HTTPException(status_code=404, detail="Capteur introuvable")
         
-        query = select(Measurement).where(Measurement.sensor_id == sensor_id)
+        if resolution != "raw":
+            now = datetime.now(timezone.utc)
+            if start_date and not hours:
+                start = start_date if start_date.tzinfo else start_date.replace(tzinfo=timezone.utc)
+            else:
+                start = now - timedelta(hours=hours or 24)
+            end = None
+            if end_date and not hours:
+                end = end_date if end_date.tzinfo else end_date.replace(tzinfo=timezone.utc)
+            if end is not None and end <= start:
+                raise HTTPException(status_code=400, detail="La date de fin doit être postérieure à la date de début")
+            
+            if resolution == "auto":
+                width = choose_bucket_width(start, end or now, max_points)
+            else:
+                width = RESOLUTIONS[resolution]
+            points = await compute_sensor_series(session, sensor_id, start, end, width)
+            meta = {
+                "sensor_id": sensor_id,
+                "sensor_name": sensor.name,
+                "sensor_mac": sensor.mac_address,
+                "resolution": resolution,
+                "bucket_seconds": int(width.total_seconds()),
+                "measurement_count": len(points)
+            }
+            
+            if response_format != "json":
+                body, media_type = encode_series(
+                    response_format, meta, SERIES_FIELDS, ([point[field] for field in SERIES_FIELDS] for point in points)
+                )
+                return response_cache.store_encoded(request, cache_key, body, media_type)
+            return response_cache.store(request, cache_key, {**meta, "measurements": points})
+        
+        # Plain column tuples: no ORM objects, and the columnar formats never build per-row dicts
+        query = select(*[getattr(Measurement, field) for field in MEASUREMENT_FIELDS]).where(
+            Measurement.sensor_id == sensor_id
+        )
         
         if hours:
             cutoff_time = datetime.utcnow() - timedelta(hours=hours)
@@ -111,35 +233,34 @@ async def get_sensor_measurements(
             if end_date:
                 query = query.where(Measurement.time <= end_date)
         
-        query = query.order_by(desc(Measurement.time)).limit(limit)
+        # (time, sensor_id) is unique and sensor_id is fixed here, so seeking on
+        # time alone walks idx_measurements_sensor_time from the cursor onwards
+        query = keyset_page(
+            query, [Measurement.time], [after["time"]] if after else None, limit, descending=True
+        )
         
         result = await session.execute(query)
-        measurements = result.scalars().all()
-        
-        formatted_measurements = []
-        for measurement in measurements:
-            measurement_dict = {
-                "time": measurement.time,
-                "temperature": measurement.temperature,
-                "humidity": measurement.humidity,
-                "pressure": measurement.pressure,
-                "acceleration_x": measurement.acceleration_x,
-                "acceleration_y": measurement.acceleration_y,
-                "acceleration_z": measurement.acceleration_z,
-                "rssi": measurement.rssi,
-                "battery_voltage": measurement.battery_voltage,
-                "movement_counter": measurement.movement_counter
-            }
-            formatted_measurements.append(measurement_dict)
-        
-        return {
+        measurements, next_cursor = split_page(
+            result.all(), limit,
+            lambda measurement: {"time": measurement.time, "sensor_id": sensor_id}
+        )
+        meta = {
             "sensor_id": sensor_id,
             "sensor_name": sensor.name,
             "sensor_mac": sensor.mac_address,
-            "measurement_count": len(formatted_measurements),
-            "measurements": formatted_measurements
+            "measurement_count": len(measurements),
+            "next_cursor": next_cursor
         }
         
+        if response_format != "json":
+            body, media_type = encode_series(response_format, meta, MEASUREMENT_FIELDS, measurements)
+            return response_cache.store_encoded(request, cache_key, body, media_type)
+        
+        return response_cache.store(request, cache_key, {
+            **meta,
+            "measurements": [dict(zip(MEASUREMENT_FIELDS, measurement)) for measurement in measurements]
+        })
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -152,19 +273,28 @@ async def get_latest_measurement(
     session: AsyncSession = Depends(get_db)
 ):
     try:
-        sensor_query = select(Sensor).where(Sensor.id == sensor_id)
+        sensor_query = select(Sensor.id, Sensor.name, Sensor.mac_address).where(Sensor.id == sensor_id)
         sensor_result = await session.execute(sensor_query)
-        sensor = sensor_result.scalar_one_or_none()
+        sensor = sensor_result.one_or_none()
         
         if not sensor:
             raise HTTPException(status_code=404, detail="Capteur introuvable")
         
-        query = select(Measurement).where(
-            Measurement.sensor_id == sensor_id
-        ).order_by(desc(Measurement.time)).limit(1)
+        measurement = latest_readings.get(sensor_id)
         
-        result = await session.execute(query)
-        measurement = result.scalar_one_or_none()
+        if measurement is None:
+            # Not seen by ingestion since startup: look it up once and keep it
+            query = select(
+                Measurement.time, *[getattr(Measurement, field) for field in LATEST_FIELDS]
+            ).where(
+                Measurement.sensor_id == sensor_id
+            ).order_by(desc(Measurement.time)).limit(1)
+            
+            result = await session.execute(query)
+            last_measurement = result.one_or_none()
+            if last_measurement:
+                measurement = dict(last_measurement._mapping)
+                latest_readings.remember(sensor_id, measurement)
         
         if not measurement:
             return {
@@ -177,7 +307,7 @@ async def get_latest_measurement(
 
         # --- normalisation timezone-safe pour age_seconds
         age_seconds = 0
-        mt = measurement.time
+        mt = measurement["time"]
         if mt is not None:
             if mt.tzinfo is None:
                 mt_aware = mt.replace(tzinfo=timezone.utc)
@@ -192,16 +322,8 @@ async def get_latest_measurement(
             "sensor_mac": sensor.mac_address,
             "measurement": {
                 # sérialiser proprement le timestamp
-                "time": measurement.time.isoformat() if measurement.time else None,
-                "temperature": measurement.temperature,
-                "humidity": measurement.humidity,
-                "pressure": measurement.pressure,
-                "acceleration_x": measurement.acceleration_x,
-                "acceleration_y": measurement.acceleration_y,
-                "acceleration_z": measurement.acceleration_z,
-                "rssi": measurement.rssi,
-                "battery_voltage": measurement.battery_voltage,
-                "movement_counter": measurement.movement_counter,
+                "time": mt.isoformat() if mt else None,
+                **{field: measurement[field] for field in LATEST_FIELDS},
                 "age_seconds": age_seconds,
             }
         }
@@ -215,69 +337,54 @@ async def get_latest_measurement(
 @router.get("/{sensor_id}/stats")
 async def get_sensor_stats(
     sensor_id: int,
+    request: Request,
     hours: int = Query(24, ge=1, le=8760, description="Période pour les statistiques en heures"),
     session: AsyncSession = Depends(get_db)
 ):
     try:
-        from sqlalchemy import func
+        cache_key = response_cache.key("stats", [f"sensor:{sensor_id}"], sensor_id=sensor_id, hours=hours)
+        cached = response_cache.lookup(request, cache_key)
+        if cached is not None:
+            return cached
         
-        sensor_query = select(Sensor).where(Sensor.id == sensor_id)
+        sensor_query = select(Sensor.id, Sensor.name, Sensor.mac_address).where(Sensor.id == sensor_id)
         sensor_result = await session.execute(sensor_query)
-        sensor = sensor_result.scalar_one_or_none()
+        sensor = sensor_result.one_or_none()
         
         if not sensor:
             raise HTTPException(status_code=404, detail="Capteur introuvable")
         
-        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+        # Whole buckets come from the continuous aggregates, edges and the
+        # not-yet-materialized tail from the hypertable
+        cutoff_time = datetime.now(timezone.utc) - timedelta(hours=hours)
+        stats = await compute_sensor_stats(session, sensor_id, cutoff_time)
         
-        stats_query = select(
-            func.count(Measurement.time).label('count'),
-            func.avg(Measurement.temperature).label('avg_temp'),
-            func.min(Measurement.temperature).label('min_temp'),
-            func.max(Measurement.temperature).label('max_temp'),
-            func.avg(Measurement.humidity).label('avg_humidity'),
-            func.min(Measurement.humidity).label('min_humidity'),
-            func.max(Measurement.humidity).label('max_humidity'),
-            func.avg(Measurement.pressure).label('avg_pressure'),
-            func.min(Measurement.pressure).label('min_pressure'),
-            func.max(Measurement.pressure).label('max_pressure'),
-            func.avg(Measurement.battery_voltage).label('avg_battery')
-        ).where(
-            and_(
-                Measurement.sensor_id == sensor_id,
-                Measurement.time >= cutoff_time
-            )
-        )
-        
-        result = await session.execute(stats_query)
-        stats = result.first()
-        
-        return {
+        return response_cache.store(request, cache_key, {
             "sensor_id": sensor_id,
             "sensor_name": sensor.name,
             "period_hours": hours,
-            "measurement_count": stats.count or 0,
+            "measurement_count": stats["count"],
             "statistics": {
                 "temperature": {
-                    "average": round(float(stats.avg_temp or 0), 2),
-                    "minimum": round(float(stats.min_temp or 0), 2),
-                    "maximum": round(float(stats.max_temp or 0), 2)
+                    "average": round(float(stats["avg_temp"] or 0), 2),
+                    "minimum": round(float(stats["min_temp"] or 0), 2),
+                    "maximum": round(float(stats["max_temp"] or 0), 2)
                 },
                 "humidity": {
-                    "average": round(float(stats.avg_humidity or 0), 2),
-                    "minimum": round(float(stats.min_humidity or 0), 2),
-                    "maximum": round(float(stats.max_humidity or 0), 2)
+                    "average": round(float(stats["avg_humidity"] or 0), 2),
+                    "minimum": round(float(stats["min_humidity"] or 0), 2),
+                    "maximum": round(float(stats["max_humidity"] or 0), 2)
                 },
                 "pressure": {
-                    "average": round(float(stats.avg_pressure or 0), 2),
-                    "minimum": round(float(stats.min_pressure or 0), 2),
-                    "maximum": round(float(stats.max_pressure or 0), 2)
+                    "average": round(float(stats["avg_pressure"] or 0), 2),
+                    "minimum": round(float(stats["min_pressure"] or 0), 2),
+                    "maximum": round(float(stats["max_pressure"] or 0), 2)
                 },
                 "battery": {
-                    "average": round(float(stats.avg_battery or 0), 3)
+                    "average": round(float(stats["avg_battery"] or 0), 3)
                 }
             }
-        }
+        })
         
     except HTTPException:
         raise
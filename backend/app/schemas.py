@@ -96,4 +96,41 @@ class SensorStatsResponse(BaseModel):
     sensor_name: str
     period_hours: int
     measurement_count: int
-    statistics: Dict[str, Dict[str, float]]
\ No newline at end of file
+    statistics: Dict[str, Dict[str, float]]
+
+class AlertResponse(BaseModel):
+    id: int
+    sensor_id: int
+    threshold_id: int
+    parameter: str
+    value: float
+    threshold_value: float
+    severity: str
+    message: Optional[str] = None
+    is_resolved: bool
+    resolved_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class ReportCreate(BaseModel):
+    report_type: str = "custom"
+    format: str = "CSV"
+    start_date: datetime
+    end_date: datetime
+    sensor_ids: Optional[List[int]] = None
+
+class ReportResponse(BaseModel):
+    id: int
+    report_type: str
+    format: str
+    start_date: datetime
+    end_date: datetime
+    sensors_included: Optional[List[int]] = None
+    status: str
+    created_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
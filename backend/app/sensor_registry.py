@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database import IngestSessionLocal
+from app.models import Sensor
+from app.counters import dashboard_counters
+
+logger = logging.getLogger(__name__)
+
+
+class SensorRegistry:
+    """Process-local MAC address -> sensor id map used by the ingestion path.
+
+    Known sensors are answered from memory. Unknown MAC addresses are
+    inserted with `INSERT ... ON CONFLICT DO NOTHING RETURNING`, and
+    concurrent first sightings of the same MAC share a single insert.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    async def warm(self):
+        """Load every known sensor from the database."""
+        async with IngestSessionLocal() as session:
+            result = await session.execute(select(Sensor.mac_address, Sensor.id))
+            self._ids = {mac_address: sensor_id for mac_address, sensor_id in result.all()}
+        logger.info(f"Sensor registry warmed with {len(self._ids)} sensors")
+
+    def get(self, mac_address: str) -> Optional[int]:
+        return self._ids.get(mac_address)
+
+    async def get_or_create(self, mac_address: str) -> int:
+        sensor_id = self._ids.get(mac_address)
+        if sensor_id is not None:
+            self.hits += 1
+            return sensor_id
+
+        self.misses += 1
+        pending = self._pending.get(mac_address)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The creating task was cancelled, not this one: create it ourselves
+                if pending.cancelled() and not asyncio.current_task().cancelling():
+                    return await self.get_or_create(mac_address)
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[mac_address] = future
+        try:
+            sensor_id = await self._insert(mac_address)
+            self._ids[mac_address] = sensor_id
+            future.set_result(sensor_id)
+            return sensor_id
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters (if any) receive the exception; don't warn when there are none
+            future.exception()
+            raise
+        except BaseException:
+            # Cancelled: release the waiters instead of leaving them hanging
+            future.cancel()
+            raise
+        finally:
+            del self._pending[mac_address]
+
+    async def _insert(self, mac_address: str) -> int:
+        async with IngestSessionLocal() as session:
+            result = await session.execute(
+                insert(Sensor)
+                .values(mac_address=mac_address, name=f"RuuviTag {mac_address}", is_active=True)
+                .on_conflict_do_nothing(index_elements=[Sensor.mac_address])
+                .returning(Sensor.id)
+            )
+            sensor_id = result.scalar_one_or_none()
+            created = sensor_id is not None
+
+            if sensor_id is None:
+                # Created concurrently by another process
+                result = await session.execute(
+                    select(Sensor.id).where(Sensor.mac_address == mac_address)
+                )
+                sensor_id = result.scalar_one()
+            await session.commit()
+            if created:
+                logger.info(f"Created new sensor: {mac_address}")
+                dashboard_counters.sensor_added()
+            return sensor_id
+
+    def remember(self, mac_address: str, sensor_id: int):
+        self._ids[mac_address] = sensor_id
+
+    def invalidate(self, mac_address: str):
+        self._ids.pop(mac_address, None)
+
+    def stats(self) -> Dict:
+        return {
+            "known_sensors": len(self._ids),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+sensor_registry = SensorRegistry()
@@ -0,0 +1,189 @@
+import logging
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+HYPERTABLE = "measurements"
+
+# Compressed batches hold one sensor's readings in time order: per-sensor
+# range scans (charts, stats, exports) decompress only the batches they need
+COMPRESS_SEGMENTBY = "sensor_id"
+COMPRESS_ORDERBY = "time DESC"
+
+MIN_CHUNK_INTERVAL = timedelta(hours=1)
+MAX_CHUNK_INTERVAL = timedelta(days=7)
+
+COMPRESSION_ENABLED_QUERY = text("""
+    SELECT compression_enabled FROM timescaledb_information.hypertables
+    WHERE hypertable_name = :hypertable
+""")
+
+ENABLE_COMPRESSION = text(f"""
+    ALTER TABLE {HYPERTABLE} SET (
+        timescaledb.compress,
+        timescaledb.compress_segmentby = '{COMPRESS_SEGMENTBY}',
+        timescaledb.compress_orderby = '{COMPRESS_ORDERBY}'
+    )
+""")
+
+SET_CHUNK_INTERVAL = text("SELECT set_chunk_time_interval(:hypertable, CAST(:interval AS INTERVAL))")
+
+COMPRESSION_POLICY_QUERY = text("""
+    SELECT job_id, CAST(config->>'compress_after' AS INTERVAL) = CAST(:compress_after AS INTERVAL) AS up_to_date
+    FROM timescaledb_information.jobs
+    WHERE proc_name = 'policy_compression' AND hypertable_name = :hypertable
+""")
+
+REMOVE_COMPRESSION_POLICY = text("SELECT remove_compression_policy(:hypertable, if_exists => true)")
+
+ADD_COMPRESSION_POLICY = text(
+    "SELECT add_compression_policy(:hypertable, CAST(:compress_after AS INTERVAL), if_not_exists => true)"
+)
+
+CHUNK_INTERVAL_QUERY = text("""
+    SELECT time_interval FROM timescaledb_information.dimensions
+    WHERE hypertable_name = :hypertable AND column_name = 'time'
+""")
+
+# Sizes come from the catalog and row counts from statistics: no chunk is scanned
+CHUNKS_QUERY = text("""
+    SELECT
+        c.chunk_schema,
+        c.chunk_name,
+        c.range_start,
+        c.range_end,
+        c.is_compressed,
+        d.total_bytes,
+        s.before_compression_total_bytes,
+        s.after_compression_total_bytes,
+        approximate_row_count(format('%I.%I', c.chunk_schema, c.chunk_name)::regclass) AS approximate_rows
+    FROM timescaledb_information.chunks c
+    JOIN chunks_detailed_size(:hypertable) d
+        ON d.chunk_schema = c.chunk_schema AND d.chunk_name = c.chunk_name
+    LEFT JOIN chunk_compression_stats(:hypertable) s
+        ON s.chunk_schema = c.chunk_schema AND s.chunk_name = c.chunk_name
+    WHERE c.hypertable_name = :hypertable
+    ORDER BY c.range_start DESC
+""")
+
+
+def compression_ratio(before_bytes: Optional[int], after_bytes: Optional[int]) -> Optional[float]:
+    if not before_bytes or not after_bytes:
+        return None
+    return round(before_bytes / after_bytes, 2)
+
+
+def suggest_chunk_interval(bytes_per_hour: float, target_bytes: int) -> timedelta:
+    """Chunk interval whose uncompressed size (indexes included) is about target_bytes.
+
+    The recent chunk plus its indexes should stay in memory while it is
+    being written, so the target is a fraction of the database's RAM.
+    Whole hours, between one hour and a week.
+    """
+    if bytes_per_hour <= 0:
+        return MAX_CHUNK_INTERVAL
+    hours = max(int(target_bytes // bytes_per_hour), 1)
+    return min(max(timedelta(hours=hours), MIN_CHUNK_INTERVAL), MAX_CHUNK_INTERVAL)
+
+
+def chunk_entry(row) -> Dict:
+    uncompressed_bytes = row.before_compression_total_bytes if row.is_compressed else row.total_bytes
+    return {
+        "chunk": f"{row.chunk_schema}.{row.chunk_name}",
+        "range_start": row.range_start,
+        "range_end": row.range_end,
+        "is_compressed": row.is_compressed,
+        "total_bytes": row.total_bytes,
+        "uncompressed_bytes": uncompressed_bytes,
+        "compression_ratio": compression_ratio(
+            row.before_compression_total_bytes, row.after_compression_total_bytes
+        ) if row.is_compressed else None,
+        "approximate_rows": row.approximate_rows,
+    }
+
+
+def storage_summary(chunks: List[Dict], chunk_interval: Optional[timedelta]) -> Dict:
+    compressed = [chunk for chunk in chunks if chunk["is_compressed"]]
+    uncompressed = [chunk for chunk in chunks if not chunk["is_compressed"]]
+    before = sum(chunk["uncompressed_bytes"] or 0 for chunk in compressed)
+    after = sum(chunk["total_bytes"] or 0 for chunk in compressed)
+
+    # Write rate estimated from the uncompressed (recent) chunks
+    suggested = None
+    if uncompressed and chunk_interval:
+        bytes_per_chunk = sum(chunk["total_bytes"] or 0 for chunk in uncompressed) / len(uncompressed)
+        bytes_per_hour = bytes_per_chunk / (chunk_interval.total_seconds() / 3600)
+        suggested = suggest_chunk_interval(bytes_per_hour, settings.STORAGE_TARGET_CHUNK_MB * 1024 * 1024)
+
+    return {
+        "chunks": len(chunks),
+        "compressed_chunks": len(compressed),
+        "total_bytes": sum(chunk["total_bytes"] or 0 for chunk in chunks),
+        "compressed_before_bytes": before,
+        "compressed_after_bytes": after,
+        "compression_ratio": compression_ratio(before, after),
+        "approximate_rows": sum(chunk["approximate_rows"] or 0 for chunk in chunks),
+        "chunk_interval_seconds": int(chunk_interval.total_seconds()) if chunk_interval else None,
+        "suggested_chunk_interval_seconds": int(suggested.total_seconds()) if suggested else None,
+    }
+
+
+async def apply_storage_policies():
+    """Idempotently set the chunk interval, compression settings and compression policy.
+
+    Only new chunks use a changed interval. Late readings may still land in
+    compressed chunks: TimescaleDB (2.11+) inserts into them directly.
+    """
+    chunk_interval = timedelta(hours=settings.MEASUREMENTS_CHUNK_INTERVAL_HOURS)
+    compress_after = timedelta(days=settings.MEASUREMENTS_COMPRESS_AFTER_DAYS)
+    params = {"hypertable": HYPERTABLE}
+
+    async with AsyncSessionLocal() as session:
+        try:
+            enabled = (await session.execute(COMPRESSION_ENABLED_QUERY, params)).scalar_one_or_none()
+            if enabled is None:
+                logger.warning(f"{HYPERTABLE} is not a hypertable, storage policies not applied")
+                return
+
+            await session.execute(SET_CHUNK_INTERVAL, {**params, "interval": chunk_interval})
+            if not enabled:
+                await session.execute(ENABLE_COMPRESSION)
+                logger.info(f"Compression enabled on {HYPERTABLE}")
+
+            policy = (await session.execute(
+                COMPRESSION_POLICY_QUERY, {**params, "compress_after": compress_after}
+            )).one_or_none()
+            if policy is not None and not policy.up_to_date:
+                await session.execute(REMOVE_COMPRESSION_POLICY, params)
+                policy = None
+            if policy is None:
+                await session.execute(ADD_COMPRESSION_POLICY, {**params, "compress_after": compress_after})
+                logger.info(f"Compression policy set: chunks older than {compress_after}")
+
+            await session.commit()
+        except DBAPIError as e:
+            await session.rollback()
+            logger.error(f"Could not apply storage policies: {e}")
+
+
+async def chunk_report(session) -> Dict:
+    params = {"hypertable": HYPERTABLE}
+    chunk_interval = (await session.execute(CHUNK_INTERVAL_QUERY, params)).scalar_one_or_none()
+    chunks = [chunk_entry(row) for row in await session.execute(CHUNKS_QUERY, params)]
+    return {
+        "hypertable": HYPERTABLE,
+        "compression": {
+            "segmentby": COMPRESS_SEGMENTBY,
+            "orderby": COMPRESS_ORDERBY,
+            "compress_after_days": settings.MEASUREMENTS_COMPRESS_AFTER_DAYS,
+        },
+        "summary": storage_summary(chunks, chunk_interval),
+        "chunks": chunks,
+    }
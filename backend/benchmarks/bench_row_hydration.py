@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Benchmark the per-row cost of serving measurements: ORM entities vs plain columns.
+
+Runs against an in-memory SQLite database (no server needed) so only the
+Python side is measured: fetching, hydrating and serialising N rows.
+
+  orm       select(Measurement) entities -> dict per row -> pydantic -> JSON
+            (what routes/sensors.py used to do)
+  core      select(columns) tuples -> dict per row -> JSON, serialised once
+  columnar  select(columns) tuples -> one list per column -> JSON
+
+    cd backend && PYTHONPATH=. python benchmarks/bench_row_hydration.py --rows 100 1000 5000
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, desc, insert, select
+from sqlalchemy.orm import Session
+
+from app.encoding import dumps_json, rows_to_columns
+from app.models import Measurement, Sensor
+from app.routes.sensors import MEASUREMENT_FIELDS
+from app.schemas import MeasurementResponse
+
+SENSOR_ID = 1
+
+
+def seed(engine, rows: int):
+    now = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        session.execute(insert(Sensor), [{"id": SENSOR_ID, "mac_address": "BE:00:00:01", "name": "Bench"}])
+        session.execute(insert(Measurement), [
+            {
+                "time": now - timedelta(seconds=i),
+                "sensor_id": SENSOR_ID,
+                "temperature": 21.0 + i % 7,
+                "humidity": 45.0,
+                "pressure": 1013.0,
+                "acceleration_x": 0.01,
+                "acceleration_y": -0.02,
+                "acceleration_z": 1.0,
+                "rssi": -70,
+                "battery_voltage": 2.9,
+                "movement_counter": i
+            }
+            for i in range(rows)
+        ])
+        session.commit()
+
+
+def serve_orm(session: Session, limit: int) -> bytes:
+    query = select(Measurement).where(Measurement.sensor_id == SENSOR_ID).order_by(desc(Measurement.time)).limit(limit)
+    measurements = session.execute(query).scalars().all()
+    rows = [
+        MeasurementResponse.model_validate({
+            "sensor_id": measurement.sensor_id,
+            **{field: getattr(measurement, field) for field in MEASUREMENT_FIELDS}
+        })
+        for measurement in measurements
+    ]
+    return json.dumps(jsonable_encoder({"measurements": rows})).encode()
+
+
+def column_query(limit: int):
+    return select(*[getattr(Measurement, field) for field in MEASUREMENT_FIELDS]).where(
+        Measurement.sensor_id == SENSOR_ID
+    ).order_by(desc(Measurement.time)).limit(limit)
+
+
+def serve_core(session: Session, limit: int) -> bytes:
+    rows = session.execute(column_query(limit)).all()
+    return dumps_json({"measurements": [dict(zip(MEASUREMENT_FIELDS, row)) for row in rows]})
+
+
+def serve_columnar(session: Session, limit: int) -> bytes:
+    rows = session.execute(column_query(limit)).all()
+    return dumps_json({"time_unit": "ms", "columns": rows_to_columns(MEASUREMENT_FIELDS, rows)})
+
+
+STRATEGIES = {
+    "orm": serve_orm,
+    "core": serve_core,
+    "columnar": serve_columnar,
+}
+
+
+def run(sizes, repeats: int):
+    engine = create_engine("sqlite://")
+    Sensor.__table__.create(engine)
+    Measurement.__table__.create(engine)
+    seed(engine, max(sizes))
+
+    print(f"{'rows':>6} {'strategy':>9} {'median ms':>10} {'us/row':>7} {'bytes':>9}")
+    for size in sizes:
+        for name, serve in STRATEGIES.items():
+            timings = []
+            for _ in range(repeats):
+                # A fresh session per request, as in the API
+                with Session(engine) as session:
+                    started = time.perf_counter()
+                    body = serve(session, size)
+                    timings.append(time.perf_counter() - started)
+            median = statistics.median(timings)
+            print(f"{size:>6} {name:>9} {median * 1000:>10.2f} {median / size * 1e6:>7.2f} {len(body):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    run(args.rows, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Benchmark GET /sensors/ against a growing number of sensors.
+
+Seeds throw-away sensors (MAC prefix "BE:") with a few measurements each
+into the database pointed to by DATABASE_URL, then times the route and
+counts the SQL statements it issues. Latency should stay roughly flat and
+the statement count constant as the sensor count grows.
+
+    cd backend && PYTHONPATH=. python benchmarks/bench_sensor_list.py --sizes 10 100 1000 2000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, event, insert, select
+from starlette.requests import Request
+
+from app.database import AsyncSessionLocal, engine
+from app.models import Measurement, Sensor, SensorLatest
+from app.cache import response_cache
+from app.routes.sensors import get_all_sensors
+
+MAC_PREFIX = "BE:"
+
+
+def bench_mac(index: int) -> str:
+    return f"{MAC_PREFIX}{(index >> 16) & 0xFF:02X}:{(index >> 8) & 0xFF:02X}:{index & 0xFF:02X}"
+
+
+async def seed(session, start: int, stop: int, measurements_per_sensor: int):
+    result = await session.execute(
+        insert(Sensor).returning(Sensor.id),
+        [{"mac_address": bench_mac(i), "name": f"Bench {i}", "is_active": True} for i in range(start, stop)]
+    )
+    sensor_ids = result.scalars().all()
+
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "time": now - timedelta(minutes=minute),
+            "sensor_id": sensor_id,
+            "temperature": 21.0,
+            "humidity": 45.0,
+            "pressure": 1013.0,
+            "battery_voltage": 2.9
+        }
+        for sensor_id in sensor_ids
+        for minute in range(measurements_per_sensor)
+    ]
+    if rows:
+        await session.execute(insert(Measurement), rows)
+        # What ingestion maintains for each sensor's newest reading
+        await session.execute(insert(SensorLatest), [
+            dict(row) for row in rows[::measurements_per_sensor]
+        ])
+    await session.commit()
+
+
+async def cleanup(session):
+    bench_ids = select(Sensor.id).where(Sensor.mac_address.like(f"{MAC_PREFIX}%"))
+    await session.execute(delete(SensorLatest).where(SensorLatest.sensor_id.in_(bench_ids)))
+    await session.execute(delete(Measurement).where(Measurement.sensor_id.in_(bench_ids)))
+    await session.execute(delete(Sensor).where(Sensor.mac_address.like(f"{MAC_PREFIX}%")))
+    await session.commit()
+
+
+async def run(sizes, repeats: int, measurements_per_sensor: int):
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async with AsyncSessionLocal() as session:
+        await cleanup(session)
+
+    print(f"{'sensors':>8} {'queries':>8} {'median ms':>10} {'p95 ms':>8}")
+    seeded = 0
+    try:
+        for size in sorted(sizes):
+            async with AsyncSessionLocal() as session:
+                await seed(session, seeded, size, measurements_per_sensor)
+            seeded = size
+
+            timings = []
+            for _ in range(repeats):
+                # Measure the database path, not the response cache
+                response_cache.invalidate("sensors")
+                async with AsyncSessionLocal() as session:
+                    statements.clear()
+                    started = time.perf_counter()
+                    await get_all_sensors(request=Request({"type": "http", "headers": []}), active_only=False, limit=None, cursor=None, session=session)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    query_count = len(statements)
+
+            timings.sort()
+            p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+            print(f"{size:>8} {query_count:>8} {statistics.median(timings):>10.1f} {p95:>8.1f}")
+    finally:
+        async with AsyncSessionLocal() as session:
+            await cleanup(session)
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500, 1000, 2000])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--measurements-per-sensor", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.repeats, args.measurements_per_sensor))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.aggregates import (
+    AGGREGATE_COLUMNS, AggregateWatermarks, _aggregate_segment, _raw_segment, ceil_bucket, choose_bucket_width, combine_partials, floor_bucket,
+    next_bucket, plan_segments, series_point
+)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_bucket_helpers():
+    moment = utc(2024, 12, 15, 13, 45)
+    assert floor_bucket(moment, "hourly") == utc(2024, 12, 15, 13)
+    assert floor_bucket(moment, "daily") == utc(2024, 12, 15)
+    assert floor_bucket(moment, "monthly") == utc(2024, 12, 1)
+    assert next_bucket(utc(2024, 12, 1), "monthly") == utc(2025, 1, 1)
+    assert ceil_bucket(moment, "daily") == utc(2024, 12, 16)
+    assert ceil_bucket(utc(2024, 12, 16), "daily") == utc(2024, 12, 16)
+
+
+def test_plan_uses_coarsest_levels_and_raw_tail():
+    watermarks = {
+        "monthly": utc(2024, 3, 1),
+        "daily": utc(2024, 3, 10),
+        "hourly": utc(2024, 3, 10, 14),
+    }
+    segments = plan_segments(utc(2024, 1, 30, 22, 30), None, watermarks)
+
+    assert segments == [
+        ("raw", utc(2024, 1, 30, 22, 30), utc(2024, 1, 30, 23)),
+        ("hourly", utc(2024, 1, 30, 23), utc(2024, 1, 31)),
+        ("daily", utc(2024, 1, 31), utc(2024, 2, 1)),
+        ("monthly", utc(2024, 2, 1), utc(2024, 3, 1)),
+        ("daily", utc(2024, 3, 1), utc(2024, 3, 10)),
+        ("hourly", utc(2024, 3, 10), utc(2024, 3, 10, 14)),
+        ("raw", utc(2024, 3, 10, 14), None),
+    ]
+
+
+def test_plan_falls_back_to_raw_without_aggregates():
+    start, end = utc(2024, 1, 1), utc(2024, 2, 1)
+    assert plan_segments(start, end, {}) == [("raw", start, end)]
+    assert plan_segments(start, end, {"hourly": None}) == [("raw", start, end)]
+
+
+def test_plan_segments_are_contiguous():
+    watermarks = {"daily": utc(2024, 5, 3), "hourly": utc(2024, 5, 3, 6)}
+    start, end = utc(2024, 5, 1, 7, 10), utc(2024, 5, 3, 9, 5)
+    segments = plan_segments(start, end, watermarks)
+
+    assert segments[0][1] == start
+    assert segments[-1][2] == end
+    for previous, following in zip(segments, segments[1:]):
+        assert previous[2] == following[1]
+
+
+def test_combine_partials_weights_by_count():
+    def partial(count, temperature_sum, low, high, battery_sum=None, battery_count=0):
+        return SimpleNamespace(
+            count=count,
+            sum_temperature=temperature_sum, temperature_count=count, min_temperature=low, max_temperature=high,
+            sum_humidity=None, humidity_count=0, min_humidity=None, max_humidity=None,
+            sum_pressure=None, pressure_count=0, min_pressure=None, max_pressure=None,
+            sum_battery=battery_sum, battery_count=battery_count
+        )
+
+    stats = combine_partials([
+        partial(3, 60.0, 19.0, 21.0, battery_sum=8.7, battery_count=3),
+        partial(1, 24.0, 24.0, 24.0),
+        partial(0, None, None, None),
+    ])
+
+    assert stats["count"] == 4
+    assert stats["avg_temp"] == 21.0
+    assert stats["min_temp"] == 19.0
+    assert stats["max_temp"] == 24.0
+    assert stats["avg_humidity"] is None
+    assert round(stats["avg_battery"], 3) == 2.9
+
+
+def test_combine_partials_ignores_null_fields():
+    # Two rows: temperature 20 and NULL, humidity 40 on both, no pressure
+    stats = combine_partials([SimpleNamespace(
+        count=2,
+        sum_temperature=20.0, temperature_count=1, min_temperature=20.0, max_temperature=20.0,
+        sum_humidity=80.0, humidity_count=2, min_humidity=40.0, max_humidity=40.0,
+        sum_pressure=None, pressure_count=0, min_pressure=None, max_pressure=None,
+        sum_battery=None, battery_count=0
+    )])
+
+    assert stats["count"] == 2
+    assert stats["avg_temp"] == 20.0
+    assert stats["avg_humidity"] == 40.0
+    assert stats["avg_pressure"] is None
+
+
+def test_segment_queries_compile():
+    dialect = postgresql.dialect()
+    aggregate_sql = str(_aggregate_segment("daily", 1, utc(2024, 1, 1), utc(2024, 2, 1)).compile(dialect=dialect))
+    raw_sql = str(_raw_segment(1, utc(2024, 1, 1), None).compile(dialect=dialect))
+
+    assert "FROM measurements_daily" in aggregate_sql
+    assert "measurements.time <" not in raw_sql
+    assert "sum(measurements_daily.avg_temperature * measurements_daily.temperature_count)" in aggregate_sql
+    assert "count(measurements.temperature)" in raw_sql
+
+    bucketed_sql = str(_raw_segment(1, utc(2024, 1, 1), None, timedelta(hours=2)).compile(dialect=dialect))
+    assert "GROUP BY time_bucket" in bucketed_sql
+
+
+def test_bucket_width_keeps_payload_bounded():
+    start = utc(2024, 1, 1)
+
+    assert choose_bucket_width(start, start + timedelta(hours=2), 500) == timedelta(minutes=1)
+    assert choose_bucket_width(start, start + timedelta(days=30), 500) == timedelta(hours=2)
+    assert choose_bucket_width(start, start + timedelta(days=365), 100) == timedelta(days=4)
+
+    for days, max_points in ((1, 50), (30, 500), (365, 300)):
+        width = choose_bucket_width(start, start + timedelta(days=days), max_points)
+        assert timedelta(days=days) / width <= max_points - 1
+
+
+def test_series_point_shape():
+    row = SimpleNamespace(
+        bucket=utc(2024, 1, 1), count=2,
+        sum_temperature=42.0, temperature_count=2, min_temperature=20.0, max_temperature=22.0,
+        sum_humidity=90.0, humidity_count=2, min_humidity=44.0, max_humidity=46.0,
+        sum_pressure=2026.0, pressure_count=2, min_pressure=1012.0, max_pressure=1014.0,
+        sum_battery=None, battery_count=0
+    )
+    point = series_point(row)
+
+    assert point["time"] == utc(2024, 1, 1)
+    assert point["temperature"] == 21.0
+    assert (point["temperature_min"], point["temperature_max"]) == (20.0, 22.0)
+    assert point["pressure"] == 1013.0
+    assert point["battery_voltage"] is None
+
+
+class SchemaSession:
+    """Answers the aggregate column lookup, then the watermark query."""
+
+    def __init__(self, columns_by_view, watermark_row):
+        self.columns_by_view = columns_by_view
+        self.watermark_row = watermark_row
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(str(statement))
+        if "pg_attribute" in str(statement):
+            return [(view, name) for view, names in self.columns_by_view.items() for name in names]
+        return SimpleNamespace(one=lambda: self.watermark_row)
+
+
+@pytest.mark.asyncio
+async def test_outdated_aggregates_are_detected_once_and_skipped():
+    old_columns = [name for name in AGGREGATE_COLUMNS if name != "battery_count"]
+    session = SchemaSession(
+        {"measurements_hourly": AGGREGATE_COLUMNS, "measurements_daily": old_columns},
+        SimpleNamespace(hourly=utc(2024, 5, 3, 5))
+    )
+    watermarks = AggregateWatermarks(ttl=0)
+
+    first = await watermarks.get(session)
+    second = await watermarks.get(session)
+
+    assert first == second == {"monthly": None, "daily": None, "hourly": utc(2024, 5, 3, 6)}
+    assert watermarks.levels == ("hourly",)
+    assert sum("pg_attribute" in statement for statement in session.statements) == 1
+    assert all("measurements_daily" not in statement
+               for statement in session.statements if "pg_attribute" not in statement)
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app.alerts import AlertEngine
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def threshold(id=1, sensor_id=1, parameter="temperature", min_value=None, max_value=30.0, severity="critical"):
+    return SimpleNamespace(
+        id=id, sensor_id=sensor_id, parameter=parameter,
+        min_value=min_value, max_value=max_value, severity=severity
+    )
+
+
+def reading(minute, temperature, sensor_id=1):
+    return {"sensor_id": sensor_id, "time": START + timedelta(minutes=minute), "temperature": temperature}
+
+
+def make_engine(*thresholds, open_alerts=()):
+    engine = AlertEngine(refresh_interval=60)
+    engine.load(thresholds, open_alerts)
+    return engine
+
+
+def test_sustained_breach_creates_one_alert():
+    engine = make_engine(threshold())
+    alerts, resolved = engine.evaluate([reading(0, 29.0), reading(1, 31.0), reading(2, 32.5)])
+
+    assert len(alerts) == 1
+    assert alerts[0]["value"] == 31.0
+    assert alerts[0]["threshold_value"] == 30.0
+    assert alerts[0]["severity"] == "critical"
+    assert "trop élevée" in alerts[0]["message"]
+    assert resolved == {}
+
+    alerts, _ = engine.evaluate([reading(3, 33.0)])
+    assert alerts == []
+
+
+def test_hysteresis_keeps_alert_open_near_threshold():
+    engine = make_engine(threshold(), open_alerts=[(1, 1, 30.0)])
+
+    alerts, resolved = engine.evaluate([reading(0, 29.8)])
+    assert alerts == [] and resolved == {}
+
+    alerts, resolved = engine.evaluate([reading(1, 29.4)])
+    assert alerts == []
+    assert resolved == {(1, 1): START + timedelta(minutes=1)}
+    assert engine.stats()["open_alerts"] == 0
+
+
+def test_alert_opened_and_cleared_in_one_batch_is_inserted_resolved():
+    engine = make_engine(threshold(min_value=10.0, max_value=None))
+    alerts, resolved = engine.evaluate([reading(2, 5.0), reading(1, 12.0), reading(3, 11.0)])
+
+    assert len(alerts) == 1
+    assert alerts[0]["is_resolved"] is True
+    assert alerts[0]["resolved_at"] == START + timedelta(minutes=3)
+    assert resolved == {}
+
+
+def test_global_thresholds_and_late_rows():
+    engine = make_engine(threshold(id=5, sensor_id=None))
+    alerts, _ = engine.evaluate([reading(5, 35.0, sensor_id=2)])
+    assert [(alert["threshold_id"], alert["sensor_id"]) for alert in alerts] == [(5, 2)]
+
+    # A late reading does not resolve the breach observed afterwards
+    alerts, resolved = engine.evaluate([reading(1, 20.0, sensor_id=2)])
+    assert alerts == [] and resolved == {}
+    assert engine.stats()["open_alerts"] == 1
+
+
+def test_jump_from_max_to_min_breach_switches_alerts():
+    engine = make_engine(threshold(min_value=10.0, max_value=30.0), open_alerts=[(1, 1, 30.0)])
+
+    alerts, resolved = engine.evaluate([reading(0, 5.0)])
+    assert resolved == {(1, 1): START}
+    assert len(alerts) == 1
+    assert alerts[0]["threshold_value"] == 10.0
+    assert "trop basse" in alerts[0]["message"]
+    assert alerts[0]["is_resolved"] is False
+
+    # The min alert now follows its own hysteresis band
+    alerts, resolved = engine.evaluate([reading(1, 10.2)])
+    assert alerts == [] and resolved == {}
+    assert engine.stats()["open_alerts"] == 1
+
+
+def test_jump_across_the_range_within_one_batch():
+    engine = make_engine(threshold(min_value=10.0, max_value=30.0))
+    alerts, resolved = engine.evaluate([reading(0, 35.0), reading(1, 5.0)])
+
+    assert resolved == {}
+    assert [(alert["threshold_value"], alert["is_resolved"]) for alert in alerts] == [(30.0, True), (10.0, False)]
+    assert alerts[0]["resolved_at"] == START + timedelta(minutes=1)
@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.auth import (
+    PasswordHasher, create_access_token, get_current_user, get_password_hash_async, principal_cache,
+    verify_password_async
+)
+from app.models import User
+
+
+class CountingSession:
+    def __init__(self, user):
+        self.user = user
+        self.queries = 0
+
+    async def execute(self, query):
+        self.queries += 1
+        user = self.user
+
+        class Result:
+            def scalar_one_or_none(self):
+                return user
+        return Result()
+
+
+@pytest.mark.asyncio
+async def test_principal_cache_skips_user_query_until_invalidated():
+    principal_cache.clear()
+    user = User(id=42, username="cached_user", email="c@example.com", password_hash="x", role="admin", is_active=True)
+    session = CountingSession(user)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token({"sub": "cached_user"}))
+
+    first = await get_current_user(credentials, session)
+    second = await get_current_user(credentials, session)
+
+    assert session.queries == 1
+    assert second is not first
+    assert (second.id, second.username, second.role) == (42, "cached_user", "admin")
+
+    principal_cache.invalidate_user(42)
+    await get_current_user(credentials, session)
+    assert session.queries == 2
+
+
+@pytest.mark.asyncio
+async def test_async_password_helpers_round_trip():
+    hashed = await get_password_hash_async("async_password")
+
+    assert await verify_password_async("async_password", hashed) is True
+    assert await verify_password_async("wrong", hashed) is False
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_bounds_waiting_requests():
+    hasher = PasswordHasher(workers=1, max_waiting=1)
+    running = asyncio.create_task(hasher.run(time.sleep, 0.2))
+    await asyncio.sleep(0.05)
+    queued = asyncio.create_task(hasher.run(time.sleep, 0))
+    await asyncio.sleep(0)
+
+    assert hasher.stats()["in_flight"] == 1
+    assert hasher.stats()["waiting"] == 1
+    with pytest.raises(HTTPException) as refused:
+        await hasher.run(time.sleep, 0)
+    assert refused.value.status_code == 503
+
+    await asyncio.gather(running, queued)
+    stats = hasher.stats()
+    assert (stats["completed"], stats["rejected"], stats["waiting"]) == (2, 1, 0)
+    assert stats["max_wait_ms"] > 0
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+from starlette.requests import Request
+
+from app.cache import MemoryCacheBackend, ResponseCache
+
+
+def make_request(etag=None):
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "headers": headers})
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set("a", (b"1", "e1"), ttl=60)
+    backend.set("b", (b"2", "e2"), ttl=60)
+    backend.get("a")
+    backend.set("c", (b"3", "e3"), ttl=60)
+
+    assert backend.get("b") is None
+    assert backend.get("a") == (b"1", "e1")
+    assert len(backend) == 2
+
+
+def test_memory_backend_expires_entries(monkeypatch):
+    backend = MemoryCacheBackend(max_entries=10)
+    backend.set("a", (b"1", "e1"), ttl=5)
+    monkeypatch.setattr(time, "monotonic", lambda: 10 ** 9)
+
+    assert backend.get("a") is None
+    assert len(backend) == 0
+
+
+def test_invalidation_changes_dependent_keys_only():
+    cache = ResponseCache(backend=MemoryCacheBackend(max_entries=10), ttl=60)
+    sensor_key = cache.key("stats", ["sensor:1"], sensor_id=1, hours=24)
+    other_key = cache.key("stats", ["sensor:2"], sensor_id=2, hours=24)
+
+    assert cache.key("stats", ["sensor:1"], hours=24, sensor_id=1) == sensor_key
+    cache.invalidate("sensor:1")
+    assert cache.key("stats", ["sensor:1"], sensor_id=1, hours=24) != sensor_key
+    assert cache.key("stats", ["sensor:2"], sensor_id=2, hours=24) == other_key
+
+
+@pytest.mark.asyncio
+async def test_measurements_invalidate_sensor_list_and_sensors():
+    cache = ResponseCache(backend=MemoryCacheBackend(max_entries=10), ttl=60)
+    list_key = cache.key("sensors", ["sensors"], active_only=True)
+    sensor_key = cache.key("sensor", ["sensor:3"], sensor_id=3)
+
+    await cache.on_measurements([{"sensor_id": 3}, {"sensor_id": 3}])
+
+    assert cache.key("sensors", ["sensors"], active_only=True) != list_key
+    assert cache.key("sensor", ["sensor:3"], sensor_id=3) != sensor_key
+
+
+def test_store_then_lookup_with_etag():
+    cache = ResponseCache(backend=MemoryCacheBackend(max_entries=10), ttl=60)
+    key = cache.key("sensor", ["sensor:1"], sensor_id=1)
+
+    assert cache.lookup(make_request(), key) is None
+    response = cache.store(make_request(), key, {"id": 1, "name": "Bureau"})
+    etag = response.headers["etag"]
+    assert response.status_code == 200
+    assert response.body == b'{"id":1,"name":"Bureau"}'
+
+    assert cache.lookup(make_request(), key).body == response.body
+    assert cache.lookup(make_request(etag), key).status_code == 304
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["not_modified"] == 1
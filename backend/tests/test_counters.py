@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from app.counters import DashboardCounters
+
+
+def loaded_counters(**counts):
+    counters = DashboardCounters(reconcile_interval=60)
+    counters._counts = {"total_sensors": 0, "active_sensors": 0, "unresolved_alerts": 0, "total_users": 0, **counts}
+    return counters
+
+
+def test_adjustments_wait_for_first_reconciliation():
+    counters = DashboardCounters(reconcile_interval=60)
+    counters.sensor_added()
+    assert not counters.loaded
+
+
+def test_sensor_mutations_update_counts():
+    counters = loaded_counters(total_sensors=2, active_sensors=1)
+
+    counters.sensor_added(is_active=True)
+    counters.sensor_activity_changed(was_active=True, is_active=False)
+    counters.sensor_activity_changed(was_active=False, is_active=False)
+    counters.sensor_removed(was_active=False)
+
+    assert counters._counts["total_sensors"] == 2
+    assert counters._counts["active_sensors"] == 1
+
+
+def test_counts_never_go_negative():
+    counters = loaded_counters()
+    counters.adjust("unresolved_alerts", -3)
+    assert counters._counts["unresolved_alerts"] == 0
+
+
+@pytest.mark.asyncio
+async def test_readings_per_minute_and_sensors_seen(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    counters = loaded_counters(total_users=4)
+
+    await counters.on_measurements([{"sensor_id": 1}, {"sensor_id": 2}])
+    now[0] += 30
+    await counters.on_measurements([{"sensor_id": 1}])
+    snapshot = await counters.snapshot()
+    assert snapshot["readings_per_minute"] == 3
+    assert snapshot["sensors_seen_5min"] == 2
+    assert snapshot["total_users"] == 4
+
+    now[0] += 45
+    assert counters.readings_per_minute() == 1
+
+    now[0] += 280
+    assert counters.sensors_seen() == 0
@@ -0,0 +1,51 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+from app.database import ENGINES, PoolMetricsMixin, pool_metrics
+
+
+class MeteredQueuePool(PoolMetricsMixin, QueuePool):
+    pass
+
+
+def make_pool(**kwargs):
+    return MeteredQueuePool(lambda: sqlite3.connect(":memory:"), **kwargs)
+
+
+def test_pool_metrics_count_checkouts():
+    pool = make_pool(pool_size=2, max_overflow=0)
+
+    first = pool.connect()
+    second = pool.connect()
+    metrics = pool.metrics()
+    assert metrics["checkouts"] == 2
+    assert metrics["checked_out"] == 2
+    assert metrics["timeouts"] == 0
+
+    first.close()
+    second.close()
+    assert pool.metrics()["checked_out"] == 0
+    assert pool.metrics()["checked_in"] == 2
+
+
+def test_pool_metrics_count_timeouts():
+    pool = make_pool(pool_size=1, max_overflow=0, timeout=0.05)
+
+    held = pool.connect()
+    with pytest.raises(exc.TimeoutError):
+        pool.connect()
+    held.close()
+
+    metrics = pool.metrics()
+    assert metrics["timeouts"] == 1
+    assert metrics["checkouts"] == 1
+
+
+def test_separate_pools_per_workload():
+    assert set(ENGINES) == {"api", "ingest", "export"}
+    metrics = pool_metrics()
+    assert metrics["ingest"]["checked_out"] == 0
+    assert "avg_wait_ms" in metrics["export"]
@@ -0,0 +1,45 @@
+from app.deduplicator import ReadingDeduplicator
+
+VALUES = (21.5, 45.0, 1012.0, 0.1, 0.0, 1.0, -60, 2.9, 3)
+STAMP = "2026-01-01T10:00:00"
+
+
+def test_same_reading_on_two_topics_is_a_duplicate():
+    dedupe = ReadingDeduplicator(window=10.0, max_entries=100)
+
+    assert dedupe.is_duplicate(1, "2026-01-01T10:00:00", VALUES, now=0.0) is False
+    assert dedupe.is_duplicate(1, "2026-01-01T10:00:00", VALUES, now=0.1) is True
+    assert dedupe.stats()["hit_rate"] == 0.5
+
+
+def test_different_timestamp_or_sensor_is_not_a_duplicate():
+    dedupe = ReadingDeduplicator(window=10.0, max_entries=100)
+    dedupe.is_duplicate(1, "2026-01-01T10:00:00", VALUES, now=0.0)
+
+    assert dedupe.is_duplicate(1, "2026-01-01T10:00:05", VALUES, now=0.1) is False
+    assert dedupe.is_duplicate(2, "2026-01-01T10:00:00", VALUES, now=0.1) is False
+
+
+def test_entries_expire_after_window():
+    dedupe = ReadingDeduplicator(window=10.0, max_entries=100)
+    dedupe.is_duplicate(1, STAMP, VALUES, now=0.0)
+
+    assert dedupe.is_duplicate(1, STAMP, VALUES, now=11.0) is False
+    assert dedupe.stats()["tracked"] == 1
+
+
+def test_tracked_entries_are_bounded():
+    dedupe = ReadingDeduplicator(window=10.0, max_entries=3)
+    for sensor_id in range(10):
+        dedupe.is_duplicate(sensor_id, STAMP, VALUES, now=0.0)
+
+    assert dedupe.stats()["tracked"] == 3
+
+
+def test_readings_without_device_timestamp_are_never_dropped():
+    dedupe = ReadingDeduplicator(window=10.0, max_entries=100)
+
+    assert dedupe.is_duplicate(1, None, VALUES, now=0.0) is False
+    assert dedupe.is_duplicate(1, None, VALUES, now=1.0) is False
+    assert dedupe.stats()["tracked"] == 0
+    assert dedupe.stats()["unstamped"] == 2
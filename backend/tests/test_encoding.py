@@ -0,0 +1,69 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+from starlette.requests import Request
+
+from app.encoding import dumps_json, encode_series, negotiate_format, rows_to_columns
+
+FIELDS = ("time", "temperature", "humidity")
+ROWS = [
+    (datetime(2024, 1, 1, tzinfo=timezone.utc), 21.5, 40.0),
+    (datetime(2024, 1, 1, 0, 1, tzinfo=timezone.utc), 21.6, None),
+]
+
+
+def make_request(accept=None):
+    headers = [(b"accept", accept.encode())] if accept else []
+    return Request({"type": "http", "headers": headers})
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, "json"),
+    ("*/*", "json"),
+    ("application/msgpack", "msgpack"),
+    ("application/vnd.sumatosensa.columnar+json, application/json;q=0.5", "columnar"),
+    ("application/json, application/msgpack", "json"),
+    ("application/json;q=0.2, application/x-msgpack", "msgpack"),
+    ("application/msgpack;q=0", "json"),
+])
+def test_negotiate_format_from_accept(accept, expected):
+    assert negotiate_format(make_request(accept)) == expected
+
+
+def test_format_parameter_wins_over_accept():
+    assert negotiate_format(make_request("application/msgpack"), "columnar") == "columnar"
+    with pytest.raises(ValueError):
+        negotiate_format(make_request(), "xml")
+
+
+def test_rows_to_columns_transposes_and_converts_time():
+    columns = rows_to_columns(FIELDS, ROWS)
+
+    assert columns["time"] == [1704067200000, 1704067260000]
+    assert columns["temperature"] == [21.5, 21.6]
+    assert columns["humidity"] == [40.0, None]
+    assert rows_to_columns(FIELDS, []) == {"time": [], "temperature": [], "humidity": []}
+
+
+def test_columnar_json_is_smaller_than_rows():
+    body, media_type = encode_series("columnar", {"sensor_id": 1}, FIELDS, ROWS * 100)
+    rows_body = dumps_json({"sensor_id": 1, "measurements": [dict(zip(FIELDS, row)) for row in ROWS * 100]})
+
+    document = json.loads(body)
+    assert media_type == "application/vnd.sumatosensa.columnar+json"
+    assert document["time_unit"] == "ms"
+    assert len(document["columns"]["temperature"]) == 200
+    assert len(body) < len(rows_body) / 2
+
+
+def test_msgpack_series_round_trip():
+    msgpack = pytest.importorskip("msgpack")
+    body, media_type = encode_series("msgpack", {"sensor_id": 1}, FIELDS, ROWS)
+
+    assert media_type == "application/msgpack"
+    assert msgpack.unpackb(body)["columns"]["temperature"] == [21.5, 21.6]
+
+
+def test_dumps_json_matches_isoformat_for_datetimes():
+    assert json.loads(dumps_json({"time": ROWS[0][0]})) == {"time": "2024-01-01T00:00:00+00:00"}
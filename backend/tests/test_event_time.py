@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.event_time import AGGREGATE_REFRESH_WINDOW, EventTimePolicy, parse_event_time
+
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def test_parse_event_time_formats():
+    expected = datetime(2026, 3, 1, 11, 59, 30, tzinfo=timezone.utc)
+
+    assert parse_event_time("2026-03-01T11:59:30") == expected
+    assert parse_event_time("2026-03-01T11:59:30Z") == expected
+    assert parse_event_time("2026-03-01T12:59:30+01:00") == expected
+    assert parse_event_time(expected.timestamp()) == expected
+    assert parse_event_time(int(expected.timestamp() * 1000)) == expected
+    assert parse_event_time(str(int(expected.timestamp() * 1000))) == expected
+    assert parse_event_time("not a date") is None
+    assert parse_event_time(None) is None
+
+
+def make_policy(late_policy="backfill"):
+    return EventTimePolicy(max_clock_skew=60, late_after=300, max_lateness=86400, late_policy=late_policy)
+
+
+def test_device_time_is_used_when_recent():
+    policy = make_policy()
+    event_time = NOW - timedelta(seconds=10)
+
+    assert policy.resolve(event_time.isoformat(), now=NOW) == (event_time, False)
+
+
+def test_missing_timestamp_uses_arrival_time():
+    assert make_policy().resolve(None, now=NOW) == (NOW, False)
+
+
+def test_future_timestamp_beyond_skew_is_clamped():
+    policy = make_policy()
+
+    assert policy.resolve((NOW + timedelta(minutes=5)).isoformat(), now=NOW) == (NOW, False)
+    assert policy.future_clamped == 1
+
+
+@pytest.mark.parametrize("late_policy,expected", [
+    ("backfill", (NOW - timedelta(hours=1), True)),
+    ("clamp", (NOW, False)),
+    ("drop", (None, False)),
+])
+def test_late_policies(late_policy, expected):
+    policy = make_policy(late_policy)
+
+    assert policy.resolve((NOW - timedelta(hours=1)).isoformat(), now=NOW) == expected
+
+
+def test_readings_older_than_max_lateness_are_dropped():
+    policy = make_policy()
+
+    assert policy.resolve((NOW - timedelta(days=2)).isoformat(), now=NOW) == (None, False)
+    assert policy.late_dropped == 1
+
+
+def test_default_lateness_stays_within_aggregate_refresh_window():
+    policy = EventTimePolicy(late_policy="backfill")
+
+    assert policy.max_lateness <= AGGREGATE_REFRESH_WINDOW
+    assert policy.resolve((NOW - timedelta(days=6)).isoformat(), now=NOW)[1] is True
+    assert policy.resolve((NOW - timedelta(days=8)).isoformat(), now=NOW) == (None, False)
@@ -0,0 +1,97 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.exporter import EXPORT_FIELDS, build_export_query, encode_chunks
+
+
+def make_row(sensor_id, temperature):
+    return (datetime(2024, 1, 1, tzinfo=timezone.utc), sensor_id, temperature, 45.0, 1013.0,
+            None, None, None, -70, 2.9, 12)
+
+
+async def chunked(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(format, compress=False, chunks=None):
+    chunks = chunks if chunks is not None else ([make_row(1, 21.0), make_row(2, 22.5)], [make_row(3, 19.0)])
+    data = b"".join([part async for part in encode_chunks(chunked(*chunks), format, compress)])
+    return gzip.decompress(data) if compress else data
+
+
+@pytest.mark.asyncio
+async def test_json_export_is_valid_document():
+    document = json.loads(await collect("json"))
+
+    assert document["count"] == 3
+    assert [row["sensor_id"] for row in document["data"]] == [1, 2, 3]
+    assert document["data"][0]["time"] == "2024-01-01T00:00:00+00:00"
+
+
+@pytest.mark.asyncio
+async def test_empty_json_export():
+    document = json.loads(await collect("json", chunks=[]))
+    assert document["data"] == [] and document["count"] == 0
+
+
+@pytest.mark.asyncio
+async def test_csv_export_has_header_and_rows():
+    rows = list(csv.reader(io.StringIO((await collect("csv")).decode())))
+
+    assert rows[0] == list(EXPORT_FIELDS)
+    assert len(rows) == 4
+    assert rows[2][1:3] == ["2", "22.5"]
+    assert rows[1][5] == ""
+
+
+@pytest.mark.asyncio
+async def test_gzip_ndjson_export():
+    lines = (await collect("ndjson", compress=True)).decode().splitlines()
+
+    assert [json.loads(line)["temperature"] for line in lines] == [21.0, 22.5, 19.0]
+
+
+def test_export_query_selects_columns_only():
+    sql = str(build_export_query(sensor_ids=[1, 2]).compile(dialect=postgresql.dialect()))
+
+    assert sql.startswith("SELECT measurements.time, measurements.sensor_id")
+    assert "ORDER BY measurements.time DESC" in sql
+
+
+@pytest.mark.asyncio
+async def test_parquet_export_round_trips():
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    from app.exporter import encode_columnar
+
+    data = b"".join([part async for part in encode_columnar(
+        chunked([make_row(1, 21.0), make_row(2, 22.5)], [make_row(3, 19.0)]), "parquet"
+    )])
+    table = pq.read_table(pa.BufferReader(data))
+
+    assert table.column_names == list(EXPORT_FIELDS)
+    assert table.column("temperature").to_pylist() == [21.0, 22.5, 19.0]
+    assert table.column("acceleration_x").null_count == 3
+
+
+@pytest.mark.asyncio
+async def test_partitioned_arrow_export_is_zip_per_sensor():
+    pa = pytest.importorskip("pyarrow")
+    import zipfile
+    from app.exporter import encode_columnar
+
+    rows = [make_row(1, 20.0), make_row(1, 21.0), make_row(2, 22.0)]
+    data = b"".join([part async for part in encode_columnar(chunked(rows[:1], rows[1:]), "arrow", "sensor")])
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.namelist() == ["sensor_1.arrows", "sensor_2.arrows"]
+        table = pa.ipc.open_stream(archive.read("sensor_1.arrows")).read_all()
+
+    assert table.column("temperature").to_pylist() == [20.0, 21.0]
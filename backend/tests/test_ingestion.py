@@ -0,0 +1,78 @@
+import pytest
+from app.ingestion import MeasurementWriter
+
+
+def make_row(sensor_id=1, temperature=21.0):
+    return {"sensor_id": sensor_id, "temperature": temperature}
+
+
+class RecordingWriter(MeasurementWriter):
+    def __init__(self, *args, fail=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches = []
+        self.fail = fail
+
+    async def _write(self, batch):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        self.batches.append(batch)
+        self.written += len(batch)
+
+
+def test_backlog_drops_oldest_rows():
+    writer = RecordingWriter(batch_size=10, flush_interval=1.0, max_backlog=3)
+    for i in range(5):
+        writer.add(make_row(temperature=float(i)))
+
+    assert writer.pending == 3
+    assert writer.dropped == 2
+    assert [row["temperature"] for row in writer._buffer] == [2.0, 3.0, 4.0]
+
+
+def test_size_trigger_requests_flush():
+    writer = RecordingWriter(batch_size=2, flush_interval=60.0, max_backlog=100)
+    writer.add(make_row())
+    assert not writer._flush_requested.is_set()
+
+    writer.add(make_row())
+    assert writer._flush_requested.is_set()
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_in_batches():
+    writer = RecordingWriter(batch_size=2, flush_interval=1.0, max_backlog=100)
+    for i in range(5):
+        writer.add(make_row(sensor_id=i))
+
+    await writer.flush()
+
+    assert [len(batch) for batch in writer.batches] == [2, 2, 1]
+    assert writer.pending == 0
+    assert writer.written == 5
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_rows_buffered():
+    writer = RecordingWriter(batch_size=2, flush_interval=1.0, max_backlog=100, fail=True)
+    for i in range(3):
+        writer.add(make_row(sensor_id=i))
+
+    await writer.flush()
+
+    assert writer.pending == 3
+    assert [row["sensor_id"] for row in writer._buffer] == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_backfill_rows_are_written_sorted_by_time():
+    writer = RecordingWriter(batch_size=2, flush_interval=1.0, max_backlog=100, backfill_batch_size=10)
+    for hour in (5, 1, 3):
+        writer.add({"sensor_id": 1, "time": hour}, backfill=True)
+    writer.add(make_row())
+
+    await writer.flush(include_backfill=False)
+    assert writer.pending_backfill == 3
+
+    await writer.flush()
+    assert [row["time"] for row in writer.batches[-1]] == [1, 3, 5]
+    assert writer.pending_backfill == 0
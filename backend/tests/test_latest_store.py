@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta, timezone
+from app.latest_store import LatestReadings, battery_level_from_voltage
+
+T0 = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def reading(sensor_id, minutes, temperature):
+    return {"sensor_id": sensor_id, "time": T0 + timedelta(minutes=minutes), "temperature": temperature}
+
+
+def test_battery_level_matches_frontend_scale():
+    assert battery_level_from_voltage(3.0) == 100.0
+    assert battery_level_from_voltage(2.75) == 50.0
+    assert battery_level_from_voltage(2.2) == 0.0
+    assert battery_level_from_voltage(None) is None
+
+
+def test_update_keeps_newest_reading_per_sensor():
+    latest = LatestReadings()
+
+    newest = latest.update([reading(1, 0, 20.0), reading(1, 2, 22.0), reading(1, 1, 21.0), reading(2, 0, 18.0)])
+
+    assert latest.get(1)["temperature"] == 22.0
+    assert latest.get(2)["temperature"] == 18.0
+    assert sorted(row["sensor_id"] for row in newest) == [1, 2]
+
+
+def test_backfilled_rows_do_not_replace_newer_reading():
+    latest = LatestReadings()
+    latest.update([reading(1, 10, 25.0)])
+
+    assert latest.update([reading(1, -60, 15.0)]) == []
+    assert latest.get(1)["temperature"] == 25.0
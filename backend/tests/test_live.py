@@ -0,0 +1,96 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.latest_store import latest_readings
+from app.live import LiveHub
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def row(sensor_id, second, temperature=21.0):
+    return {"sensor_id": sensor_id, "time": START + timedelta(seconds=second), "temperature": temperature}
+
+
+def drain(subscriber):
+    messages = []
+    while not subscriber.queue.empty():
+        messages.append(subscriber.queue.get_nowait())
+    return messages
+
+
+def readings(message):
+    message = json.loads(message)
+    assert message["type"] == "readings"
+    return message["data"]
+
+
+@pytest.mark.asyncio
+async def test_readings_are_coalesced_per_sensor():
+    hub = LiveHub(max_rate=1.0, queue_size=10)
+    subscriber = hub.subscribe([1, 2])
+    drain(subscriber)
+
+    await hub.publish([row(1, 0, 20.0), row(1, 2, 22.0), row(1, 1, 21.0), row(2, 0), row(3, 0)])
+    hub.flush()
+
+    messages = drain(subscriber)
+    assert len(messages) == 1
+    assert {reading["sensor_id"]: reading["temperature"] for reading in readings(messages[0])} == {1: 22.0, 2: 21.0}
+    assert hub.stats()["coalesced"] == 1
+
+    hub.flush()
+    assert drain(subscriber) == []
+
+
+@pytest.mark.asyncio
+async def test_subscription_can_change():
+    hub = LiveHub(max_rate=1.0, queue_size=10)
+    subscriber = hub.subscribe([1])
+    hub.update_subscription(subscriber, None)
+    drain(subscriber)
+
+    await hub.publish([row(5, 0)])
+    hub.flush()
+    assert readings(drain(subscriber)[0])[0]["sensor_id"] == 5
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_evicted():
+    hub = LiveHub(max_rate=1.0, queue_size=2)
+    slow = hub.subscribe([1, 2, 3])
+    fast = hub.subscribe([1])
+    drain(slow)
+    drain(fast)
+
+    for second in range(3):
+        await hub.publish([row(1, second), row(2, second), row(3, second)])
+        hub.flush()
+        drain(fast)
+
+    assert slow.evicted
+    assert await slow.next_message() is None
+    assert hub.stats()["subscribers"] == 1
+    assert hub.stats()["evicted"] == 1
+    assert not fast.evicted
+
+
+@pytest.mark.asyncio
+async def test_more_sensors_than_queue_size_fit_in_one_message(monkeypatch):
+    monkeypatch.setattr(latest_readings, "_latest", {})
+    latest_readings.update([row(sensor_id, 0) for sensor_id in range(50)])
+    hub = LiveHub(max_rate=1.0, queue_size=2)
+
+    subscriber = hub.subscribe()
+    snapshot = drain(subscriber)
+    assert len(snapshot) == 1
+    assert len(readings(snapshot[0])) == 50
+
+    await hub.publish([row(sensor_id, 1) for sensor_id in range(50)])
+    hub.flush()
+
+    messages = drain(subscriber)
+    assert not subscriber.evicted
+    assert len(messages) == 1
+    assert sorted(reading["sensor_id"] for reading in readings(messages[0])) == list(range(50))
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import pytest
+from app.message_bridge import MessageBridge
+
+
+async def submit_from_thread(bridge, messages):
+    def run():
+        for message in messages:
+            bridge.submit(message)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    await asyncio.to_thread(thread.join)
+    # Let the scheduled drain callbacks run
+    await asyncio.sleep(0.01)
+
+
+def make_messages(count):
+    return [(f"sensor/AA/data", str(i), 0.0) for i in range(count)]
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        MessageBridge(maxsize=10, overflow_policy="explode")
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_keeps_newest_messages():
+    bridge = MessageBridge(maxsize=3, overflow_policy="drop_oldest")
+    bridge.bind(asyncio.get_running_loop())
+
+    await submit_from_thread(bridge, make_messages(5))
+
+    payloads = [bridge.queue.get_nowait()[1] for _ in range(bridge.queue.qsize())]
+    assert payloads == ["2", "3", "4"]
+    assert bridge.dropped == 2
+    assert bridge.received == 5
+
+
+@pytest.mark.asyncio
+async def test_counters_are_exact_with_concurrent_submitters():
+    bridge = MessageBridge(maxsize=50, overflow_policy="drop_oldest")
+    bridge.bind(asyncio.get_running_loop())
+
+    await asyncio.gather(*[submit_from_thread(bridge, make_messages(2000)) for _ in range(4)])
+
+    stats = bridge.stats()
+    assert stats["received"] == 8000
+    assert stats["received"] == stats["dropped"] + stats["queue_depth"]
+
+
+@pytest.mark.asyncio
+async def test_spill_and_replay_loses_nothing(tmp_path):
+    bridge = MessageBridge(maxsize=2, overflow_policy="spill", spill_path=str(tmp_path / "spill.jsonl"))
+    bridge.bind(asyncio.get_running_loop())
+
+    await submit_from_thread(bridge, make_messages(5))
+    assert bridge.queue.qsize() == 2
+    assert bridge.spilled == 3
+
+    delivered = []
+    while bridge.queue.qsize() or bridge.stats()["spilled_pending"]:
+        while bridge.queue.qsize():
+            delivered.append(bridge.queue.get_nowait()[1])
+        await bridge.replay_spilled()
+
+    assert sorted(delivered) == ["0", "1", "2", "3", "4"]
+    assert bridge.replayed == 3
+    assert not (tmp_path / "spill.jsonl").exists()
+
+
+@pytest.mark.asyncio
+async def test_block_waits_for_room():
+    bridge = MessageBridge(maxsize=1, overflow_policy="block")
+    bridge.bind(asyncio.get_running_loop())
+
+    thread = threading.Thread(target=lambda: [bridge.submit(m) for m in make_messages(3)])
+    thread.start()
+
+    received = []
+    for _ in range(3):
+        received.append((await asyncio.wait_for(bridge.queue.get(), timeout=2))[1])
+    await asyncio.to_thread(thread.join)
+
+    assert received == ["0", "1", "2"]
+    assert bridge.dropped == 0
@@ -0,0 +1,44 @@
+import asyncio
+import time
+import pytest
+from app.mqtt_client import MQTTClient
+
+
+def test_shard_key_uses_sensor_identifier():
+    assert MQTTClient.shard_key("sensors/ruuvitag/AA:BB/temperature") == "AA:BB"
+    assert MQTTClient.shard_key("sensors/ruuvitag/AA:BB/data") == "AA:BB"
+    assert MQTTClient.shard_key("sensor/AA:BB/data") == "AA:BB"
+    assert MQTTClient.shard_key("wirepas-json-event/packet/net/42/1") == "wirepas_42"
+    assert MQTTClient.shard_key("gw-event/received_data") == "gw-event/received_data"
+
+
+def test_same_sensor_always_lands_on_same_worker():
+    client = MQTTClient()
+    assert client.shard_for("sensors/ruuvitag/AA:BB/data") == client.shard_for("sensor/AA:BB/data")
+
+
+@pytest.mark.asyncio
+async def test_workers_keep_per_sensor_order_and_drain():
+    client = MQTTClient()
+    handled = []
+
+    async def process_message(topic, payload):
+        await asyncio.sleep(0)
+        handled.append((topic, payload))
+
+    client.process_message = process_message
+    client.running = True
+    client.worker_tasks = [asyncio.create_task(client._worker(i)) for i in range(client.worker_count)]
+    client.processor_task = asyncio.create_task(client._process_messages())
+
+    for i in range(20):
+        for mac in ("AA", "BB", "CC"):
+            client.message_queue.put_nowait((f"sensor/{mac}/data", str(i), time.monotonic()))
+
+    await client.disconnect()
+
+    assert len(handled) == 60
+    for mac in ("AA", "BB", "CC"):
+        payloads = [payload for topic, payload in handled if topic == f"sensor/{mac}/data"]
+        assert payloads == [str(i) for i in range(20)]
+    assert sum(stats.processed for stats in client.worker_stats) == 60
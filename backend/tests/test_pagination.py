@@ -0,0 +1,56 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.models import Measurement, User
+from app.pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page, split_page
+
+
+def compile_query(query) -> str:
+    return str(query.compile(dialect=postgresql.dialect()))
+
+
+def test_cursor_round_trip_keeps_datetimes():
+    time = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    token = encode_cursor({"time": time, "sensor_id": 3})
+
+    assert "=" not in token
+    assert decode_cursor(token, ("time", "sensor_id")) == {"time": time, "sensor_id": 3}
+
+
+@pytest.mark.parametrize("token", ["not-a-cursor", encode_cursor({"other": 1}), ""])
+def test_invalid_cursor_is_rejected(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, ("id",))
+
+
+def test_keyset_page_seeks_instead_of_offset():
+    query = keyset_page(select(User), [User.id], [42], 10)
+    sql = compile_query(query)
+
+    assert "users.id > " in sql
+    assert "ORDER BY users.id ASC" in sql
+    assert "OFFSET" not in sql
+
+
+def test_keyset_page_descending_on_several_columns():
+    query = keyset_page(
+        select(Measurement), [Measurement.time, Measurement.sensor_id],
+        [datetime(2024, 5, 1, tzinfo=timezone.utc), 3], 10, descending=True
+    )
+    sql = compile_query(query)
+
+    assert "(measurements.time, measurements.sensor_id) < " in sql
+    assert "ORDER BY measurements.time DESC, measurements.sensor_id DESC" in sql
+
+
+def test_split_page_only_returns_cursor_when_more_rows():
+    rows, cursor = split_page([1, 2, 3], 3, lambda row: {"id": row})
+    assert rows == [1, 2, 3]
+    assert cursor is None
+
+    rows, cursor = split_page([1, 2, 3, 4], 3, lambda row: {"id": row})
+    assert rows == [1, 2, 3]
+    assert decode_cursor(cursor, ("id",)) == {"id": 3}
@@ -0,0 +1,67 @@
+from app.reading_merger import ReadingMerger
+
+
+def add_all_partials(merger, sensor_id, now):
+    completed = []
+    completed += merger.add_partial(sensor_id, "temperature", {"temperature": 21.5}, now)
+    completed += merger.add_partial(sensor_id, "humidity", {"humidity": 45.0}, now)
+    completed += merger.add_partial(sensor_id, "pressure", {"pressure": 1012.0}, now)
+    completed += merger.add_partial(sensor_id, "battery", {"battery_voltage": 2.9}, now)
+    completed += merger.add_partial(
+        sensor_id, "acceleration",
+        {"acceleration_x": 0.1, "acceleration_y": 0.0, "acceleration_z": 1.0, "movement_counter": 3},
+        now
+    )
+    return completed
+
+
+def test_complete_set_of_partials_is_emitted_once():
+    merger = ReadingMerger(window=2.0)
+
+    completed = add_all_partials(merger, 1, now=100.0)
+
+    assert len(completed) == 1
+    assert completed[0]["temperature"] == 21.5
+    assert completed[0]["acceleration_z"] == 1.0
+    assert completed[0]["battery_voltage"] == 2.9
+
+
+def test_repeated_metric_starts_a_new_reading():
+    merger = ReadingMerger(window=2.0)
+
+    assert merger.add_partial(1, "temperature", {"temperature": 21.0}, 100.0) == []
+    completed = merger.add_partial(1, "temperature", {"temperature": 22.0}, 100.5)
+
+    assert completed == [{"temperature": 21.0}]
+
+
+def test_expired_window_is_flushed():
+    merger = ReadingMerger(window=2.0)
+    merger.add_partial(1, "temperature", {"temperature": 21.0}, 100.0)
+    merger.add_partial(1, "humidity", {"humidity": 40.0}, 100.1)
+
+    assert merger.expire(now=101.0) == []
+    assert merger.expire(now=102.5) == [(1, {"temperature": 21.0, "humidity": 40.0})]
+
+
+def test_partials_after_full_reading_are_deduplicated():
+    merger = ReadingMerger(window=2.0)
+
+    assert merger.add_full(1, now=100.0) is True
+    assert add_all_partials(merger, 1, now=100.2) == []
+    assert merger.deduplicated == 5
+
+
+def test_full_reading_after_merged_partials_is_skipped():
+    merger = ReadingMerger(window=2.0)
+    add_all_partials(merger, 1, now=100.0)
+
+    assert merger.add_full(1, now=100.3) is False
+
+
+def test_full_reading_supersedes_open_partials():
+    merger = ReadingMerger(window=2.0)
+    merger.add_partial(1, "temperature", {"temperature": 21.0}, 100.0)
+
+    assert merger.add_full(1, now=100.1) is True
+    assert merger.expire(now=200.0) == []
@@ -0,0 +1,96 @@
+import csv
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app import reports
+from app.reports import REPORT_COLUMNS, ReportJobs, report_row, write_csv
+
+
+def make_point(**values):
+    point = {
+        "time": datetime(2024, 3, 1, tzinfo=timezone.utc), "count": 24,
+        "temperature": 21.456, "temperature_min": 18.0, "temperature_max": 24.0,
+        "humidity": None, "humidity_min": None, "humidity_max": None,
+        "pressure": 1013.0, "pressure_min": 1010.0, "pressure_max": 1016.0,
+        "battery_voltage": 2.8912,
+    }
+    point.update(values)
+    return point
+
+
+def test_report_row_rounds_and_keeps_missing_values():
+    sensor = SimpleNamespace(id=3, name="Salle serveur")
+    row = report_row(sensor, make_point())
+
+    assert len(row) == len(REPORT_COLUMNS)
+    assert row[:4] == [3, "Salle serveur", "2024-03-01T00:00:00+00:00", 24]
+    assert row[4] == 21.46
+    assert row[7] is None
+    assert row[-1] == 2.891
+
+
+def test_write_csv_replaces_file_atomically(tmp_path):
+    path = str(tmp_path / "report_1.csv")
+    write_csv(path, [report_row(SimpleNamespace(id=1, name="A"), make_point())])
+
+    with open(path, newline="") as handle:
+        rows = list(csv.reader(handle))
+    assert rows[0] == list(REPORT_COLUMNS)
+    assert rows[1][1] == "A"
+    assert not (tmp_path / "report_1.csv.part").exists()
+
+
+def test_submit_queues_report_ids(tmp_path):
+    jobs = ReportJobs(workers=1, reports_dir=str(tmp_path))
+    jobs.submit(7)
+    jobs.submit(8)
+
+    assert jobs.stats()["queued"] == 2
+    assert jobs.queue.get_nowait() == 7
+
+
+class TrackingSession:
+    """Stands in for an API pool session and counts how many are open."""
+
+    open_sessions = 0
+    statements = []
+
+    async def __aenter__(self):
+        TrackingSession.open_sessions += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        TrackingSession.open_sessions -= 1
+
+    async def execute(self, statement):
+        TrackingSession.statements.append(statement)
+        return SimpleNamespace(scalar_one_or_none=lambda: 7)
+
+    async def get(self, model, report_id):
+        return SimpleNamespace(id=report_id)
+
+    async def commit(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_run_holds_no_api_session_while_generating(tmp_path, monkeypatch):
+    monkeypatch.setattr(reports, "AsyncSessionLocal", TrackingSession)
+    monkeypatch.setattr(reports, "ExportSessionLocal", TrackingSession)
+    TrackingSession.statements = []
+    jobs = ReportJobs(workers=1, reports_dir=str(tmp_path))
+
+    async def generate(read_session, report):
+        # Only the export session itself is open
+        assert TrackingSession.open_sessions == 1
+        return "report_7.csv"
+
+    monkeypatch.setattr(jobs, "generate", generate)
+    await jobs.run(7)
+
+    assert jobs.stats()["completed"] == 1
+    assert TrackingSession.open_sessions == 0
+    final_update = TrackingSession.statements[-1].compile().params
+    assert (final_update["status"], final_update["file_path"]) == ("completed", "report_7.csv")
@@ -0,0 +1,68 @@
+import asyncio
+import pytest
+from app.sensor_registry import SensorRegistry
+
+
+class FakeRegistry(SensorRegistry):
+    def __init__(self):
+        super().__init__()
+        self.inserts = []
+
+    async def _insert(self, mac_address):
+        self.inserts.append(mac_address)
+        await asyncio.sleep(0)
+        return 100 + len(self.inserts)
+
+
+@pytest.mark.asyncio
+async def test_known_sensor_is_answered_from_memory():
+    registry = FakeRegistry()
+    registry.remember("AA:BB:CC:DD:EE:FF", 7)
+
+    assert await registry.get_or_create("AA:BB:CC:DD:EE:FF") == 7
+    assert registry.inserts == []
+    assert registry.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_first_sightings_share_one_insert():
+    registry = FakeRegistry()
+
+    ids = await asyncio.gather(*[registry.get_or_create("AA:BB:CC:DD:EE:FF") for _ in range(5)])
+
+    assert ids == [101] * 5
+    assert registry.inserts == ["AA:BB:CC:DD:EE:FF"]
+    assert registry.get("AA:BB:CC:DD:EE:FF") == 101
+
+
+@pytest.mark.asyncio
+async def test_invalidate_forces_a_new_lookup():
+    registry = FakeRegistry()
+    registry.remember("AA:BB:CC:DD:EE:FF", 7)
+    registry.invalidate("AA:BB:CC:DD:EE:FF")
+
+    assert await registry.get_or_create("AA:BB:CC:DD:EE:FF") == 101
+    assert registry.inserts == ["AA:BB:CC:DD:EE:FF"]
+
+
+class SlowRegistry(FakeRegistry):
+    async def _insert(self, mac_address):
+        if not self.inserts:
+            # The first insert hangs until its task is cancelled
+            self.inserts.append(mac_address)
+            await asyncio.Event().wait()
+        return await super()._insert(mac_address)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_creator_does_not_strand_waiters():
+    registry = SlowRegistry()
+    creator = asyncio.create_task(registry.get_or_create("AA:BB:CC:DD:EE:FF"))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(registry.get_or_create("AA:BB:CC:DD:EE:FF"))
+    await asyncio.sleep(0)
+
+    creator.cancel()
+    assert await asyncio.wait_for(waiter, timeout=1) == 102
+    assert creator.cancelled()
+    assert registry.get("AA:BB:CC:DD:EE:FF") == 102
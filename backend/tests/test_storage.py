@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app.storage import (
+    MAX_CHUNK_INTERVAL, MIN_CHUNK_INTERVAL, chunk_entry, compression_ratio, storage_summary,
+    suggest_chunk_interval
+)
+
+MB = 1024 * 1024
+
+
+def make_row(name, is_compressed, total_bytes, before=None, after=None, rows=1000):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return SimpleNamespace(
+        chunk_schema="_timescaledb_internal", chunk_name=name,
+        range_start=start, range_end=start + timedelta(days=1),
+        is_compressed=is_compressed, total_bytes=total_bytes,
+        before_compression_total_bytes=before, after_compression_total_bytes=after,
+        approximate_rows=rows
+    )
+
+
+def test_compression_ratio():
+    assert compression_ratio(1000, 100) == 10.0
+    assert compression_ratio(None, 100) is None
+    assert compression_ratio(1000, 0) is None
+
+
+def test_suggest_chunk_interval_is_clamped_to_whole_hours():
+    assert suggest_chunk_interval(10 * MB, 512 * MB) == timedelta(hours=51)
+    assert suggest_chunk_interval(1024 * MB, 512 * MB) == MIN_CHUNK_INTERVAL
+    assert suggest_chunk_interval(1, 512 * MB) == MAX_CHUNK_INTERVAL
+    assert suggest_chunk_interval(0, 512 * MB) == MAX_CHUNK_INTERVAL
+
+
+def test_chunk_entries_and_summary():
+    chunks = [
+        chunk_entry(make_row("_hyper_1_3_chunk", False, 240 * MB)),
+        chunk_entry(make_row("_hyper_1_2_chunk", True, 20 * MB, before=200 * MB, after=20 * MB)),
+        chunk_entry(make_row("_hyper_1_1_chunk", True, 30 * MB, before=240 * MB, after=30 * MB)),
+    ]
+
+    assert chunks[0]["chunk"] == "_timescaledb_internal._hyper_1_3_chunk"
+    assert chunks[0]["compression_ratio"] is None
+    assert chunks[0]["uncompressed_bytes"] == 240 * MB
+    assert chunks[1]["compression_ratio"] == 10.0
+
+    summary = storage_summary(chunks, timedelta(days=1))
+    assert summary["chunks"] == 3
+    assert summary["compressed_chunks"] == 2
+    assert summary["compression_ratio"] == 8.8
+    assert summary["approximate_rows"] == 3000
+    assert summary["chunk_interval_seconds"] == 86400
+    # 10 MB/hour against the default 512 MB target
+    assert summary["suggested_chunk_interval_seconds"] == 51 * 3600
+
+
+def test_summary_without_chunks():
+    summary = storage_summary([], None)
+    assert summary["compression_ratio"] is None
+    assert summary["suggested_chunk_interval_seconds"] is None
@@ -36,6 +36,20 @@ CREATE TABLE IF NOT EXISTS measurements (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 SELECT create_hypertable('measurements', 'time', if_not_exists => TRUE);
+CREATE TABLE IF NOT EXISTS sensor_latest (
+    sensor_id INTEGER PRIMARY KEY REFERENCES sensors(id) ON DELETE CASCADE,
+    time TIMESTAMP WITH TIME ZONE NOT NULL,
+    temperature FLOAT,
+    humidity FLOAT,
+    pressure FLOAT,
+    acceleration_x FLOAT,
+    acceleration_y FLOAT,
+    acceleration_z FLOAT,
+    rssi INTEGER,
+    battery_voltage FLOAT,
+    movement_counter INTEGER,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
 CREATE TABLE IF NOT EXISTS alert_thresholds (
     id SERIAL PRIMARY KEY,
     sensor_id INTEGER REFERENCES sensors(id), 
@@ -81,7 +95,7 @@ CREATE INDEX IF NOT EXISTS idx_alerts_sensor_id ON alerts (sensor_id);
 CREATE INDEX IF NOT EXISTS idx_alerts_created_at ON alerts (created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_users_username ON users (username);
 CREATE MATERIALIZED VIEW IF NOT EXISTS measurements_hourly
-WITH (timescaledb.continuous) AS
+WITH (timescaledb.continuous, timescaledb.materialized_only = true) AS
 SELECT 
     time_bucket('1 hour', time) AS bucket,
     sensor_id,
@@ -92,11 +106,18 @@ SELECT
     MAX(temperature) as max_temperature,
     MIN(humidity) as min_humidity,
     MAX(humidity) as max_humidity,
+    MIN(pressure) as min_pressure,
+    MAX(pressure) as max_pressure,
+    AVG(battery_voltage) as avg_battery_voltage,
+    COUNT(battery_voltage) as battery_count,
+    COUNT(temperature) as temperature_count,
+    COUNT(humidity) as humidity_count,
+    COUNT(pressure) as pressure_count,
     COUNT(*) as measurement_count
 FROM measurements
 GROUP BY bucket, sensor_id;
 CREATE MATERIALIZED VIEW IF NOT EXISTS measurements_daily
-WITH (timescaledb.continuous) AS
+WITH (timescaledb.continuous, timescaledb.materialized_only = true) AS
 SELECT 
     time_bucket('1 day', time) AS bucket,
     sensor_id,
@@ -107,13 +128,20 @@ SELECT
     MAX(temperature) as max_temperature,
     MIN(humidity) as min_humidity,
     MAX(humidity) as max_humidity,
+    MIN(pressure) as min_pressure,
+    MAX(pressure) as max_pressure,
+    AVG(battery_voltage) as avg_battery_voltage,
+    COUNT(battery_voltage) as battery_count,
+    COUNT(temperature) as temperature_count,
+    COUNT(humidity) as humidity_count,
+    COUNT(pressure) as pressure_count,
     PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY temperature) as median_temperature,
     PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY humidity) as median_humidity,
     COUNT(*) as measurement_count
 FROM measurements
 GROUP BY bucket, sensor_id;
 CREATE MATERIALIZED VIEW IF NOT EXISTS measurements_monthly
-WITH (timescaledb.continuous) AS
+WITH (timescaledb.continuous, timescaledb.materialized_only = true) AS
 SELECT 
     time_bucket('1 month', time) AS bucket,
     sensor_id,
@@ -124,6 +152,13 @@ SELECT
     MAX(temperature) as max_temperature,
     MIN(humidity) as min_humidity,
     MAX(humidity) as max_humidity,
+    MIN(pressure) as min_pressure,
+    MAX(pressure) as max_pressure,
+    AVG(battery_voltage) as avg_battery_voltage,
+    COUNT(battery_voltage) as battery_count,
+    COUNT(temperature) as temperature_count,
+    COUNT(humidity) as humidity_count,
+    COUNT(pressure) as pressure_count,
     PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY temperature) as median_temperature,
     PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY humidity) as median_humidity,
     STDDEV(temperature) as stddev_temperature,
@@ -131,6 +166,15 @@ SELECT
     COUNT(*) as measurement_count
 FROM measurements
 GROUP BY bucket, sensor_id;
+SELECT add_continuous_aggregate_policy('measurements_hourly',
+    start_offset => INTERVAL '7 days', end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '30 minutes', if_not_exists => true);
+SELECT add_continuous_aggregate_policy('measurements_daily',
+    start_offset => INTERVAL '35 days', end_offset => INTERVAL '1 day',
+    schedule_interval => INTERVAL '1 hour', if_not_exists => true);
+SELECT add_continuous_aggregate_policy('measurements_monthly',
+    start_offset => INTERVAL '1 year', end_offset => INTERVAL '1 month',
+    schedule_interval => INTERVAL '1 day', if_not_exists => true);
 SELECT add_retention_policy('measurements', INTERVAL '1 year', if_not_exists => true);
 SELECT add_retention_policy('measurements_hourly', INTERVAL '2 years', if_not_exists => true);
 SELECT add_retention_policy('measurements_daily', INTERVAL '3 years', if_not_exists => true);
@@ -0,0 +1,119 @@
+-- Brings the continuous aggregates of an existing database to the layout
+-- expected by backend/app/aggregates.py (min/max pressure, per-field counts...).
+-- init.sql only runs on a fresh volume; run this once on older deployments:
+--
+--   psql "$DATABASE_URL" -f database/migrations/001_aggregate_rollup_columns.sql
+--
+-- Idempotent: views that already have the new columns are kept as they are.
+-- Must not run inside a transaction (CREATE/refresh of continuous aggregates).
+
+DO $$
+DECLARE
+    view_name TEXT;
+BEGIN
+    FOREACH view_name IN ARRAY ARRAY['measurements_monthly', 'measurements_daily', 'measurements_hourly'] LOOP
+        IF EXISTS (SELECT 1 FROM pg_class WHERE relname = view_name)
+           AND (
+               SELECT count(*) FROM pg_attribute a JOIN pg_class c ON c.oid = a.attrelid
+               WHERE c.relname = view_name AND NOT a.attisdropped
+                   AND a.attname IN ('battery_count', 'temperature_count', 'humidity_count', 'pressure_count')
+           ) < 4 THEN
+            EXECUTE format('DROP MATERIALIZED VIEW %I CASCADE', view_name);
+            RAISE NOTICE 'Dropped outdated continuous aggregate %', view_name;
+        END IF;
+    END LOOP;
+END
+$$;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS measurements_hourly
+WITH (timescaledb.continuous, timescaledb.materialized_only = true) AS
+SELECT 
+    time_bucket('1 hour', time) AS bucket,
+    sensor_id,
+    AVG(temperature) as avg_temperature,
+    AVG(humidity) as avg_humidity,
+    AVG(pressure) as avg_pressure,
+    MIN(temperature) as min_temperature,
+    MAX(temperature) as max_temperature,
+    MIN(humidity) as min_humidity,
+    MAX(humidity) as max_humidity,
+    MIN(pressure) as min_pressure,
+    MAX(pressure) as max_pressure,
+    AVG(battery_voltage) as avg_battery_voltage,
+    COUNT(battery_voltage) as battery_count,
+    COUNT(temperature) as temperature_count,
+    COUNT(humidity) as humidity_count,
+    COUNT(pressure) as pressure_count,
+    COUNT(*) as measurement_count
+FROM measurements
+GROUP BY bucket, sensor_id
+WITH NO DATA;
+CREATE MATERIALIZED VIEW IF NOT EXISTS measurements_daily
+WITH (timescaledb.continuous, timescaledb.materialized_only = true) AS
+SELECT 
+    time_bucket('1 day', time) AS bucket,
+    sensor_id,
+    AVG(temperature) as avg_temperature,
+    AVG(humidity) as avg_humidity,
+    AVG(pressure) as avg_pressure,
+    MIN(temperature) as min_temperature,
+    MAX(temperature) as max_temperature,
+    MIN(humidity) as min_humidity,
+    MAX(humidity) as max_humidity,
+    MIN(pressure) as min_pressure,
+    MAX(pressure) as max_pressure,
+    AVG(battery_voltage) as avg_battery_voltage,
+    COUNT(battery_voltage) as battery_count,
+    COUNT(temperature) as temperature_count,
+    COUNT(humidity) as humidity_count,
+    COUNT(pressure) as pressure_count,
+    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY temperature) as median_temperature,
+    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY humidity) as median_humidity,
+    COUNT(*) as measurement_count
+FROM measurements
+GROUP BY bucket, sensor_id
+WITH NO DATA;
+CREATE MATERIALIZED VIEW IF NOT EXISTS measurements_monthly
+WITH (timescaledb.continuous, timescaledb.materialized_only = true) AS
+SELECT 
+    time_bucket('1 month', time) AS bucket,
+    sensor_id,
+    AVG(temperature) as avg_temperature,
+    AVG(humidity) as avg_humidity,
+    AVG(pressure) as avg_pressure,
+    MIN(temperature) as min_temperature,
+    MAX(temperature) as max_temperature,
+    MIN(humidity) as min_humidity,
+    MAX(humidity) as max_humidity,
+    MIN(pressure) as min_pressure,
+    MAX(pressure) as max_pressure,
+    AVG(battery_voltage) as avg_battery_voltage,
+    COUNT(battery_voltage) as battery_count,
+    COUNT(temperature) as temperature_count,
+    COUNT(humidity) as humidity_count,
+    COUNT(pressure) as pressure_count,
+    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY temperature) as median_temperature,
+    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY humidity) as median_humidity,
+    STDDEV(temperature) as stddev_temperature,
+    STDDEV(humidity) as stddev_humidity,
+    COUNT(*) as measurement_count
+FROM measurements
+GROUP BY bucket, sensor_id
+WITH NO DATA;
+SELECT add_continuous_aggregate_policy('measurements_hourly',
+    start_offset => INTERVAL '7 days', end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '30 minutes', if_not_exists => true);
+SELECT add_continuous_aggregate_policy('measurements_daily',
+    start_offset => INTERVAL '35 days', end_offset => INTERVAL '1 day',
+    schedule_interval => INTERVAL '1 hour', if_not_exists => true);
+SELECT add_continuous_aggregate_policy('measurements_monthly',
+    start_offset => INTERVAL '1 year', end_offset => INTERVAL '1 month',
+    schedule_interval => INTERVAL '1 day', if_not_exists => true);
+SELECT add_retention_policy('measurements_hourly', INTERVAL '2 years', if_not_exists => true);
+SELECT add_retention_policy('measurements_daily', INTERVAL '3 years', if_not_exists => true);
+SELECT add_retention_policy('measurements_monthly', INTERVAL '5 years', if_not_exists => true);
+
+-- Materialize the whole history (only invalidated ranges are recomputed on reruns)
+CALL refresh_continuous_aggregate('measurements_hourly', NULL, NULL);
+CALL refresh_continuous_aggregate('measurements_daily', NULL, NULL);
+CALL refresh_continuous_aggregate('measurements_monthly', NULL, NULL);